@@ -0,0 +1,266 @@
+import argparse, asyncio, json, re, sys
+from datetime import datetime
+from functools import lru_cache
+from hashlib import blake2b
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert
+from . import models, ledger, pdf_cache
+from .bulk_import import csv_rows
+from .fastparse import PHONE_RE
+from .utils import norm_phone
+
+# POST /payments/import and `python -m app.bank_import statement.csv`: bank CSV
+# exports posted as payments. The header row is found by name (preamble lines
+# before it are skipped): a date column, Credit/Debit or a signed Amount, and
+# every other column is free text searched for the order. Debits are skipped.
+# Matching uses an index of open orders (balance > 0) built once per file:
+#   1. an order code in the text (ORD000123, "ORD 123", or any open order's code);
+#      ORD codes of settled orders are looked up once per chunk
+#   2. else a phone number in the text -> that customer's open orders; several
+#      are narrowed to the one whose balance equals the amount
+# Lines resolving to one order are matched, to several ambiguous, else unmatched.
+# Per chunk of BANK_CHUNK lines: one INSERT of the payments, one ledger upsert of
+# the per-order sums, one commit. payments2.reference is a fingerprint of the
+# line (date, amount, text, nth repeat in the file), so importing the same
+# statement again posts nothing twice.
+BANK_CHUNK = 2000
+METHOD = "BANK"
+DATE_COLS = ("date", "transaction date", "txn date", "posting date", "value date", "trans date")
+CREDIT_COLS = ("credit", "credit amount", "deposit", "deposits", "cr", "money in", "amount in")
+DEBIT_COLS = ("debit", "debit amount", "withdrawal", "withdrawals", "dr", "money out", "amount out")
+AMOUNT_COLS = ("amount", "transaction amount", "amount (rm)", "amount(rm)", "amount myr")
+SIGN_COLS = ("dr/cr", "cr/dr", "type", "transaction type")
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y", "%d-%m-%y", "%d %b %Y", "%d %B %Y", "%d-%b-%Y", "%d-%b-%y",
+                "%Y-%m-%d %H:%M:%S", "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M")
+CODE_RE = re.compile(r"\bORD[\s\-#:]*(\d{3,})\b", re.I)
+TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9\-/_]*")
+
+@lru_cache(maxsize=4096)
+def parse_date(s: str) -> datetime | None:
+    s = s.strip()
+    for f in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, f)
+        except ValueError:
+            pass
+    return None
+
+def parse_amount(s: str | None) -> float | None:
+    s = (s or "").strip().upper().replace(",", "").replace("RM", "").replace("MYR", "").strip()
+    if not s: return None
+    sign = 1
+    if s.endswith("DR"): sign, s = -1, s[:-2]
+    elif s.endswith("CR"): s = s[:-2]
+    s = s.strip()
+    if s.startswith("(") and s.endswith(")"): sign, s = -sign, s[1:-1]
+    try:
+        return round(sign * float(s), 2)
+    except ValueError:
+        return None
+
+class Columns:
+    def __init__(self, header: list[str]):
+        h = [c.strip().lower() for c in header]
+        pick = lambda names: next((i for i, c in enumerate(h) if c in names), None)
+        self.date = pick(DATE_COLS)
+        if self.date is None: self.date = next((i for i, c in enumerate(h) if "date" in c), None)
+        self.credit, self.debit, self.amount, self.sign = pick(CREDIT_COLS), pick(DEBIT_COLS), pick(AMOUNT_COLS), pick(SIGN_COLS)
+        used = {self.date, self.credit, self.debit, self.amount, self.sign}
+        self.text = [i for i in range(len(h)) if i not in used and "balance" not in h[i]]
+        self.ok = self.date is not None and (self.credit is not None or self.amount is not None)
+
+    def read(self, row: list[str]):
+        # -> (date string, credit amount or None, description)
+        cell = lambda i: row[i].strip() if i is not None and i < len(row) else ""
+        if self.credit is not None:
+            amount = parse_amount(cell(self.credit))
+        else:
+            amount = parse_amount(cell(self.amount))
+            if amount is not None and cell(self.sign).upper().startswith("D"): amount = -abs(amount)
+        return cell(self.date), amount, " ".join(c for c in (cell(i) for i in self.text) if c)
+
+class OrderIndex:
+    # open orders only: order_code -> id, canonical phone -> [ids]; balances are kept current while importing
+    def __init__(self):
+        self.by_code: dict[str, int] = {}
+        self.by_phone: dict[str, list[int]] = {}
+        self.code: dict[int, str] = {}
+        self.balance: dict[int, float] = {}
+
+    async def load(self, db):
+        o, c, b = models.Order, models.Customer, models.OrderBalance
+        rows = await db.execute(
+            select(o.id, o.order_code, c.phone_canonical, b.balance)
+            .join(b, b.order_id == o.id).join(c, c.id == o.customer_id)
+            .where(b.balance > 0, o.status.not_in(("CANCELLED", "RETURNED"))).order_by(o.id)
+        )
+        for oid, code, phone, bal in rows:
+            self.add(oid, code, float(bal))
+            if phone: self.by_phone.setdefault(phone, []).append(oid)
+        return self
+
+    def add(self, oid: int, code: str, balance: float):
+        self.by_code[code.upper()] = oid; self.code[oid] = code; self.balance[oid] = balance
+
+    async def lookup_codes(self, db, codes: set[str]):
+        # settled orders are not in the index; fetch the ORD codes a chunk mentions in one query
+        missing = [k for k in codes if k not in self.by_code]
+        if not missing: return
+        rows = await db.execute(
+            select(models.Order.id, models.Order.order_code, models.OrderBalance.balance)
+            .outerjoin(models.OrderBalance, models.OrderBalance.order_id == models.Order.id)
+            .where(models.Order.order_code.in_(missing))
+        )
+        for oid, code, bal in rows:
+            self.add(oid, code, float(bal or 0))
+
+def code_refs(text: str) -> set[str]:
+    return {f"ORD{int(m.group(1)):06d}" for m in CODE_RE.finditer(text)}
+
+def match(index: OrderIndex, text: str, amount: float) -> tuple[str, list[int], str]:
+    # -> (matched | ambiguous | unmatched, candidate order ids, how)
+    ids = {index.by_code[k] for k in code_refs(text) if k in index.by_code}
+    ids |= {index.by_code[t] for t in (t.upper() for t in TOKEN_RE.findall(text)) if t in index.by_code}
+    if ids:
+        ids = sorted(ids)
+        return ("matched" if len(ids) == 1 else "ambiguous"), ids, "order_code"
+    cands = []
+    for m in PHONE_RE.finditer(text):
+        cands += [i for i in index.by_phone.get(norm_phone(m.group(0)), ()) if i not in cands]
+    if not cands: return "unmatched", [], ""
+    if len(cands) > 1:
+        exact = [i for i in cands if abs(index.balance[i] - amount) < 0.005]
+        if len(exact) == 1: return "matched", exact, "phone+amount"
+        return "ambiguous", cands, "phone"
+    return "matched", cands, "phone"
+
+class Report:
+    def __init__(self, detail: bool = False):
+        self.detail = detail
+        self.counts = {"lines": 0, "matched": 0, "duplicates": 0, "ambiguous": 0, "unmatched": 0, "skipped": 0, "errors": 0}
+        self.amount_posted = 0.0
+        self.orders: set[int] = set()
+        self.matched, self.ambiguous, self.unmatched, self.errors = [], [], [], []
+
+    def line(self, row, date, amount, text, **kw):
+        return {"row": row, "date": date, "amount": amount, "text": text[:200], **kw}
+
+    def as_dict(self):
+        out = {**self.counts, "amount_posted": round(self.amount_posted, 2), "orders": len(self.orders),
+               "ambiguous_lines": self.ambiguous, "unmatched_lines": self.unmatched, "error_lines": self.errors}
+        if self.detail: out["matched_lines"] = self.matched
+        return out
+
+async def post_chunk(db, index: OrderIndex, rep: Report, chunk: list[dict], dry_run: bool):
+    # chunk: matched payment rows (+ "_line" for the report)
+    if not chunk: return
+    if dry_run:
+        posted = {p["reference"] for p in chunk}
+    else:
+        try:
+            rows = [{k: v for k, v in p.items() if not k.startswith("_")} for p in chunk]
+            stmt = insert(models.Payment).on_conflict_do_nothing(index_elements=[models.Payment.reference])
+            posted = set((await db.execute(stmt.returning(models.Payment.reference), rows)).scalars())
+            sums: dict[int, float] = {}
+            for p in chunk:
+                if p["reference"] in posted: sums[p["order_id"]] = round(sums.get(p["order_id"], 0) + p["amount"], 2)
+            await ledger.bump_many(db, sums)
+            await db.commit()
+        except SQLAlchemyError as e:
+            await db.rollback()
+            err = str(getattr(e, "orig", None) or e).splitlines()[0]
+            for p in chunk:
+                index.balance[p["order_id"]] += p["amount"]
+                rep.counts["errors"] += 1; rep.errors.append({**p["_line"], "error": err})
+            return
+        pdf_cache.invalidate_many({p["order_id"] for p in chunk if p["reference"] in posted})
+    for p in chunk:
+        if p["reference"] in posted:
+            rep.counts["matched"] += 1; rep.amount_posted += p["amount"]; rep.orders.add(p["order_id"])
+            if rep.detail: rep.matched.append(p["_line"])
+        else:  # posted concurrently by another import of this statement
+            index.balance[p["order_id"]] += p["amount"]
+            rep.counts["duplicates"] += 1
+
+async def import_stream(db, stream, dry_run: bool = False, detail: bool = False, chunk_size: int = BANK_CHUNK) -> dict:
+    index = await OrderIndex().load(db)
+    rep, cols, seen = Report(detail), None, {}
+    lines: list[tuple] = []
+
+    async def flush():
+        await index.lookup_codes(db, set().union(*(code_refs(l[3]) for l in lines)))
+        refs = [l[5] for l in lines]
+        known = set((await db.execute(select(models.Payment.reference).where(models.Payment.reference.in_(refs)))).scalars())
+        chunk = []
+        for row, date, amount, text, when, ref in lines:
+            if ref in known:
+                rep.counts["duplicates"] += 1; continue
+            kind, ids, how = match(index, text, amount)
+            if kind != "matched":
+                rep.counts[kind] += 1
+                getattr(rep, kind).append(rep.line(row, date, amount, text, candidates=[index.code[i] for i in ids]))
+                continue
+            oid = ids[0]
+            line = rep.line(row, date, amount, text, order_code=index.code[oid], by=how)
+            if amount > index.balance[oid] + 0.005: line["overpaid"] = round(amount - max(index.balance[oid], 0), 2)
+            index.balance[oid] -= amount
+            chunk.append({"order_id": oid, "amount": amount, "method": METHOD, "created_at": when or datetime.utcnow(),
+                          "reference": ref, "_line": line})
+        await post_chunk(db, index, rep, chunk, dry_run)
+        lines.clear()
+
+    async for row, fields in csv_rows(stream):
+        if cols is None:
+            c = Columns(fields)
+            if c.ok: cols = c
+            continue
+        if not any(f.strip() for f in fields): continue
+        date, amount, text = cols.read(fields)
+        rep.counts["lines"] += 1
+        if amount is None or amount <= 0:
+            rep.counts["skipped"] += 1; continue
+        key = blake2b(f"{date}\x1f{amount:.2f}\x1f{text}".encode(), digest_size=12).digest()
+        seen[key] = n = seen.get(key, 0) + 1  # identical lines in one statement are distinct payments
+        lines.append((row, date, amount, text, parse_date(date), f"{key.hex()}-{n}"))
+        if len(lines) >= chunk_size:
+            await flush()
+    if lines:
+        await flush()
+    if cols is None:
+        rep.counts["errors"] += 1
+        rep.errors.append({"row": 0, "error": "no header row with a date column and a Credit or Amount column"})
+    return rep.as_dict()
+
+# ---- CLI ----
+async def file_chunks(path: str, size: int = 1 << 16):
+    with open(path, "rb") as f:
+        while chunk := f.read(size):
+            yield chunk
+
+async def run_file(path: str, dry_run: bool, detail: bool) -> dict:
+    from .db import AsyncSessionLocal
+    async with AsyncSessionLocal() as db:
+        return await import_stream(db, file_chunks(path), dry_run=dry_run, detail=detail)
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.bank_import", description="Post a bank statement CSV as payments")
+    ap.add_argument("path")
+    ap.add_argument("--dry-run", action="store_true", help="match and report without posting")
+    ap.add_argument("--detail", action="store_true", help="list matched lines in the report too")
+    ap.add_argument("--report", help="write the JSON report here instead of stdout")
+    args = ap.parse_args(argv)
+    from .db import engine
+    from .schema import ensure
+    ensure(engine)
+    rep = asyncio.run(run_file(args.path, args.dry_run, args.detail))
+    out = json.dumps(rep, indent=2, default=str)
+    if args.report:
+        with open(args.report, "w") as f: f.write(out)
+        print({k: v for k, v in rep.items() if not isinstance(v, list)})
+    else:
+        print(out)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+import csv, json
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import insert
+from . import models, catalog, codes, customers
+from .schemas import ParsedOrder
+
+# POST /orders/bulk: JSON lines (one ParsedOrder-shaped object per line) or CSV
+# (header row; columns name, phone, address, type, notes, order_code, status,
+# item, sku, qty, unit_price; consecutive rows with the same non-empty `ref`
+# are one order with several items). The body is read as a stream and handled
+# BULK_CHUNK orders at a time, one transaction per chunk:
+#   customers: customers.upsert_many (by canonical phone)
+#   codes: one allocator call; items: the in-memory catalog index
+#   orders / items / balances: one executemany INSERT each
+BULK_CHUNK = 1000
+CSV_ORDER_COLS = ("name", "phone", "address", "type", "notes", "order_code", "status")
+STATUSES = ("DRAFT", "CONFIRMED", "RETURNED", "CANCELLED")
+
+async def lines(stream):
+    buf = b""
+    async for chunk in stream:
+        buf += chunk
+        *done, buf = buf.split(b"\n")
+        for l in done:
+            yield l.decode("utf-8-sig").rstrip("\r")
+    if buf.strip():
+        yield buf.decode("utf-8-sig").rstrip("\r")
+
+async def jsonl_records(stream):
+    # -> (row number, dict | error string)
+    n = 0
+    async for line in lines(stream):
+        n += 1
+        if not line.strip(): continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            yield n, f"invalid JSON: {e}"; continue
+        yield n, rec if isinstance(rec, dict) else "expected a JSON object"
+
+async def csv_rows(stream):
+    # -> (row number, [fields]); quoted fields may span lines
+    n, pending = 0, []
+    async for line in lines(stream):
+        pending.append(line)
+        if sum(l.count('"') for l in pending) % 2:  # quoted field continues on the next line
+            continue
+        row = next(csv.reader(["\n".join(pending)]), [])
+        pending = []; n += 1
+        yield n, row
+
+async def csv_records(stream):
+    header, cur, cur_ref = None, None, None
+    async for n, row in csv_rows(stream):
+        if header is None:
+            header = [h.strip().lower() for h in row]; continue
+        if not any(c.strip() for c in row): continue
+        r = {k: v.strip() for k, v in zip(header, row)}
+        item = {"name": r.get("item") or r.get("item_name") or "", "sku": r.get("sku") or None,
+                "qty": r.get("qty") or 1, "unit_price": r.get("unit_price") or None}
+        ref = r.get("ref") or None
+        if cur is not None and ref and ref == cur_ref:
+            if item["name"]: cur[1]["items"].append(item)
+            continue
+        if cur is not None: yield cur
+        cur = (n, {k: r[k] for k in CSV_ORDER_COLS if r.get(k)} | {"items": [item] if item["name"] else []})
+        cur_ref = ref
+    if cur is not None: yield cur
+
+def validate(rec) -> tuple[ParsedOrder, str] | str:
+    # -> (order, status) or an error message
+    if isinstance(rec, str): return rec
+    rec = dict(rec)
+    if "order_code" in rec and not rec.get("order_id"): rec["order_id"] = rec.pop("order_code")
+    if isinstance(rec.get("type"), str): rec["type"] = rec["type"].strip().upper()
+    status = str(rec.pop("status", None) or "CONFIRMED").upper()
+    if status not in STATUSES: return f"status must be one of {', '.join(STATUSES)}"
+    try:
+        o = ParsedOrder.model_validate(rec)
+    except ValidationError as e:
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    if not o.name.strip(): return "name: required"
+    if any(it.qty < 1 for it in o.items): return "items.qty: must be at least 1"
+    return o, status
+
+async def import_chunk(db, chunk) -> list[dict]:
+    # chunk: [(row, record)] -> one result per record
+    results, ok = [], []
+    for row, rec in chunk:
+        v = validate(rec)
+        if isinstance(v, str):
+            results.append({"row": row, "ok": False, "error": v})
+        else:
+            results.append({"row": row, "ok": True}); ok.append((results[-1], *v))
+    if not ok: return results
+
+    given = [o.order_id for _, o, _ in ok if o.order_id]
+    taken = set((await db.execute(select(models.Order.order_code).where(models.Order.order_code.in_(given)))).scalars()) if given else set()
+    keep, seen = [], set()
+    for res, o, status in ok:
+        if o.order_id and (o.order_id in taken or o.order_id in seen):
+            res.update(ok=False, error=f"order_code {o.order_id} already exists"); continue
+        if o.order_id: seen.add(o.order_id)
+        keep.append((res, o, status))
+    if not keep: return results
+    try:
+        await write_chunk(db, keep)
+    except SQLAlchemyError as e:
+        await db.rollback()
+        err = str(getattr(e, "orig", None) or e).splitlines()[0]
+        for res, _, _ in keep:
+            res.update(ok=False, error=err); res.pop("order_code", None)
+    return results
+
+async def write_chunk(db, keep):
+    cust_ids = await customers.upsert_many(db, [(o.name, o.phone, o.address) for _, o, _ in keep])
+    fresh = iter(await codes.allocator.take(db, sum(1 for _, o, _ in keep if not o.order_id)))
+    await catalog.index.ensure(db)
+    rows, order_lines, totals = [], [], []
+    for (res, o, status), cid in zip(keep, cust_ids):
+        code = o.order_id or next(fresh)
+        rows.append({"order_code": code, "customer_id": cid, "type": o.type, "status": status, "notes": o.notes})
+        resolved = [catalog.index.resolve(it.name, it.sku, it.unit_price) for it in o.items]
+        order_lines.append([(it, r) for it, r in zip(o.items, resolved)])
+        totals.append(sum(round(float(price), 2) * it.qty for it, (_, price, _) in order_lines[-1]))
+    ids = await codes.insert_orders(db, rows, [bool(o.order_id) for _, o, _ in keep])
+    for (res, _, _), oid, r in zip(keep, ids, rows):
+        if oid is None: res.update(ok=False, error=f"order_code {r['order_code']} already exists"); res.pop("order_code")  # taken since the check above
+        else: res["order_code"] = r["order_code"]  # an allocated code may have been replaced
+    items = [{"order_id": oid, "sku": sku, "name": nm, "qty": it.qty, "unit_price": price}
+             for oid, ls in zip(ids, order_lines) if oid for it, (sku, price, nm) in ls]
+    if items:
+        await db.execute(insert(models.OrderItem), items)
+    await db.execute(insert(models.OrderBalance), [{"order_id": oid, "total": t, "paid": 0, "balance": t} for oid, t in zip(ids, totals) if oid])
+    await db.commit()
+
+async def import_stream(db, records, chunk_size: int = BULK_CHUNK) -> dict:
+    out, chunk = [], []
+    async for rec in records:
+        chunk.append(rec)
+        if len(chunk) >= chunk_size:
+            out += await import_chunk(db, chunk); chunk = []
+    if chunk:
+        out += await import_chunk(db, chunk)
+    created = sum(1 for r in out if r["ok"])
+    return {"created": created, "failed": len(out) - created, "results": out}
@@ -0,0 +1,99 @@
+import os, re, time
+from sqlalchemy import select
+from . import models
+from .suggest import SuggestIndex
+
+# Process-wide catalog index: SKU, name and alias lookups for item defaults
+# without DB round trips. Loaded at startup, updated in place by the catalog
+# write endpoints, and reloaded after CATALOG_TTL seconds so writes made by
+# other workers show up too.
+CATALOG_TTL = float(os.getenv("CATALOG_TTL", "300"))
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+def token_key(s: str) -> str:
+    # "Hospital-Bed (3 function)" and "3 function hospital bed" share a key
+    return " ".join(sorted(TOKEN_RE.findall(s.casefold())))
+
+class CatalogIndex:
+    def __init__(self):
+        self.products: dict[str, tuple[str, float]] = {}  # sku -> (name, default_price)
+        self.by_name: dict[str, str] = {}    # casefolded name -> sku
+        self.by_alias: dict[str, str] = {}   # casefolded alias -> sku
+        self.by_tokens: dict[str, tuple[str, bool]] = {}  # token key -> (sku, is_alias)
+        self.aliases: list[tuple[str, str]] = []
+        self.suggest = SuggestIndex()
+        self.loaded_at = 0.0
+        self._names: list[str] | None = None
+
+    def load(self, products, aliases):
+        self.products, self.by_name, self.by_alias, self.by_tokens, self.aliases = {}, {}, {}, {}, []
+        for sku, name, price in products:
+            self._index_product(sku, name, price)
+        for alias, sku in aliases:
+            self._index_alias(alias, sku)
+        self.suggest.load([(n, sku) for sku, (n, _) in self.products.items()] + self.aliases)
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self, db):
+        products = (await db.execute(select(models.Product.sku, models.Product.name, models.Product.default_price))).all()
+        aliases = (await db.execute(select(models.ProductAlias.alias, models.ProductAlias.sku).order_by(models.ProductAlias.id))).all()
+        self.load(products, aliases)
+
+    async def ensure(self, db):
+        if time.monotonic() - self.loaded_at > CATALOG_TTL:
+            await self.refresh(db)
+
+    def add_product(self, sku: str, name: str, price):
+        self._index_product(sku, name, price)
+        self.suggest.add(name, sku)
+
+    def add_alias(self, alias: str, sku: str):
+        self._index_alias(alias, sku)
+        self.suggest.add(alias, sku)
+
+    def _index_product(self, sku: str, name: str, price):
+        self.products[sku] = (name, float(price or 0))
+        self.by_name.setdefault(name.casefold(), sku)
+        if k := token_key(name): self.by_tokens.setdefault(k, (sku, False))
+        self._names = None
+
+    def _index_alias(self, alias: str, sku: str):
+        self.aliases.append((alias, sku))
+        self.by_alias.setdefault(alias.casefold(), sku)
+        if k := token_key(alias): self.by_tokens.setdefault(k, (sku, True))
+        self._names = None
+
+    @property
+    def names(self) -> list[str]:
+        # product names + aliases, longest first (fast-path matching wants that order)
+        if self._names is None:
+            self._names = sorted({n for n, _ in self.products.values()} | {a for a, _ in self.aliases}, key=len, reverse=True)
+        return self._names
+
+    def price(self, sku: str, fallback=0.0) -> float:
+        p = self.products.get(sku)
+        return p[1] if p else (fallback or 0.0)
+
+    def resolve(self, name: str, sku: str | None, unit_price: float | None):
+        # -> (sku, unit_price, name): explicit SKU, then alias, then product name
+        # (both case-insensitive), then the same on normalized tokens.
+        if sku:
+            if sku in self.products and (unit_price is None or float(unit_price) == 0):
+                unit_price = self.products[sku][1]
+            return sku, unit_price or 0.0, name
+        key = (name or "").casefold()
+        if key in self.by_alias:
+            s = self.by_alias[key]
+            return s, self.price(s, unit_price), name
+        if key in self.by_name:
+            s = self.by_name[key]
+            return s, self.products[s][1], self.products[s][0]
+        hit = self.by_tokens.get(token_key(name or ""))
+        if hit:
+            s, is_alias = hit
+            if s in self.products or is_alias:
+                return s, self.price(s, unit_price), name if is_alias else self.products[s][0]
+        return "", unit_price or 0.0, name
+
+index = CatalogIndex()
@@ -0,0 +1,97 @@
+import asyncio, os, re
+from sqlalchemy import select, func, text
+from sqlalchemy.dialects.postgresql import insert
+from . import models
+
+# Order codes (ORD000123) come from the orders2_code_seq sequence. Each nextval
+# reserves a block of ORDER_CODE_BLOCK numbers (n-BLOCK+1 .. n) that this
+# process hands out from memory, so a create costs no query most of the time
+# and concurrent creates in any number of workers never get the same code.
+# Codes left in a block when a worker exits are skipped (gaps, no reuse).
+# Explicit codes (legacy imports, order_id in a request) can land inside a block
+# another worker already holds; claim() can't reach that worker's memory, so
+# insert_order() / insert_orders() insert allocated codes with ON CONFLICT DO
+# NOTHING and take the next code for any row that didn't go in.
+ORDER_CODE_BLOCK = int(os.getenv("ORDER_CODE_BLOCK", "50"))
+SEQ = "orders2_code_seq"
+CODE_RE = re.compile(r"^ORD([0-9]+)$")
+# highest number already handed out in blocks
+POSITION = f"SELECT CASE WHEN is_called THEN last_value ELSE last_value - {ORDER_CODE_BLOCK} END FROM {SEQ}"
+
+SCHEMA = [
+    f"CREATE SEQUENCE IF NOT EXISTS {SEQ} INCREMENT BY {ORDER_CODE_BLOCK} START WITH {ORDER_CODE_BLOCK}",
+    f"ALTER SEQUENCE {SEQ} INCREMENT BY {ORDER_CODE_BLOCK}",
+]
+# move past codes that already exist (count-based ones, imports, rows written
+# by other tools); schema.ensure runs it on every boot, not only on DDL changes
+CATCH_UP = f"""SELECT setval('{SEQ}', m) FROM (
+    SELECT coalesce(max(substring(order_code from '^ORD([0-9]+)$')::bigint), 0) AS m FROM orders2
+) x WHERE m > ({POSITION})"""
+
+class CodeTaken(ValueError):
+    # an explicit code that already exists; main answers 409
+    def __init__(self, code: str):
+        super().__init__(f"order_code {code} already exists"); self.code = code
+
+def fmt(n: int) -> str:
+    return f"ORD{n:06d}"
+
+class CodeAllocator:
+    def __init__(self, block: int = ORDER_CODE_BLOCK):
+        self.block = block
+        self.next, self.end = 1, 0
+        self.lock = asyncio.Lock()
+
+    async def take(self, db, n: int = 1) -> list[str]:
+        async with self.lock:
+            out = []
+            while len(out) < n:
+                if self.next > self.end:
+                    self.end = await db.scalar(select(func.nextval(SEQ)))
+                    self.next = self.end - self.block + 1
+                k = min(n - len(out), self.end - self.next + 1)
+                out.extend(fmt(i) for i in range(self.next, self.next + k))
+                self.next += k
+            return out
+
+    async def claim(self, db, used):
+        # explicit codes (legacy imports, order_id in a request) move the sequence
+        # and this process's block past them, so take() never hands them out again
+        m = max((int(x.group(1)) for c in used if c and (x := CODE_RE.match(c))), default=0)
+        if not m: return
+        async with self.lock:
+            await db.execute(text(f"SELECT setval('{SEQ}', CAST(:m AS bigint)) WHERE CAST(:m AS bigint) > ({POSITION})"), {"m": m})
+            if self.next <= m <= self.end: self.next = m + 1
+
+    async def next_code(self, db) -> str:
+        return (await self.take(db))[0]
+
+allocator = CodeAllocator()
+
+async def insert_orders(db, rows: list[dict], explicit: list[bool]) -> list[int | None]:
+    # rows: orders2 values with order_code set (explicit[i]: chosen by the caller,
+    # else taken from the allocator) -> id per row; None for an explicit code that
+    # already exists. Allocated codes someone else used are replaced and retried.
+    t = models.Order.__table__
+    ids, todo = [None] * len(rows), list(range(len(rows)))
+    while todo:
+        stmt = insert(t).on_conflict_do_nothing(index_elements=[t.c.order_code]).returning(t.c.id, t.c.order_code)
+        got = dict((c, i) for i, c in (await db.execute(stmt, [rows[k] for k in todo])).all())
+        for k in todo: ids[k] = got.pop(rows[k]["order_code"], None)  # pop: a code twice in rows goes in once
+        todo = [k for k in todo if ids[k] is None and not explicit[k]]
+        for k, code in zip(todo, await allocator.take(db, len(todo)) if todo else ()): rows[k]["order_code"] = code
+    await allocator.claim(db, [r["order_code"] for r, e in zip(rows, explicit) if e])
+    return ids
+
+async def insert_order(db, explicit: str | None = None, fresh=None, **values):
+    # one order -> models.Order (in the session); code from explicit, else the
+    # fresh iterator (codes the caller took in bulk), else the allocator
+    code = explicit or (next(fresh, None) if fresh is not None else None)
+    while True:
+        stmt = insert(models.Order).values(order_code=code or await allocator.next_code(db), **values)
+        o = (await db.scalars(stmt.on_conflict_do_nothing(index_elements=["order_code"]).returning(models.Order))).first()
+        if o is not None: break
+        if explicit: raise CodeTaken(explicit)
+        code = None
+    if explicit: await allocator.claim(db, [explicit])
+    return o
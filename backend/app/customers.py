@@ -0,0 +1,117 @@
+import argparse, sys, time
+from sqlalchemy import select, update, delete, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError, OperationalError
+from . import models
+from .utils import norm_phone
+
+# Customers are identified by phone_canonical (utils.norm_phone of the phone),
+# which has a unique index. Every create path goes through upsert()/upsert_many():
+# one INSERT ... ON CONFLICT (phone_canonical) DO UPDATE ... RETURNING id, so
+# concurrent creates for the same phone end up on the same row. The existing
+# row keeps its name and phone as first entered; a new non-empty address
+# replaces the old one. Phones norm_phone can't read (placeholders, too few
+# digits) get NULL, which never conflicts, so those customers are never shared.
+# Rows from before the column existed are canonicalized (and duplicates merged)
+# by `python -m app.customers backfill`.
+
+def upsert_stmt(rows: list[dict]):
+    t = models.Customer.__table__.c
+    stmt = insert(models.Customer).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[t.phone_canonical],
+        set_={"address": func.coalesce(func.nullif(stmt.excluded.address, ""), t.address)},
+    ).returning(t.id, t.phone_canonical)
+
+async def upsert(db, name: str, phone: str | None, address: str | None) -> int:
+    row = {"name": name, "phone": phone, "phone_canonical": norm_phone(phone), "address": address}
+    if not row["phone_canonical"]:  # no phone, nothing to match on
+        return (await db.execute(insert(models.Customer).values(row).returning(models.Customer.id))).scalar_one()
+    return (await db.execute(upsert_stmt([row]))).one().id
+
+async def upsert_many(db, people) -> list[int]:
+    # people: [(name, phone, address)] -> customer id per entry; repeats of a phone share a row
+    rows, row_of, first = [], [], {}
+    for name, phone, address in people:
+        c = norm_phone(phone)
+        if c and c in first:
+            row_of.append(first[c]); continue
+        if c: first[c] = len(rows)
+        row_of.append(len(rows))
+        rows.append({"name": name, "phone": phone, "phone_canonical": c, "address": address})
+    ids = [None] * len(rows)
+    keyed = [i for i, r in enumerate(rows) if r["phone_canonical"]]
+    for start in range(0, len(keyed), 1000):
+        part = keyed[start:start + 1000]
+        by_c = {r.phone_canonical: r.id for r in await db.execute(upsert_stmt([rows[i] for i in part]))}
+        for i in part: ids[i] = by_c[rows[i]["phone_canonical"]]
+    bare = [i for i, r in enumerate(rows) if not r["phone_canonical"]]
+    if bare:
+        new = (await db.execute(insert(models.Customer).returning(models.Customer.id, sort_by_parameter_order=True), [rows[i] for i in bare])).scalars().all()
+        for i, cid in zip(bare, new): ids[i] = cid
+    return [ids[k] for k in row_of]
+
+# ---- backfill ----
+def merge_batch(db, rows) -> tuple[int, int]:
+    c = models.Customer
+    canon = {r.id: norm_phone(r.phone) for r in rows}
+    owners = dict(db.execute(select(c.phone_canonical, c.id).where(c.phone_canonical.in_({v for v in canon.values() if v}))).all())
+    done, merges = 0, []
+    for r in rows:
+        k = canon[r.id]
+        if not k: continue
+        if k in owners:
+            merges.append((r.id, owners[k], r.address))
+        else:
+            db.execute(update(c).where(c.id == r.id).values(phone_canonical=k)); owners[k] = r.id; done += 1
+    for dup, keep, address in merges:
+        db.execute(update(models.Order).where(models.Order.customer_id == dup).values(customer_id=keep))
+        if address:
+            db.execute(update(c).where(c.id == keep, c.address.is_(None)).values(address=address))
+        db.execute(delete(c).where(c.id == dup))
+    db.commit()
+    return done, len(merges)
+
+def backfill(db, batch: int = 500, pause: float = 0.0, log=print) -> dict:
+    # Fill phone_canonical for old rows, merging rows whose canonical phone is
+    # already taken into the existing customer (orders are re-pointed first).
+    # Short transactions of `batch` rows, row locks only; safe to run while serving.
+    c = models.Customer
+    stats = {"scanned": 0, "canonicalized": 0, "merged": 0}
+    last = 0
+    while True:
+        try:
+            db.execute(text("SET LOCAL lock_timeout = '5s'"))
+            rows = db.execute(
+                select(c.id, c.phone, c.address).where(c.id > last, c.phone_canonical.is_(None), c.phone.is_not(None))
+                .order_by(c.id).limit(batch).with_for_update()
+            ).all()
+            if not rows: break
+            n = merge_batch(db, rows)
+        except (IntegrityError, OperationalError) as e:
+            # a live upsert took one of these phones first, or a lock wait timed out: redo the batch
+            db.rollback(); log(f"retrying batch after id {last}: {type(e.orig).__name__}")
+            time.sleep(max(pause, 0.5)); continue
+        last = rows[-1].id; stats["scanned"] += len(rows)
+        stats["canonicalized"] += n[0]; stats["merged"] += n[1]
+        log(f"up to id {last}: {stats}")
+        if pause: time.sleep(pause)
+    db.commit()
+    return stats
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.customers", description="Canonicalize customer phones and merge duplicates")
+    ap.add_argument("command", choices=["backfill"])
+    ap.add_argument("--batch", type=int, default=500)
+    ap.add_argument("--pause", type=float, default=0.0, help="seconds to sleep between batches")
+    args = ap.parse_args(argv)
+    from .db import SessionLocal, engine
+    from .schema import ensure
+    ensure(engine)
+    with SessionLocal() as db:
+        stats = backfill(db, args.batch, args.pause)
+    print(f"done: {stats}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
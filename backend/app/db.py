@@ -1,10 +1,96 @@
 import os
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.concurrency import run_in_threadpool
+from .metrics import instrument_engine, timed_pool
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL env var is required")
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# DB_ASYNC=0 keeps the psycopg2 engine for request handling (each call is run
+# in the threadpool so it still doesn't block the event loop).
+DB_ASYNC = os.getenv("DB_ASYNC", "1").lower() not in ("0", "false", "no")
+
+engine = create_engine(DATABASE_URL, pool_pre_ping=True, poolclass=timed_pool(QueuePool, "sync"))
+instrument_engine(engine, "sync")
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+def async_url(url: str):
+    u = make_url(url)
+    if u.get_backend_name() != "postgresql":
+        return u
+    q = dict(u.query)
+    if "sslmode" in q:  # libpq spelling -> asyncpg spelling
+        q["ssl"] = q.pop("sslmode")
+    return u.set(drivername="postgresql+asyncpg", query=q)
+
+class ThreadedTransaction:
+    def __init__(self, session):
+        self.session = session
+
+    async def __aenter__(self):
+        self.tx = await run_in_threadpool(self.session.begin_nested)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await run_in_threadpool(self.tx.rollback if exc_type else self.tx.commit)
+
+# AsyncSession-shaped wrapper around a sync Session; every DB call goes through the threadpool.
+class ThreadedSession:
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def add(self, obj):
+        self.sync_session.add(obj)
+
+    def add_all(self, objs):
+        self.sync_session.add_all(objs)
+
+    async def execute(self, *args, **kw):
+        return await run_in_threadpool(self.sync_session.execute, *args, **kw)
+
+    async def scalar(self, *args, **kw):
+        return await run_in_threadpool(self.sync_session.scalar, *args, **kw)
+
+    async def scalars(self, *args, **kw):
+        return await run_in_threadpool(self.sync_session.scalars, *args, **kw)
+
+    async def get(self, *args, **kw):
+        return await run_in_threadpool(self.sync_session.get, *args, **kw)
+
+    async def flush(self, objects=None):
+        await run_in_threadpool(self.sync_session.flush, objects)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+    def begin_nested(self):
+        return ThreadedTransaction(self.sync_session)
+
+    async def run_sync(self, fn, *args, **kw):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kw)
+
+if DB_ASYNC:
+    async_engine = create_async_engine(async_url(DATABASE_URL), pool_pre_ping=True, poolclass=timed_pool(AsyncAdaptedQueuePool, "async"))
+    instrument_engine(async_engine.sync_engine, "async")
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    def AsyncSessionLocal():
+        return ThreadedSession(SessionLocal(expire_on_commit=False))
@@ -1,14 +1,35 @@
-from io import BytesIO
-from openpyxl import Workbook
+from tempfile import SpooledTemporaryFile
 
-def orders_to_excel(rows):
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "orders"
-    headers = ["order_code","type","status","customer","phone","total","paid","balance"]
-    ws.append(headers)
+HEADERS = ["order_code","type","status","customer","phone","total","paid","balance"]
+SPOOL_MAX = 8 * 1024 * 1024
+CHUNK = 64 * 1024
+
+def write_orders_xlsx(rows, out):
+    # write_only streams rows to disk as they are appended, so memory does not grow with row count.
+    from openpyxl import Workbook  # imported on first export (cold start)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("orders")
+    ws.append(HEADERS)
     for r in rows:
-        ws.append([r.get(h) for h in headers])
-    out = BytesIO()
+        ws.append([r.get(h) for h in HEADERS])
     wb.save(out)
-    return out.getvalue()
+
+def orders_to_excel_file(rows):
+    f = SpooledTemporaryFile(max_size=SPOOL_MAX)
+    try:
+        write_orders_xlsx(rows, f)
+    except Exception:
+        f.close(); raise
+    f.seek(0)
+    return f
+
+def iter_file(f):
+    try:
+        while chunk := f.read(CHUNK):
+            yield chunk
+    finally:
+        f.close()
+
+def orders_to_excel(rows):
+    with orders_to_excel_file(rows) as f:
+        return f.read()
@@ -0,0 +1,131 @@
+import os, re
+from .schemas import ParsedOrder, ParsedEvent, ItemIn
+
+# Rule-based extractor for templated intake messages ("Nama: ... Tel: 01x... Item: ... RM...").
+# Returns a confidence in [0, 1]; the caller only skips the model above FASTPATH_MIN_CONFIDENCE.
+
+FASTPATH = os.getenv("FASTPATH", "1").lower() not in ("0", "false", "no")
+FASTPATH_MIN_CONFIDENCE = float(os.getenv("FASTPATH_MIN_CONFIDENCE", "0.8"))
+
+LABEL = r"^\s*(?:{})\s*[:=\-]\s*(.+?)\s*$"
+NAME_RE = re.compile(LABEL.format(r"nama|name|customer|pelanggan"), re.I | re.M)
+PHONE_LABEL_RE = re.compile(LABEL.format(r"tel|phone|no\.?\s*tel|no\.?\s*hp|hp|h/p|contact"), re.I | re.M)
+ADDR_RE = re.compile(LABEL.format(r"alamat|address|addr"), re.I | re.M)
+ITEM_RE = re.compile(LABEL.format(r"item|items|barang|produk|product"), re.I | re.M)
+TYPE_LABEL_RE = re.compile(LABEL.format(r"jenis|type|plan"), re.I | re.M)
+NOTES_RE = re.compile(LABEL.format(r"nota|notes?|remark|catatan"), re.I | re.M)
+PHONE_RE = re.compile(r"(?<!\d)(?:\+?6?0)1\d[\s\-]?\d{3,4}[\s\-]?\d{4}(?!\d)")
+RM_RE = re.compile(r"\bRM\s?(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d{1,2}))?", re.I)
+QTY_RE = re.compile(r"(?:\b(\d{1,3})\s*(?:x|unit|units|pcs|nos|biji|buah|set)\b)|(?:\bx\s?(\d{1,3})\b)|(?:\bqty\s*[:=]?\s*(\d{1,3})\b)", re.I)
+ORDER_REF_RE = re.compile(r"\bORD\d{3,}\b", re.I)
+WORD_RE = re.compile(r"[^\W_]+")
+
+TYPE_WORDS = [
+    ("INSTALMENT", re.compile(r"\b(ansuran|instal+ment|install?ment|bulanan ansuran)\b", re.I)),
+    ("RENTAL", re.compile(r"\b(sewa|rent|rental|rentals)\b", re.I)),
+    ("OUTRIGHT", re.compile(r"\b(beli|buy|outright|jual|purchase|cash)\b", re.I)),
+]
+EVENT_WORDS = [
+    ("INSTALMENT_CANCEL", re.compile(r"\b(cancel|batal)\w*\s+(ansuran|instal+ment|install?ment)\b", re.I)),
+    ("BUYBACK", re.compile(r"\b(buy\s?back|beli\s+balik)\b", re.I)),
+    ("COLLECT", re.compile(r"\b(collect|collection|pick\s?up|ambil\s+balik)\b", re.I)),
+    ("RETURN", re.compile(r"\b(return|returned|pulang|pulangkan|hantar\s+balik)\b", re.I)),
+]
+
+def _amount(m) -> float:
+    return float(m.group(1).replace(",", "") + "." + (m.group(2) or "0"))
+
+def _qty(line: str) -> int | None:
+    m = QTY_RE.search(line)
+    if not m: return None
+    return int(next(g for g in m.groups() if g))
+
+class Phrases:
+    # catalog names keyed by their word sequence: a line costs a dict probe per
+    # word and distinct name length, however large the catalog is
+    def __init__(self, names):
+        self.by_words: dict[tuple, str] = {}
+        for n in names:  # longest first, so the first spelling of a word sequence wins
+            if w := tuple(WORD_RE.findall(n.casefold())): self.by_words.setdefault(w, n)
+        self.lengths = sorted({len(w) for w in self.by_words}, reverse=True)
+
+    def hits(self, line: str) -> list[str]:
+        words = WORD_RE.findall(line.casefold())
+        found = [(self.by_words[w], i, i + k) for i in range(len(words)) for k in self.lengths
+                 if (w := tuple(words[i:i + k])) in self.by_words and len(w) == k]
+        # longest first, so "Hospital Bed 3 Function" beats the "Hospital Bed" inside it
+        hits, taken = [], set()
+        for n, i, j in sorted(found, key=lambda f: -len(f[0])):
+            if n not in hits and taken.isdisjoint(range(i, j)):
+                hits.append(n); taken.update(range(i, j))
+        return hits
+
+_phrases: tuple[list | None, Phrases | None] = (None, None)
+
+def _catalog_hits(line: str, names) -> list[str]:
+    # names is catalog.index.names (a new list whenever the catalog changes), so the index is built once per version
+    global _phrases
+    if _phrases[0] is not names:
+        _phrases = (names, Phrases(names))
+    return _phrases[1].hits(line)
+
+def extract(text: str, names=()) -> tuple[ParsedOrder, ParsedEvent, float]:
+    # names: catalog product names/aliases, longest first
+    score = 0.0
+
+    m = NAME_RE.search(text)
+    name = m.group(1) if m else ""
+    if name: score += 0.3
+
+    m = PHONE_LABEL_RE.search(text)
+    pm = PHONE_RE.search(m.group(1)) if m else PHONE_RE.search(text)
+    phone = pm.group(0) if pm else None
+    if phone: score += 0.2
+
+    addr = ADDR_RE.search(text)
+    notes = NOTES_RE.search(text)
+
+    typ, typ_src = None, TYPE_LABEL_RE.search(text)
+    for t, rx in TYPE_WORDS:
+        if rx.search(typ_src.group(1) if typ_src else text):
+            typ = t; break
+    if typ: score += 0.1
+
+    ev_type = "NONE"
+    for t, rx in EVENT_WORDS:
+        if rx.search(text):
+            ev_type = t; break
+    ref = ORDER_REF_RE.search(text)
+
+    # Items: catalog names anywhere in the text, else the value of an "Item:" line.
+    items, matched = [], 0
+    for line in text.splitlines():
+        hits = _catalog_hits(line, names) if names else []
+        prices = RM_RE.findall(line)
+        for h in hits:
+            rm = RM_RE.search(line)
+            items.append(ItemIn(name=h, qty=_qty(line) or 1, unit_price=_amount(rm) if rm and len(hits) == 1 else None))
+            matched += 1
+        if not hits:
+            im = ITEM_RE.match(line)
+            if im:
+                raw = RM_RE.sub("", QTY_RE.sub("", im.group(1))).strip(" -,/@")
+                if raw:
+                    rm = RM_RE.search(line)
+                    items.append(ItemIn(name=raw, qty=_qty(line) or 1, unit_price=_amount(rm) if rm and len(prices) == 1 else None))
+    if items:
+        score += 0.3 if matched == len(items) else 0.15
+        if all(i.unit_price is not None for i in items): score += 0.1
+
+    if ev_type != "NONE" and ref:
+        # "RETURN ORD000123": an event against an existing order needs no order details.
+        score = max(score, 0.9)
+    elif ev_type != "NONE":
+        score -= 0.2  # keywords without a reference are ambiguous ("return next week")
+
+    order = ParsedOrder(
+        order_id=None, name=name, phone=phone, address=addr.group(1) if addr else None,
+        type=typ or "OUTRIGHT", items=items, notes=notes.group(1) if notes else None,
+    )
+    event = ParsedEvent(type=ev_type, reference_order_id=ref.group(0).upper() if ref else None)
+    return order, event, round(max(0.0, min(score, 1.0)), 2)
@@ -0,0 +1,131 @@
+import asyncio, os, zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from multiprocessing import get_context
+from tempfile import SpooledTemporaryFile
+from time import perf_counter
+from types import SimpleNamespace
+from sqlalchemy import select
+from . import models, pdf_cache, metrics
+from .profile import service as profile_service
+
+# Month-end invoice runs: every order's data comes from a handful of set-based
+# queries (the profile comes from the cached profile service), PDFs already in pdf_cache are reused, and the rest are rendered in a
+# process pool (ReportLab is CPU-bound and holds the GIL). Jobs carry plain
+# SimpleNamespace rows so they pickle cheaply.
+# Each worker is a full interpreter with ReportLab loaded (~60 MB), so the
+# default is the CPUs this process may use (not os.cpu_count(), the host's in a
+# container) capped at 2, which fits small instances; raise INVOICE_WORKERS on big ones.
+INVOICE_WORKERS = int(os.getenv("INVOICE_WORKERS", "0")) or min(2, len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1)
+INVOICE_BATCH_MAX = int(os.getenv("INVOICE_BATCH_MAX", "1000"))
+
+_pool = None
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        # spawn: forking a process that runs an event loop and DB pools is unsafe
+        _pool = ProcessPoolExecutor(INVOICE_WORKERS, mp_context=get_context("spawn"))
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True); _pool = None
+
+def ns(obj, fields):
+    return SimpleNamespace(**{f: getattr(obj, f) for f in fields})
+
+async def load_jobs(db, stmt, title: str) -> list[dict]:
+    # stmt selects orders (already filtered/limited); 3 queries for any number of orders
+    rows = (await db.execute(
+        stmt.add_columns(models.Customer, models.OrderBalance.version)
+        .join(models.Customer, models.Customer.id==models.Order.customer_id)
+        .outerjoin(models.OrderBalance, models.OrderBalance.order_id==models.Order.id)
+        .order_by(models.Order.id)
+    )).all()
+    ids = [o.id for o, _, _ in rows]
+    items, payments = {i: [] for i in ids}, {i: [] for i in ids}
+    if ids:
+        for it in (await db.execute(select(models.OrderItem).where(models.OrderItem.order_id.in_(ids)).order_by(models.OrderItem.id))).scalars():
+            items[it.order_id].append(ns(it, ("name", "qty", "unit_price")))
+        for p in (await db.execute(select(models.Payment).where(models.Payment.order_id.in_(ids)))).scalars():
+            payments[p.order_id].append(ns(p, ("amount",)))
+    profile = await profile_service.get(db)
+    day = datetime.utcnow().date()
+    return [{
+        "order_id": o.id, "order_code": o.order_code, "title": title,
+        "key": pdf_cache.pdf_key(o, version, c, profile, title, day),
+        "order": ns(o, ("order_code",)), "customer": ns(c, ("name", "phone", "address")),
+        "items": items[o.id], "payments": payments[o.id], "profile": profile,
+    } for o, c, version in rows]
+
+def render(job: dict) -> bytes:
+    # runs in a pool worker
+    from .invoice_pdf import generate_invoice_pdf
+    return generate_invoice_pdf(job["order"], job["items"], job["customer"], payments=job["payments"], title=job["title"], profile=job["profile"])
+
+def render_timed(job: dict) -> tuple[bytes, float]:
+    # render time is measured in the worker; the parent's metrics only see the result
+    t0 = perf_counter()
+    pdf = render(job)
+    return pdf, perf_counter() - t0
+
+async def render_all(jobs, pool=None):
+    # yields (job, pdf) in job order; renders run concurrently across the pool
+    loop = asyncio.get_running_loop()
+    pool = pool or get_pool()
+    pending = []
+    for j in jobs:
+        pdf = pdf_cache.get(j["order_id"], j["key"])
+        pending.append(pdf if pdf is not None else loop.run_in_executor(pool, render_timed, j))
+    try:
+        for j, p in zip(jobs, pending):
+            if isinstance(p, bytes):
+                yield j, p; continue
+            pdf, seconds = await p
+            metrics.PDF_SECONDS.observe(seconds, "batch")
+            pdf_cache.put(j["order_id"], j["key"], pdf)
+            yield j, pdf
+    finally:
+        for p in pending:
+            if not isinstance(p, bytes): p.cancel()
+
+class _Sink:
+    # write-only file for ZipFile; drained after every member so the archive streams
+    def __init__(self):
+        self.buf, self.pos = [], 0
+
+    def write(self, b):
+        self.buf.append(bytes(b)); self.pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        out = b"".join(self.buf); self.buf.clear()
+        return out
+
+async def stream_zip(jobs, pool=None):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_STORED) as zf:  # PDFs are already compressed
+        async for j, pdf in render_all(jobs, pool):
+            zf.writestr(f"{j['title'].lower()}-{j['order_code']}.pdf", pdf)
+            yield sink.drain()
+    yield sink.drain()
+
+async def merged_pdf(jobs, pool=None):
+    from pypdf import PdfReader, PdfWriter
+    w = PdfWriter()
+    async for _, pdf in render_all(jobs, pool):
+        w.append(PdfReader(BytesIO(pdf)))
+    def save():
+        out = SpooledTemporaryFile(max_size=8 << 20)
+        w.write(out); out.seek(0)
+        return out
+    return await asyncio.to_thread(save)
@@ -1,49 +1,125 @@
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from io import BytesIO
+from functools import lru_cache
 from datetime import datetime
-import urllib.request
+from . import logo_cache
+from .utils import LRU
+from .pdf_cache import PROFILE_FIELDS
+
+# Invoice/receipt template: everything that depends only on the company profile
+# (header, logo, bank footer, table header) is a Layout, built once per profile
+# and drawn into PDF form XObjects that every page references. A render adds the
+# per-order parts: title block, item rows (paginated, with page subtotals and
+# "carried forward" lines) and totals.
 
 HEADER_Y = 820
 LEFT_X = 40
 RIGHT_X = 560
+QTY_X = 480
+UNIT_X = 520
+ROW_H = 16
+TABLE_Y = 670       # table header baseline, first page
+CONT_TABLE_Y = 740  # table header baseline, continuation pages
+FOOTER_Y = 80
+PAGE_NO_Y = 40
+SUBTOTAL_H = 36     # points under the last row: page subtotal + carried forward
+TOTALS_H = 76       # page subtotal + total + paid + balance
+NAME_W = QTY_X - LEFT_X - 40
+SUM_X = 470         # right edge of the subtotal/total labels (amounts can be wider than the Unit column)
 
-def draw_key_value(c, x, y, k, v):
-    c.drawString(x, y, f"{k}:")
-    c.drawRightString(RIGHT_X, y, v)
+@lru_cache(maxsize=4096)  # item names repeat across orders
+def fit(text: str, width: float, font="Helvetica", size=10) -> str:
+    text = text or ""
+    if stringWidth(text, font, size) <= width:
+        return text
+    lo, hi = 0, len(text)  # longest prefix that fits with the ellipsis
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if stringWidth(text[:mid] + "...", font, size) <= width: lo = mid
+        else: hi = mid - 1
+    return text[:lo] + "..."
+
+def money(v: float) -> str:
+    return f"{v:.2f}"
+
+class Layout:
+    def __init__(self, profile, logo: bytes | None):
+        p = lambda f: getattr(profile, f, None) if profile else None
+        self.logo = ImageReader(BytesIO(logo)) if logo else None
+        self.company = p("company_name") or ""
+        self.header_lines = [l[:90] for l in (
+            f"Reg: {p('registration_no')}" if p("registration_no") else None,
+            p("address"),
+            f"Phone: {p('phone')}" if p("phone") else None,
+            f"Email: {p('email')}" if p("email") else None,
+        ) if l]
+        self.footer_lines = []
+        if p("bank_name") or p("bank_account_no"):
+            self.footer_lines.append(f"Bank: {p('bank_name') or ''}  Acc: {p('bank_account_no') or ''}  Name: {p('bank_account_name') or ''}")
+        if p("footer_note"):
+            self.footer_lines.append(p("footer_note"))
+        self.footer_lines = [l[:100] for l in self.footer_lines]
+        self.table_bottom = FOOTER_Y + 12 * len(self.footer_lines) + 10  # rows stay above this
+
+    def capacity(self, first: bool, below: int) -> int:
+        # item rows that fit under the table header, leaving `below` points for the closing lines
+        y = TABLE_Y if first else CONT_TABLE_Y - ROW_H  # continuation pages open with "Brought forward"
+        return int((y - 20 - below - self.table_bottom) // ROW_H)
 
-def draw_profile(c, profile):
-    y = HEADER_Y
-    if profile:
-        if getattr(profile, "logo_url", None):
-            try:
-                data = urllib.request.urlopen(profile.logo_url).read()
-                img = ImageReader(BytesIO(data))
-                c.drawImage(img, LEFT_X, y-40, width=120, height=40, preserveAspectRatio=True, mask='auto')
-            except Exception:
-                pass
+    def paginate(self, n: int) -> list[tuple[int, int]]:
+        # -> item index ranges per page; the last page keeps room for the totals block
+        pages, i = [], 0
+        while True:
+            first = not pages
+            if n - i <= self.capacity(first, TOTALS_H):
+                pages.append((i, n)); return pages
+            take = max(1, min(self.capacity(first, SUBTOTAL_H), n - i - 1))
+            pages.append((i, i + take)); i += take
+
+    def define_forms(self, c):
+        # once per document; pages then just reference them
+        c.beginForm("static")
+        if self.logo:
+            c.drawImage(self.logo, LEFT_X, HEADER_Y-40, width=120, height=40, preserveAspectRatio=True, mask='auto')
         c.setFont("Helvetica-Bold", 14)
-        c.drawRightString(RIGHT_X, y, getattr(profile, "company_name", "") or "")
+        c.drawRightString(RIGHT_X, HEADER_Y, self.company)
         c.setFont("Helvetica", 9)
-        lines = [
-            f"Reg: {profile.registration_no}" if getattr(profile, "registration_no", None) else None,
-            getattr(profile, "address", None),
-            f"Phone: {profile.phone}" if getattr(profile, "phone", None) else None,
-            f"Email: {profile.email}" if getattr(profile, "email", None) else None,
-        ]
-        y2 = y-16
-        for line in [l for l in lines if l]:
-            c.drawRightString(RIGHT_X, y2, line[:90])
-            y2 -= 12
+        for i, line in enumerate(self.header_lines):
+            c.drawRightString(RIGHT_X, HEADER_Y - 16 - 12*i, line)
+        for i, line in enumerate(self.footer_lines):
+            c.drawString(LEFT_X, FOOTER_Y + 12*i, line)
+        c.endForm()
 
-def generate_invoice_pdf(order, items, customer, payments=None, title="INVOICE", profile=None) -> bytes:
-    buf = BytesIO()
-    c = canvas.Canvas(buf, pagesize=A4)
-    c.setTitle(title)
+        c.beginForm("thead")  # drawn at y=0, translated into place
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(LEFT_X, 0, "Item")
+        c.drawRightString(QTY_X, 0, "Qty")
+        c.drawRightString(UNIT_X, 0, "Unit")
+        c.drawRightString(RIGHT_X, 0, "Total")
+        c.line(LEFT_X, -5, RIGHT_X, -5)
+        c.endForm()
+
+    def table_header(self, c, y):
+        c.saveState(); c.translate(0, y); c.doForm("thead"); c.restoreState()
 
-    draw_profile(c, profile)
+_layouts = LRU(32)
 
+def layout_for(profile) -> Layout:
+    logo = logo_cache.get(getattr(profile, "logo_url", None)) if profile else None
+    key = (tuple(getattr(profile, f, None) for f in PROFILE_FIELDS) if profile else None, logo)
+    lay = _layouts.get(key)
+    if lay is None:
+        lay = Layout(profile, logo); _layouts.put(key, lay)
+    return lay
+
+def draw_key_value(c, x, y, k, v):
+    c.drawString(x, y, f"{k}:")
+    c.drawRightString(RIGHT_X, y, v)
+
+def draw_order_block(c, order, customer, title):
     c.setFont("Helvetica-Bold", 16)
     c.drawString(LEFT_X, 760, f"{title} #{order.order_code}")
     c.setFont("Helvetica", 10)
@@ -54,51 +130,63 @@ def generate_invoice_pdf(order, items, customer, payments=None, title="INVOICE",
     if getattr(customer, "address", None):
         c.drawString(LEFT_X, 697, f"Address: {customer.address[:90]}")
 
-    y = 670
-    c.setFont("Helvetica-Bold", 11)
-    c.drawString(LEFT_X, y, "Item")
-    c.drawRightString(480, y, "Qty")
-    c.drawRightString(520, y, "Unit")
-    c.drawRightString(RIGHT_X, y, "Total")
-    c.line(LEFT_X, y-5, RIGHT_X, y-5)
+def generate_invoice_pdf(order, items, customer, payments=None, title="INVOICE", profile=None) -> bytes:
+    lay = layout_for(profile)
+    buf = BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    c.setTitle(title)
+    lay.define_forms(c)
+
+    pages = lay.paginate(len(items))
+    total = 0.0
+    for pno, (start, end) in enumerate(pages, 1):
+        last = pno == len(pages)
+        c.doForm("static")
+        if pno == 1:
+            draw_order_block(c, order, customer, title); y = TABLE_Y
+        else:
+            c.setFont("Helvetica-Bold", 12)
+            c.drawString(LEFT_X, 760, f"{title} #{order.order_code} (continued)"); y = CONT_TABLE_Y
+        lay.table_header(c, y)
 
-    c.setFont("Helvetica", 10)
-    total = 0
-    y -= 20
-    for it in items:
-        line_total = float(it.unit_price) * it.qty
-        total += line_total
-        c.drawString(LEFT_X, y, it.name)
-        c.drawRightString(480, y, str(it.qty))
-        c.drawRightString(520, y, f"{float(it.unit_price):.2f}")
-        c.drawRightString(RIGHT_X, y, f"{line_total:.2f}")
-        y -= 16
-
-    c.line(400, y-5, RIGHT_X, y-5)
-    c.setFont("Helvetica-Bold", 12)
-    c.drawRightString(520, y-20, "Total")
-    c.drawRightString(RIGHT_X, y-20, f"{total:.2f}")
-
-    if payments:
-        paid = sum(float(getattr(p, "amount", 0)) for p in payments)
         c.setFont("Helvetica", 10)
-        c.drawRightString(520, y-40, "Paid")
-        c.drawRightString(RIGHT_X, y-40, f"{paid:.2f}")
-        c.setFont("Helvetica-Bold", 12)
-        c.drawRightString(520, y-60, "Balance")
-        c.drawRightString(RIGHT_X, y-60, f"{(total-paid):.2f}")
+        y -= 20
+        if pno > 1:
+            c.drawString(LEFT_X, y, "Brought forward"); c.drawRightString(RIGHT_X, y, money(total)); y -= ROW_H
+        page_total = 0.0
+        for it in items[start:end]:
+            line_total = float(it.unit_price) * it.qty
+            page_total += line_total
+            c.drawString(LEFT_X, y, fit(it.name, NAME_W))
+            c.drawRightString(QTY_X, y, str(it.qty))
+            c.drawRightString(UNIT_X, y, money(float(it.unit_price)))
+            c.drawRightString(RIGHT_X, y, money(line_total))
+            y -= ROW_H
+        total += page_total
 
-    if profile:
-        c.setFont("Helvetica", 9)
-        footer_y = 80
-        bank = []
-        if getattr(profile, "bank_name", None) or getattr(profile, "bank_account_no", None):
-            bank.append(f"Bank: {profile.bank_name or ''}  Acc: {profile.bank_account_no or ''}  Name: {profile.bank_account_name or ''}")
-        if getattr(profile, "footer_note", None):
-            bank.append(profile.footer_note)
-        for i, line in enumerate(bank):
-            c.drawString(LEFT_X, footer_y + i*12, line[:100])
-
-    c.showPage(); c.save()
-    buf.seek(0)
-    return buf.read()
+        c.line(360, y-5, RIGHT_X, y-5)
+        if len(pages) > 1:
+            c.setFont("Helvetica", 10)
+            c.drawRightString(SUM_X, y-20, "Page subtotal"); c.drawRightString(RIGHT_X, y-20, money(page_total)); y -= 16
+        if not last:
+            c.setFont("Helvetica-Bold", 10)
+            c.drawRightString(SUM_X, y-20, "Carried forward"); c.drawRightString(RIGHT_X, y-20, money(total))
+        else:
+            c.setFont("Helvetica-Bold", 12)
+            c.drawRightString(SUM_X, y-20, "Total")
+            c.drawRightString(RIGHT_X, y-20, money(total))
+            if payments:
+                paid = sum(float(getattr(p, "amount", 0)) for p in payments)
+                c.setFont("Helvetica", 10)
+                c.drawRightString(SUM_X, y-40, "Paid")
+                c.drawRightString(RIGHT_X, y-40, money(paid))
+                c.setFont("Helvetica-Bold", 12)
+                c.drawRightString(SUM_X, y-60, "Balance")
+                c.drawRightString(RIGHT_X, y-60, money(total-paid))
+
+        if len(pages) > 1:
+            c.setFont("Helvetica", 8)
+            c.drawRightString(RIGHT_X, PAGE_NO_Y, f"Page {pno} of {len(pages)}")
+        c.showPage()
+    c.save()
+    return buf.getvalue()
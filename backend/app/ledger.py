@@ -0,0 +1,83 @@
+import argparse, sys
+from sqlalchemy import select, func, or_
+from sqlalchemy.dialects.postgresql import insert
+from . import models
+
+# order_balances2 holds total/paid/balance per order, kept in step with
+# order_items2/payments2 by bump() inside the writing transaction. Every bump
+# also advances the row's version, which keys the rendered-PDF cache.
+
+def bump_stmt(order_id: int, total: float = 0, paid: float = 0):
+    t = models.OrderBalance.__table__.c
+    stmt = insert(models.OrderBalance).values(order_id=order_id, total=total, paid=paid, balance=total - paid)
+    return stmt.on_conflict_do_update(
+        index_elements=[t.order_id],
+        set_={"total": t.total + stmt.excluded.total, "paid": t.paid + stmt.excluded.paid, "balance": t.balance + stmt.excluded.balance,
+              "version": t.version + 1},
+    ).returning(t.total, t.paid, t.balance)
+
+async def bump(db, order_id: int, total: float = 0, paid: float = 0):
+    return (await db.execute(bump_stmt(order_id, total=total, paid=paid))).one()
+
+async def bump_many(db, paid: dict[int, float]):
+    # {order_id: amount} -> one multi-row upsert; ids must be unique within a statement
+    if not paid: return
+    t = models.OrderBalance.__table__.c
+    stmt = insert(models.OrderBalance).values([{"order_id": k, "total": 0, "paid": v, "balance": -v} for k, v in paid.items()])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[t.order_id],
+        set_={"paid": t.paid + stmt.excluded.paid, "balance": t.balance + stmt.excluded.balance, "version": t.version + 1},
+    ))
+
+def expected_stmt():
+    items = (select(models.OrderItem.order_id, func.sum(models.OrderItem.unit_price*models.OrderItem.qty).label("total"))
+             .group_by(models.OrderItem.order_id).subquery())
+    pays = (select(models.Payment.order_id, func.sum(models.Payment.amount).label("paid"))
+            .group_by(models.Payment.order_id).subquery())
+    total = func.coalesce(items.c.total, 0); paid = func.coalesce(pays.c.paid, 0)
+    return (
+        select(models.Order.id.label("order_id"), total.label("total"), paid.label("paid"), (total - paid).label("balance"))
+        .outerjoin(items, items.c.order_id==models.Order.id)
+        .outerjoin(pays, pays.c.order_id==models.Order.id)
+    )
+
+def fill_stmt():
+    # rows for orders that have none; schema.apply runs it when it creates the table
+    return insert(models.OrderBalance).from_select(["order_id", "total", "paid", "balance"], expected_stmt()).on_conflict_do_nothing()
+
+def verify(db) -> list[dict]:
+    exp = expected_stmt().subquery()
+    b = models.OrderBalance
+    stmt = (
+        select(exp.c.order_id, exp.c.total, exp.c.paid, b.total.label("ledger_total"), b.paid.label("ledger_paid"))
+        .outerjoin(b, b.order_id==exp.c.order_id)
+        .where(or_(b.order_id.is_(None), b.total != exp.c.total, b.paid != exp.c.paid))
+        .order_by(exp.c.order_id)
+    )
+    return [dict(r._mapping) for r in db.execute(stmt)]
+
+def rebuild(db) -> list[dict]:
+    drift = verify(db)
+    t = models.OrderBalance.__table__.c
+    stmt = insert(models.OrderBalance).from_select(["order_id", "total", "paid", "balance"], expected_stmt())
+    stmt = stmt.on_conflict_do_update(index_elements=[t.order_id], set_={"total": stmt.excluded.total, "paid": stmt.excluded.paid, "balance": stmt.excluded.balance, "version": t.version + 1})
+    db.execute(stmt)
+    db.commit()
+    return drift
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m app.ledger", description="Verify or rebuild order_balances2")
+    ap.add_argument("command", choices=["verify", "rebuild"])
+    args = ap.parse_args(argv)
+    from .db import SessionLocal, engine
+    from .schema import ensure
+    ensure(engine)
+    with SessionLocal() as db:
+        drift = verify(db) if args.command == "verify" else rebuild(db)
+    for d in drift:
+        print(f"order_id={d['order_id']} expected total={d['total']} paid={d['paid']} ledger total={d['ledger_total']} paid={d['ledger_paid']}")
+    print(f"{len(drift)} order(s) drifted" + (", rebuilt" if args.command == "rebuild" else ""))
+    return 1 if drift and args.command == "verify" else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
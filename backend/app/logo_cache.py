@@ -0,0 +1,96 @@
+import hashlib, os, tempfile, threading, time, urllib.request
+from io import BytesIO
+
+# Company logos for the PDF header: fetched once per URL (with a timeout),
+# downscaled to fit the 120x40pt draw box at LOGO_SCALE px per point, kept as
+# PNG in memory and in LOGO_CACHE_DIR, and refetched after LOGO_TTL. A failed
+# fetch is remembered for LOGO_FAIL_TTL so a dead host costs one timeout per
+# window instead of one per render; a previously good image keeps being used.
+LOGO_TTL = float(os.getenv("LOGO_TTL", "86400"))
+LOGO_FAIL_TTL = float(os.getenv("LOGO_FAIL_TTL", "60"))
+LOGO_TIMEOUT = float(os.getenv("LOGO_TIMEOUT", "3"))
+LOGO_MAX_BYTES = int(os.getenv("LOGO_MAX_BYTES", str(5 * 1024 * 1024)))
+LOGO_SCALE = int(os.getenv("LOGO_SCALE", "3"))
+LOGO_CACHE_DIR = os.getenv("LOGO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "oms-logo-cache"))
+BOX = (120, 40)
+
+_mem: dict[str, tuple[float, bytes | None, float]] = {}  # url -> (fetched_at, png, failed_at)
+_locks: dict[str, threading.Lock] = {}
+_guard = threading.Lock()
+
+def _path(url: str) -> str:
+    return os.path.join(LOGO_CACHE_DIR, hashlib.sha256(url.encode()).hexdigest() + ".png")
+
+def fetch(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=LOGO_TIMEOUT) as r:
+        data = r.read(LOGO_MAX_BYTES + 1)
+    if len(data) > LOGO_MAX_BYTES:
+        raise ValueError("logo too large")
+    return data
+
+def downscale(data: bytes) -> bytes:
+    from PIL import Image  # imported on first fetch (cold start)
+    img = Image.open(BytesIO(data))
+    img.load()
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+    img.thumbnail((BOX[0] * LOGO_SCALE, BOX[1] * LOGO_SCALE), Image.LANCZOS)
+    out = BytesIO()
+    img.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+def _from_disk(url: str):
+    try:
+        p = _path(url)
+        age = time.time() - os.path.getmtime(p)
+        with open(p, "rb") as f:
+            return f.read(), age
+    except OSError:
+        return None, None
+
+def _to_disk(url: str, png: bytes):
+    if not LOGO_CACHE_DIR: return
+    try:
+        os.makedirs(LOGO_CACHE_DIR, exist_ok=True)
+        p = _path(url); tmp = f"{p}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(png)
+        os.replace(tmp, p)
+    except OSError:
+        pass
+
+def get(url: str | None) -> bytes | None:
+    # -> downscaled PNG bytes, or None if there is no usable logo
+    if not url: return None
+    now = time.monotonic()
+    hit = _mem.get(url)
+    if hit and (now - hit[0] < LOGO_TTL or now - hit[2] < LOGO_FAIL_TTL):
+        return hit[1]
+    with _guard:
+        lock = _locks.setdefault(url, threading.Lock())
+    with lock:  # one fetch per URL; concurrent renders wait for it
+        hit = _mem.get(url)
+        if hit and (now - hit[0] < LOGO_TTL or now - hit[2] < LOGO_FAIL_TTL):
+            return hit[1]
+        old = hit[1] if hit else None
+        if not hit and LOGO_CACHE_DIR:
+            old, age = _from_disk(url)
+            if old is not None and age < LOGO_TTL:
+                _mem[url] = (time.monotonic() - age, old, float("-inf"))
+                return old
+        try:
+            png = downscale(fetch(url))
+        except Exception:
+            _mem[url] = (hit[0] if hit else float("-inf"), old, time.monotonic())
+            return old
+        _mem[url] = (time.monotonic(), png, float("-inf"))
+        _to_disk(url, png)
+        return png
+
+def clear(url: str | None = None):
+    for u in ([url] if url else list(_mem)):
+        _mem.pop(u, None)
+        try:
+            os.unlink(_path(u))
+        except OSError:
+            pass
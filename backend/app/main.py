@@ -1,20 +1,48 @@
-import os
+import importlib, os
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from time import perf_counter
 from fastapi import FastAPI, Depends, HTTPException, Response, Query, Request
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, or_, text as sqltext
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
 
-from .db import SessionLocal, engine
+from .db import SessionLocal, AsyncSessionLocal, engine, DATABASE_URL
 from . import models
 from .schemas import ParseRequest, ParseResponse, ParsedOrder, ParsedEvent, OrderUpdate, OrderSummary, EventIn
-from .parser import parse_text
-from .utils import sha256_text, norm_phone
-from .invoice_pdf import generate_invoice_pdf
-from .export_excel import orders_to_excel
-
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="OMS FastAPI")
+from .parse_cache import cached_parse, cached_parse_many
+from .parser import ModelError
+from . import catalog
+from .utils import norm_phone
+from .export_excel import orders_to_excel_file, iter_file
+from .queries import order_summary_stmt, order_summaries, iter_order_summaries, outstanding_only, filter_orders
+from . import ledger
+from . import codes
+from .pagination import paginate, paged, MAX_LIMIT
+from . import pdf_cache, invoice_batch, profile, bulk_import, customers, bank_import, schema, metrics, nplus1
+
+# reportlab, openpyxl, openai and pypdf are imported by the first request that
+# needs them, so a cold start only pays for what /api/health needs.
+# PRELOAD_MODULES=1 imports them during startup instead (always-on instances).
+PRELOAD_MODULES = os.getenv("PRELOAD_MODULES", "0").lower() in ("1", "true", "yes")
+HEAVY_MODULES = ("reportlab.pdfgen.canvas", "openpyxl", "openai", "pypdf", "app.invoice_pdf")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(schema.ensure, engine)
+    if PRELOAD_MODULES:
+        for m in HEAVY_MODULES: importlib.import_module(m)
+    async with AsyncSessionLocal() as db:
+        await catalog.index.refresh(db)
+    await profile.service.listen(DATABASE_URL)
+    yield
+    await profile.service.close()
+    invoice_batch.shutdown_pool()
+
+app = FastAPI(title="OMS FastAPI", lifespan=lifespan)
 
 ALLOW = os.getenv("CORS_ORIGIN", "http://localhost:3000").split(",")
 app.add_middleware(
@@ -25,12 +53,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
+if metrics.METRICS:
+    app.add_middleware(metrics.MetricsMiddleware)
+if nplus1.NPLUS1_DETECT in ("warn", "raise"):
+    app.add_middleware(nplus1.NPlusOneMiddleware)
+
+# A failed model call is the upstream's fault: answer 502/503/504 like any
+# handled error, instead of an unhandled 500 that also makes uvicorn drop the
+# keep-alive connection (and whatever the client queued on it).
+@app.exception_handler(ModelError)
+async def model_error(request: Request, e: ModelError):
+    return JSONResponse({"detail": str(e)}, status_code=e.status)
+
+@app.exception_handler(codes.CodeTaken)
+async def code_taken(request: Request, e: codes.CodeTaken):
+    return JSONResponse({"detail": str(e)}, status_code=409)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+INTAKE_BATCH_MAX = int(os.getenv("INTAKE_BATCH_MAX", "200"))
+INTAKE_BATCH_CONCURRENCY = int(os.getenv("INTAKE_BATCH_CONCURRENCY", "8"))
 
 STATUS_MAP = {
     "RETURN": "RETURNED",
@@ -39,70 +83,62 @@ STATUS_MAP = {
     "BUYBACK": "CANCELLED",
 }
 
-def totals_for_order(db: Session, order: models.Order):
-    items = db.execute(select(models.OrderItem).where(models.OrderItem.order_id==order.id)).scalars().all()
+async def totals_for_order(db: AsyncSession, order: models.Order):
+    items = (await db.execute(select(models.OrderItem).where(models.OrderItem.order_id==order.id))).scalars().all()
     total = sum(float(i.unit_price)*i.qty for i in items)
-    paid = db.execute(select(func.coalesce(func.sum(models.Payment.amount),0)).where(models.Payment.order_id==order.id)).scalar() or 0.0
+    paid = (await db.execute(select(func.coalesce(func.sum(models.Payment.amount),0)).where(models.Payment.order_id==order.id))).scalar() or 0.0
     balance = float(total) - float(paid)
     return total, paid, balance, items
 
-def apply_item_defaults(db: Session, name: str, sku: str | None, unit_price: float | None):
-    if sku:
-        prod = db.get(models.Product, sku)
-        if prod and (unit_price is None or float(unit_price) == 0):
-            unit_price = float(prod.default_price or 0)
-        return sku, unit_price or 0.0, name
-    alias = db.execute(select(models.ProductAlias).where(models.ProductAlias.alias.ilike(name))).scalar_one_or_none()
-    if alias:
-        prod = db.get(models.Product, alias.sku)
-        return alias.sku, float(prod.default_price or 0) if prod else (unit_price or 0.0), name
-    prod = db.execute(select(models.Product).where(models.Product.name.ilike(name))).scalar_one_or_none()
-    if prod:
-        return prod.sku, float(prod.default_price or 0), prod.name
-    return sku or "", unit_price or 0.0, name
-
-def get_profile(db: Session) -> models.CompanyProfile | None:
-    return db.execute(select(models.CompanyProfile).where(models.CompanyProfile.id==1)).scalar_one_or_none()
+async def apply_item_defaults(db: AsyncSession, lines):
+    # lines: [(name, sku, unit_price)] -> [(sku, unit_price, name)]; DB is only touched when the index is stale.
+    await catalog.index.ensure(db)
+    return [catalog.index.resolve(*li) for li in lines]
+
+async def get_profile(db: AsyncSession):
+    return await profile.service.get(db)
 
 # -------- Health (compat with Node) --------
 @app.get("/api/health")
 async def api_health():
     return {"ok": True}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_text():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/api/db-health")
-async def api_db_health(db: Session = Depends(get_db)):
-    r = db.execute(sqltext("select now() as now")).mappings().first()
+async def api_db_health(db: AsyncSession = Depends(get_db)):
+    r = (await db.execute(sqltext("select now() as now"))).mappings().first()
     return {"ok": True, "db_time": str(r["now"])}
 
 # -------- OpenAI intake (/api compatible) --------
 @app.post("/api/intake/parse", response_model=dict)
-async def api_intake_parse(req: dict, request: Request, db: Session = Depends(get_db)):
+async def api_intake_parse(req: dict, request: Request, db: AsyncSession = Depends(get_db)):
     text = (req.get("text") or req.get("message") or "").strip()
     if not text:
         raise HTTPException(400, "Provide { text }")
     auto_create = str(request.query_params.get("create", req.get("auto_create","true"))).lower() == "true"
 
-    parsed_order, parsed_event = await parse_text(text)
+    parsed_order, parsed_event, source = await cached_parse(db, text)
     parsed_order.phone = norm_phone(parsed_order.phone)
+    duplicate = source == "cache"
 
     if not auto_create:
-        return {"parsed": parsed_order.model_dump(), "created": False}
+        return {"parsed": parsed_order.model_dump(), "created": False, "duplicate": duplicate, "source": source}
 
     # Create immediately
-    cust = None
-    if parsed_order.phone:
-        cust = db.execute(select(models.Customer).where(models.Customer.phone==parsed_order.phone)).scalar_one_or_none()
-    if not cust:
-        cust = models.Customer(name=parsed_order.name, phone=parsed_order.phone, address=parsed_order.address)
-        db.add(cust); db.flush()
+    cust_id = await customers.upsert(db, parsed_order.name, parsed_order.phone, parsed_order.address)
 
-    code = parsed_order.order_id or f"ORD{(db.execute(select(func.count(models.Order.id))).scalar() or 0)+1:06d}"
-    o = models.Order(order_code=code, customer_id=cust.id, type=parsed_order.type, notes=parsed_order.notes, status="CONFIRMED")
-    db.add(o); db.flush()
+    o = await codes.insert_order(db, parsed_order.order_id, customer_id=cust_id, type=parsed_order.type, notes=parsed_order.notes, status="CONFIRMED")
+    code = o.order_code
 
-    for it in parsed_order.items:
-        sku, price, nm = apply_item_defaults(db, it.name, it.sku, it.unit_price)
+    total = 0.0
+    resolved = await apply_item_defaults(db, [(it.name, it.sku, it.unit_price) for it in parsed_order.items])
+    for it, (sku, price, nm) in zip(parsed_order.items, resolved):
         db.add(models.OrderItem(order_id=o.id, sku=sku, name=nm, qty=it.qty, unit_price=price))
+        total += round(float(price), 2) * it.qty
+    await ledger.bump(db, o.id, total=total)
 
     # Event auto-status if provided
     if parsed_event.type != "NONE":
@@ -110,177 +146,292 @@ async def api_intake_parse(req: dict, request: Request, db: Session = Depends(ge
         new_status = STATUS_MAP.get(parsed_event.type)
         if new_status: o.status = new_status
 
-    db.commit()
-    return {"parsed": parsed_order.model_dump(), "created": True, "order_code": code}
+    await db.commit()
+    return {"parsed": parsed_order.model_dump(), "created": True, "order_code": code, "duplicate": duplicate, "source": source}
+
+@app.post("/api/intake/parse-batch", response_model=dict)
+async def api_intake_parse_batch(req: dict, request: Request, db: AsyncSession = Depends(get_db)):
+    texts = [(t or "").strip() for t in (req.get("texts") or req.get("messages") or [])]
+    if not texts or not all(texts):
+        raise HTTPException(400, "Provide { texts: [...] } with non-empty strings")
+    if len(texts) > INTAKE_BATCH_MAX:
+        raise HTTPException(413, f"At most {INTAKE_BATCH_MAX} texts per batch")
+    auto_create = str(request.query_params.get("create", req.get("auto_create","true"))).lower() == "true"
+
+    out, ok = [], []
+    for i, r in enumerate(await cached_parse_many(db, texts, INTAKE_BATCH_CONCURRENCY)):
+        if isinstance(r, Exception):
+            out.append({"index": i, "ok": False, "created": False, "error": str(r) or type(r).__name__}); continue
+        po, pe, source = r
+        po.phone = norm_phone(po.phone)
+        out.append({"index": i, "ok": True, "created": False, "parsed": po.model_dump(), "duplicate": source == "cache", "source": source})
+        ok.append((i, po, pe))
+    if not auto_create or not ok:
+        return {"results": out}
+
+    # Customers for the whole batch: one upsert statement
+    custs = dict(zip((i for i, _, _ in ok), await customers.upsert_many(db, [(po.name, po.phone, po.address) for _, po, _ in ok])))
+
+    # Catalog defaults for every line in the batch at once
+    resolved = iter(await apply_item_defaults(db, [(it.name, it.sku, it.unit_price) for _, po, _ in ok for it in po.items]))
+    fresh = iter(await codes.allocator.take(db, sum(1 for _, po, _ in ok if not po.order_id)))
+
+    # One transaction; a savepoint per order so one bad row doesn't sink the batch
+    for i, po, pe in ok:
+        lines = [next(resolved) for _ in po.items]
+        try:
+            async with db.begin_nested():
+                o = await codes.insert_order(db, po.order_id, fresh, customer_id=custs[i], type=po.type, notes=po.notes, status="CONFIRMED")
+                total = 0.0
+                for it, (sku, price, nm) in zip(po.items, lines):
+                    db.add(models.OrderItem(order_id=o.id, sku=sku, name=nm, qty=it.qty, unit_price=price))
+                    total += round(float(price), 2) * it.qty
+                await ledger.bump(db, o.id, total=total)
+                if pe.type != "NONE":
+                    db.add(models.Event(order_id=o.id, type=pe.type))
+                    new_status = STATUS_MAP.get(pe.type)
+                    if new_status: o.status = new_status
+                await db.flush()
+        except codes.CodeTaken as e:
+            out[i].update(ok=False, error=str(e)); continue
+        except SQLAlchemyError as e:
+            out[i].update(ok=False, error=str(getattr(e, "orig", None) or e)); continue
+        out[i].update(created=True, order_code=o.order_code)
+    await db.commit()
+    return {"results": out}
 
 # -------- Orders (compat endpoints + new) --------
 @app.post("/api/orders")
-async def api_create_order(payload: dict, db: Session = Depends(get_db)):
+async def api_create_order(payload: dict, db: AsyncSession = Depends(get_db)):
     name = payload.get("customer_name"); phone = payload.get("customer_phone_primary"); addr = payload.get("customer_address")
     order_type = payload.get("order_type","OUTRIGHT").replace("outright_purchase","OUTRIGHT").upper()
     line_items = payload.get("line_items", [])
     if not name or not phone or not line_items:
         raise HTTPException(400, "missing required fields")
-    cust = db.execute(select(models.Customer).where(models.Customer.phone==phone)).scalar_one_or_none()
-    if not cust:
-        cust = models.Customer(name=name, phone=phone, address=addr); db.add(cust); db.flush()
-    code = f"ORD{(db.execute(select(func.count(models.Order.id))).scalar() or 0)+1:06d}"
-    o = models.Order(order_code=code, customer_id=cust.id, type=order_type, status="CONFIRMED")
-    db.add(o); db.flush()
-    for li in line_items:
-        nm = li.get("description") or li.get("name")
-        qty = int(li.get("qty",1)); unit = float(li.get("unit_price_myr", li.get("unit_price", 0)) or 0)
-        sku = li.get("product_code") or li.get("sku") or ""
-        sku, unit, nm = apply_item_defaults(db, nm, sku, unit)
+    cust_id = await customers.upsert(db, name, phone, addr)
+    o = await codes.insert_order(db, customer_id=cust_id, type=order_type, status="CONFIRMED")
+    code = o.order_code
+    total = 0.0
+    lines = [(li.get("description") or li.get("name"), li.get("product_code") or li.get("sku") or "", float(li.get("unit_price_myr", li.get("unit_price", 0)) or 0)) for li in line_items]
+    for li, (sku, unit, nm) in zip(line_items, await apply_item_defaults(db, lines)):
+        qty = int(li.get("qty",1))
         db.add(models.OrderItem(order_id=o.id, sku=sku, name=nm, qty=qty, unit_price=unit))
-    db.commit()
+        total += round(float(unit), 2) * qty
+    await ledger.bump(db, o.id, total=total)
+    await db.commit()
     return {"order_code": code}
 
+def api_order_row(r):
+    return {"order_code": r["order_code"], "order_type": r["type"], "status": r["status"], "created_at": r["created_at"].isoformat(), "customer_name": r["customer"], "total_myr": r["total"]}
+
+def api_outstanding_row(r):
+    return {"order_code": r["order_code"], "customer_name": r["customer"], "phone": r["phone"], "order_type": r["type"], "status": r["status"], "total_myr": r["total"], "paid_myr": r["paid"], "balance_myr": r["balance"]}
+
+# List endpoints: passing `limit` and/or `cursor` returns {"items", "next_cursor"};
+# without them the legacy bare-list response is kept for the current frontend.
+
 @app.get("/api/orders")
-async def api_list_orders(db: Session = Depends(get_db)):
-    orders = db.execute(select(models.Order).order_by(models.Order.id.desc()).limit(100)).scalars().all()
-    out = []
-    for o in orders:
-        total, paid, balance, _ = totals_for_order(db, o)
-        c = db.execute(select(models.Customer).where(models.Customer.id==o.customer_id)).scalar_one()
-        out.append({"order_code": o.order_code, "order_type": o.type, "status": o.status, "created_at": o.created_at.isoformat(), "customer_name": c.name, "total_myr": total})
-    return out
+async def api_list_orders(limit: int | None = Query(None, ge=1, le=MAX_LIMIT), cursor: str | None = None, db: AsyncSession = Depends(get_db)):
+    if limit is None and cursor is None:
+        rows = await order_summaries(db, order_summary_stmt().order_by(models.Order.id.desc()).limit(100))
+        return [api_order_row(r) for r in rows]
+    rows, next_cursor = await paginate(db, order_summary_stmt(), models.Order.id, cursor, limit or 100)
+    return paged([api_order_row(r) for r in rows], next_cursor)
 
 @app.post("/api/transactions")
-async def api_add_transaction(payload: dict, db: Session = Depends(get_db)):
+async def api_add_transaction(payload: dict, db: AsyncSession = Depends(get_db)):
     code = payload.get("order_code"); amount = float(payload.get("amount_myr", payload.get("amount", 0)) or 0); method = payload.get("method","CASH")
     if not code or amount <= 0:
         raise HTTPException(400, "order_code and amount required")
-    o = db.execute(select(models.Order).where(models.Order.order_code==code)).scalar_one_or_none()
+    o = (await db.execute(select(models.Order).where(models.Order.order_code==code))).scalar_one_or_none()
     if not o: raise HTTPException(404, "Order not found")
-    db.add(models.Payment(order_id=o.id, amount=amount, method=method)); db.commit()
+    db.add(models.Payment(order_id=o.id, amount=amount, method=method))
+    await ledger.bump(db, o.id, paid=amount); await db.commit()
+    pdf_cache.invalidate(o.id)
     return {"ok": True}
 
 @app.get("/api/outstanding")
-async def api_outstanding(type: str | None = Query(None), overdue_only: bool = Query(False), db: Session = Depends(get_db)):
-    stmt = select(models.Order).order_by(models.Order.id.desc())
+async def api_outstanding(type: str | None = Query(None), overdue_only: bool = Query(False),
+                          limit: int | None = Query(None, ge=1, le=MAX_LIMIT), cursor: str | None = None, db: AsyncSession = Depends(get_db)):
+    stmt = order_summary_stmt()
     if type: stmt = stmt.where(models.Order.type==type.upper())
-    orders = db.execute(stmt).scalars().all()
-    out = []
-    for o in orders:
-        total, paid, balance, _ = totals_for_order(db, o)
-        if not overdue_only or balance > 0.0:
-            c = db.execute(select(models.Customer).where(models.Customer.id==o.customer_id)).scalar_one()
-            out.append({"order_code": o.order_code, "customer_name": c.name, "phone": c.phone, "order_type": o.type, "status": o.status, "total_myr": total, "paid_myr": paid, "balance_myr": balance})
-    return out
+    if overdue_only: stmt = outstanding_only(stmt)
+    if limit is None and cursor is None:
+        return [api_outstanding_row(r) for r in await order_summaries(db, stmt.order_by(models.Order.id.desc()))]
+    rows, next_cursor = await paginate(db, stmt, models.Order.id, cursor, limit or 100)
+    return paged([api_outstanding_row(r) for r in rows], next_cursor)
 
 # ------- New endpoints from spec (no /api prefix also available) -------
 @app.post("/parse", response_model=ParseResponse)
-async def parse(req: ParseRequest, db: Session = Depends(get_db)):
-    h = sha256_text(req.text)
-    parsed_order, parsed_event = await parse_text(req.text)
+async def parse(req: ParseRequest, db: AsyncSession = Depends(get_db)):
+    parsed_order, parsed_event, source = await cached_parse(db, req.text)
     parsed_order.phone = norm_phone(parsed_order.phone)
     matched_code = None
     if parsed_order.phone:
-        o = db.execute(select(models.Order).join(models.Customer).where(models.Customer.phone==parsed_order.phone).order_by(models.Order.id.desc())).scalars().first()
+        o = (await db.execute(select(models.Order).join(models.Customer).where(models.Customer.phone_canonical==parsed_order.phone).order_by(models.Order.id.desc()))).scalars().first()
         if o: matched_code = o.order_code
-    return ParseResponse(parsed=parsed_order, event=parsed_event, matched_order_code=matched_code, duplicate=False)
+    return ParseResponse(parsed=parsed_order, event=parsed_event, matched_order_code=matched_code, duplicate=source == "cache", source=source)
 
 @app.post("/orders")
-async def create_order(order: ParsedOrder, db: Session = Depends(get_db)):
-    cust = None
-    if order.phone:
-        cust = db.execute(select(models.Customer).where(models.Customer.phone==order.phone)).scalar_one_or_none()
-    if not cust:
-        cust = models.Customer(name=order.name, phone=order.phone, address=order.address)
-        db.add(cust); db.flush()
-    code = order.order_id or f"ORD{(db.execute(select(func.count(models.Order.id))).scalar() or 0)+1:06d}"
-    o = models.Order(order_code=code, customer_id=cust.id, type=order.type, notes=order.notes, status="CONFIRMED")
-    db.add(o); db.flush()
-    for it in order.items:
-        sku, price, nm = apply_item_defaults(db, it.name, it.sku, it.unit_price)
+async def create_order(order: ParsedOrder, db: AsyncSession = Depends(get_db)):
+    cust_id = await customers.upsert(db, order.name, order.phone, order.address)
+    o = await codes.insert_order(db, order.order_id, customer_id=cust_id, type=order.type, notes=order.notes, status="CONFIRMED")
+    code = o.order_code
+    total = 0.0
+    resolved = await apply_item_defaults(db, [(it.name, it.sku, it.unit_price) for it in order.items])
+    for it, (sku, price, nm) in zip(order.items, resolved):
         db.add(models.OrderItem(order_id=o.id, sku=sku, name=nm, qty=it.qty, unit_price=price))
-    db.commit()
+        total += round(float(price), 2) * it.qty
+    await ledger.bump(db, o.id, total=total)
+    await db.commit()
     return {"order_code": code}
 
+@app.post("/orders/bulk")
+async def orders_bulk(request: Request, format: str | None = Query(None, pattern="^(csv|jsonl)$"), db: AsyncSession = Depends(get_db)):
+    # body: JSON lines or CSV (see bulk_import.py); format defaults from Content-Type
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "jsonl")
+    records = bulk_import.csv_records(request.stream()) if fmt == "csv" else bulk_import.jsonl_records(request.stream())
+    return await bulk_import.import_stream(db, records)
+
 @app.get("/orders")
-async def list_orders(q: str | None = None, status: str | None = None, db: Session = Depends(get_db)):
-    stmt = select(models.Order).join(models.Customer)
+async def list_orders(q: str | None = None, status: str | None = None,
+                      limit: int | None = Query(None, ge=1, le=MAX_LIMIT), cursor: str | None = None, db: AsyncSession = Depends(get_db)):
+    stmt = order_summary_stmt()
     if status: stmt = stmt.where(models.Order.status==status)
     if q:
         like = f"%{q}%"
         stmt = stmt.where(or_(models.Order.order_code.ilike(like), models.Customer.name.ilike(like), models.Customer.phone.ilike(like)))
-    stmt = stmt.order_by(models.Order.id.desc())
-    orders = db.execute(stmt).scalars().all()
-    out = []
-    for o in orders:
-        total, paid, balance, _ = totals_for_order(db, o)
-        c = db.execute(select(models.Customer).where(models.Customer.id==o.customer_id)).scalar_one()
-        out.append(OrderSummary(order_code=o.order_code, type=o.type, status=o.status, customer=c.name, phone=c.phone, total=total, paid=paid, balance=balance).model_dump())
-    return out
+    if limit is None and cursor is None:
+        return [OrderSummary(**r).model_dump() for r in await order_summaries(db, stmt.order_by(models.Order.id.desc()))]
+    rows, next_cursor = await paginate(db, stmt, models.Order.id, cursor, limit or 100)
+    return paged([OrderSummary(**r).model_dump() for r in rows], next_cursor)
+
+async def order_pdf(order_code: str, title: str, request: Request, db: AsyncSession):
+    # One query for what the cache key needs; items/payments are only loaded on a miss.
+    row = (await db.execute(
+        select(models.Order, models.Customer, models.OrderBalance.version)
+        .join(models.Customer, models.Customer.id==models.Order.customer_id)
+        .outerjoin(models.OrderBalance, models.OrderBalance.order_id==models.Order.id)
+        .where(models.Order.order_code==order_code)
+    )).one_or_none()
+    if not row: raise HTTPException(404, "Order not found")
+    o, cust, version = row
+    profile = await get_profile(db)
+    key = pdf_cache.pdf_key(o, version, cust, profile, title, datetime.utcnow().date())
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    if f'"{key}"' in (request.headers.get("if-none-match") or ""):
+        return Response(status_code=304, headers=headers)
+    pdf = pdf_cache.get(o.id, key)
+    if pdf is None:
+        _, _, _, items = await totals_for_order(db, o)
+        payments = (await db.execute(select(models.Payment).where(models.Payment.order_id==o.id))).scalars().all()
+        from .invoice_pdf import generate_invoice_pdf
+        t0 = perf_counter()
+        pdf = await run_in_threadpool(generate_invoice_pdf, o, items, cust, payments=payments, title=title, profile=profile)
+        metrics.PDF_SECONDS.observe(perf_counter() - t0, "single")
+        pdf_cache.put(o.id, key, pdf)
+    return Response(content=pdf, media_type="application/pdf", headers=headers)
 
 @app.get("/orders/{order_code}/invoice.pdf")
-async def invoice_pdf(order_code: str, db: Session = Depends(get_db)):
-    o = db.execute(select(models.Order).where(models.Order.order_code==order_code)).scalar_one_or_none()
-    if not o: raise HTTPException(404, "Order not found")
-    _, _, _, items = totals_for_order(db, o)
-    cust = db.execute(select(models.Customer).where(models.Customer.id==o.customer_id)).scalar_one()
-    payments = db.execute(select(models.Payment).where(models.Payment.order_id==o.id)).scalars().all()
-    profile = get_profile(db)
-    pdf = generate_invoice_pdf(o, items, cust, payments=payments, title="INVOICE", profile=profile)
-    return Response(content=pdf, media_type="application/pdf")
+async def invoice_pdf(order_code: str, request: Request, db: AsyncSession = Depends(get_db)):
+    return await order_pdf(order_code, "INVOICE", request, db)
 
 @app.get("/orders/{order_code}/receipt.pdf")
-async def receipt_pdf(order_code: str, db: Session = Depends(get_db)):
-    o = db.execute(select(models.Order).where(models.Order.order_code==order_code)).scalar_one_or_none()
-    if not o: raise HTTPException(404, "Order not found")
-    _, _, _, items = totals_for_order(db, o)
-    cust = db.execute(select(models.Customer).where(models.Customer.id==o.customer_id)).scalar_one()
-    payments = db.execute(select(models.Payment).where(models.Payment.order_id==o.id)).scalars().all()
-    profile = get_profile(db)
-    pdf = generate_invoice_pdf(o, items, cust, payments=payments, title="RECEIPT", profile=profile)
-    return Response(content=pdf, media_type="application/pdf")
+async def receipt_pdf(order_code: str, request: Request, db: AsyncSession = Depends(get_db)):
+    return await order_pdf(order_code, "RECEIPT", request, db)
+
+# -------- Company profile --------
+@app.get("/settings/profile")
+async def get_settings_profile(db: AsyncSession = Depends(get_db)):
+    p = await get_profile(db)
+    if p is None: raise HTTPException(404, "Profile not set")
+    return vars(p)
+
+@app.put("/settings/profile")
+async def put_settings_profile(payload: dict, db: AsyncSession = Depends(get_db)):
+    if not any(k in payload for k in pdf_cache.PROFILE_FIELDS):
+        raise HTTPException(400, f"Provide any of: {', '.join(pdf_cache.PROFILE_FIELDS)}")
+    try:
+        return vars(await profile.service.update(db, payload))
+    except SQLAlchemyError as e:
+        raise HTTPException(400, str(getattr(e, "orig", None) or e))
+
+@app.post("/invoices/batch")
+async def invoices_batch(payload: dict, db: AsyncSession = Depends(get_db)):
+    # { order_codes: [...] } or { status, type, date_from, date_to }; title INVOICE|RECEIPT; format zip|pdf
+    if any(payload.get(k) is not None and not isinstance(payload[k], str) for k in ("title", "format", "status", "type", "date_from", "date_to")):
+        raise HTTPException(400, "title, format, status, type, date_from and date_to must be strings")
+    order_codes = payload.get("order_codes")
+    if order_codes is not None and not (isinstance(order_codes, list) and all(isinstance(c, str) and c for c in order_codes)):
+        raise HTTPException(400, "order_codes must be a list of non-empty strings")
+    if order_codes and len(order_codes) > invoice_batch.INVOICE_BATCH_MAX:
+        raise HTTPException(413, f"At most {invoice_batch.INVOICE_BATCH_MAX} orders per batch")
+    title = (payload.get("title") or "INVOICE").upper(); fmt = payload.get("format") or "zip"
+    if title not in ("INVOICE", "RECEIPT") or fmt not in ("zip", "pdf"):
+        raise HTTPException(400, "title must be INVOICE|RECEIPT, format zip|pdf")
+    stmt = select(models.Order)
+    if order_codes:
+        stmt = stmt.where(models.Order.order_code.in_(order_codes))
+    else:
+        try:
+            d0, d1 = (date.fromisoformat(payload[k]) if payload.get(k) else None for k in ("date_from", "date_to"))
+        except ValueError:
+            raise HTTPException(400, "date_from/date_to must be YYYY-MM-DD")
+        stmt = filter_orders(stmt, payload.get("status"), payload.get("type"), d0, d1)
+    jobs = await invoice_batch.load_jobs(db, stmt.limit(invoice_batch.INVOICE_BATCH_MAX + 1), title)
+    if not jobs: raise HTTPException(404, "No matching orders")
+    if len(jobs) > invoice_batch.INVOICE_BATCH_MAX:
+        raise HTTPException(413, f"At most {invoice_batch.INVOICE_BATCH_MAX} orders per batch; narrow the filter")
+    name = f"{title.lower()}s-{datetime.utcnow():%Y%m%d}"
+    if fmt == "pdf":
+        f = await invoice_batch.merged_pdf(jobs)
+        return StreamingResponse(iter_file(f), media_type="application/pdf", headers={"Content-Disposition": f"attachment; filename={name}.pdf"})
+    return StreamingResponse(invoice_batch.stream_zip(jobs), media_type="application/zip", headers={"Content-Disposition": f"attachment; filename={name}.zip"})
 
 @app.post("/payments")
-async def add_payment(payload: dict, db: Session = Depends(get_db)):
+async def add_payment(payload: dict, db: AsyncSession = Depends(get_db)):
     order_code = payload.get("order_code"); amount = float(payload.get("amount",0)); method = payload.get("method","CASH")
-    o = db.execute(select(models.Order).where(models.Order.order_code==order_code)).scalar_one_or_none()
+    o = (await db.execute(select(models.Order).where(models.Order.order_code==order_code))).scalar_one_or_none()
     if not o: raise HTTPException(404, "Order not found")
     p = models.Payment(order_id=o.id, amount=amount, method=method)
-    db.add(p); db.commit()
-    total, paid, balance, _ = totals_for_order(db, o)
-    return {"payment_id": p.id, "total": total, "paid": paid, "balance": balance}
+    db.add(p); await db.flush()
+    total, paid, balance = await ledger.bump(db, o.id, paid=amount)
+    await db.commit()
+    pdf_cache.invalidate(o.id)
+    return {"payment_id": p.id, "total": float(total), "paid": float(paid), "balance": float(balance)}
+
+@app.post("/payments/import")
+async def payments_import(request: Request, dry_run: bool = Query(False), detail: bool = Query(False), db: AsyncSession = Depends(get_db)):
+    # body: bank statement CSV (see bank_import.py) -> reconciliation report
+    return await bank_import.import_stream(db, request.stream(), dry_run=dry_run, detail=detail)
 
 @app.post("/catalog/product")
-async def create_product(payload: dict, db: Session = Depends(get_db)):
+async def create_product(payload: dict, db: AsyncSession = Depends(get_db)):
     sku = payload["sku"]; name = payload["name"]; price = float(payload.get("default_price",0))
-    if db.get(models.Product, sku): raise HTTPException(409, "SKU exists")
-    db.add(models.Product(sku=sku, name=name, default_price=price)); db.commit(); return {"ok": True}
+    if await db.get(models.Product, sku): raise HTTPException(409, "SKU exists")
+    db.add(models.Product(sku=sku, name=name, default_price=price)); await db.commit()
+    catalog.index.add_product(sku, name, price)
+    return {"ok": True}
 
 @app.post("/catalog/alias")
-async def create_alias(payload: dict, db: Session = Depends(get_db)):
+async def create_alias(payload: dict, db: AsyncSession = Depends(get_db)):
     alias = payload["alias"]; sku = payload["sku"]
-    if not db.get(models.Product, sku): raise HTTPException(404, "SKU not found")
-    db.add(models.ProductAlias(alias=alias, sku=sku)); db.commit(); return {"ok": True}
+    if not await db.get(models.Product, sku): raise HTTPException(404, "SKU not found")
+    db.add(models.ProductAlias(alias=alias, sku=sku)); await db.commit()
+    catalog.index.add_alias(alias, sku)
+    return {"ok": True}
 
 @app.get("/suggest/items")
-async def suggest_items(q: str, db: Session = Depends(get_db)):
-    like = f"%{q}%"
-    prods = db.execute(select(models.Product).where(models.Product.name.ilike(like))).scalars().all()
-    aliases = db.execute(select(models.ProductAlias).where(models.ProductAlias.alias.ilike(like))).scalars().all()
-    out = []
-    for p in prods:
-        out.append({"sku": p.sku, "name": p.name, "default_price": float(p.default_price or 0)})
-    for a in aliases:
-        prod = db.get(models.Product, a.sku)
-        out.append({"sku": a.sku, "name": a.alias, "default_price": float((prod.default_price if prod else 0) or 0)})
-    return out[:20]
+async def suggest_items(q: str, limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+    await catalog.index.ensure(db)
+    return [{"sku": sku, "name": label, "default_price": catalog.index.price(sku)} for label, sku in catalog.index.suggest.search(q, limit)]
 
 @app.get("/export/excel")
-async def export_excel(db: Session = Depends(get_db)):
-    q = db.execute(
-        select(models.Order.order_code, models.Order.type, models.Order.status)
-    ).all()
-    rows = []
-    for (code, typ, status) in q:
-        o = db.execute(select(models.Order).where(models.Order.order_code==code)).scalar_one()
-        total, paid, balance, _ = totals_for_order(db, o)
-        c = db.execute(select(models.Customer).where(models.Customer.id==o.customer_id)).scalar_one()
-        rows.append({"order_code": code, "type": typ, "status": status, "customer": c.name, "phone": c.phone, "total": total, "paid": paid, "balance": balance})
-    x = orders_to_excel(rows)
-    return Response(content=x, media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=orders.xlsx"})
+async def export_excel(status: str | None = None, type: str | None = None, date_from: date | None = None, date_to: date | None = None):
+    stmt = filter_orders(order_summary_stmt(), status, type, date_from, date_to)
+    # Workbook writing is CPU-bound, so the whole export runs on a worker thread with a sync session.
+    def build():
+        with SessionLocal() as db:
+            return orders_to_excel_file(iter_order_summaries(db, stmt.order_by(models.Order.id)))
+    f = await run_in_threadpool(build)
+    return StreamingResponse(iter_file(f), media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", headers={"Content-Disposition": "attachment; filename=orders.xlsx"})
@@ -0,0 +1,168 @@
+import bisect, os, threading
+from contextvars import ContextVar
+from time import perf_counter
+from sqlalchemy import event
+
+# In-process metrics served as Prometheus text by GET /metrics. Each worker
+# process counts for itself (scrape each one, or run a single worker).
+#   http_*: MetricsMiddleware, per method + route template + status
+#   db_*: cursor events on both engines (instrument_engine, from db.py); per-request statement
+#         counts/time via the request's ContextVar, which run_in_threadpool and
+#         SQLAlchemy's greenlets both inherit
+#   db_pool_*: checkout wait, measured by the pool class from timed_pool()
+#   llm_*, pdf_*: observed at the call sites (parser.call_model, PDF rendering)
+# Observing is a bisect and a few adds under a lock. METRICS=0 leaves out the
+# middleware, the engine events and the pool timing.
+METRICS = os.getenv("METRICS", "1").lower() not in ("0", "false", "no")
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+_lock = threading.Lock()
+_metrics = []
+_request: ContextVar[list | None] = ContextVar("metrics_request", default=None)  # [statements, db seconds]
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names, values, extra="") -> str:
+    parts = [f'{k}="{_esc(v)}"' for k, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt(v) -> str:
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labels = name, help, labels
+        self.values: dict[tuple, float] = {}
+        _metrics.append(self)
+
+    def inc(self, *labels, v: float = 1):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0) + v
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} counter\n"
+        for k, v in list(self.values.items()):
+            yield f"{self.name}{_labels(self.labels, k)} {_fmt(v)}\n"
+
+class Gauge:
+    # value read at scrape time from fn() -> {labels: value}
+    def __init__(self, name: str, help: str, labels: tuple, fn):
+        self.name, self.help, self.labels, self.fn = name, help, labels, fn
+        _metrics.append(self)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} gauge\n"
+        for k, v in self.fn().items():
+            yield f"{self.name}{_labels(self.labels, k)} {_fmt(v)}\n"
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+        self.values: dict[tuple, list] = {}  # labels -> [count per bucket..., +Inf count, sum]
+        _metrics.append(self)
+
+    def observe(self, v: float, *labels):
+        i = bisect.bisect_left(self.buckets, v)
+        with _lock:
+            s = self.values.get(labels)
+            if s is None: s = self.values[labels] = [0] * (len(self.buckets) + 2)
+            s[i] += 1; s[-1] += v
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} histogram\n"
+        with _lock:
+            items = [(k, list(s)) for k, s in self.values.items()]
+        les = [f'le="{_fmt(b)}"' for b in self.buckets] + ['le="+Inf"']
+        for k, s in items:
+            acc = 0
+            for le, n in zip(les, s):
+                acc += n
+                yield f"{self.name}_bucket{_labels(self.labels, k, le)} {acc}\n"
+            yield f"{self.name}_sum{_labels(self.labels, k)} {_fmt(s[-1])}\n{self.name}_count{_labels(self.labels, k)} {acc}\n"
+
+def render() -> str:
+    return "".join(line for m in _metrics for line in m.render())
+
+# ---- metrics ----
+HTTP_SECONDS = Histogram("http_request_duration_seconds", "Request latency, including streaming the body", ("method", "route", "status"))
+HTTP_DB_STATEMENTS = Histogram("http_request_db_statements", "SQL statements per request", ("route",), COUNT_BUCKETS)
+HTTP_DB_SECONDS = Histogram("http_request_db_seconds", "Time in SQL statements per request", ("route",))
+DB_SECONDS = Histogram("db_statement_duration_seconds", "SQL statement execution time", ("engine", "op"))
+DB_ERRORS = Counter("db_statement_errors_total", "SQL statements that raised", ("engine",))
+POOL_WAIT = Histogram("db_pool_checkout_seconds", "Time to get a pooled connection (includes connecting)", ("engine",))
+LLM_SECONDS = Histogram("llm_request_duration_seconds", "Model call latency per attempt", ("model", "outcome"))
+LLM_TOKENS = Counter("llm_tokens_total", "Model tokens used", ("model", "kind"))
+PDF_SECONDS = Histogram("pdf_render_duration_seconds", "Invoice/receipt render time", ("path",))
+
+_pools = {}
+Gauge("db_pool_connections", "Pooled connections by state", ("engine", "state"),
+      lambda: {k: v for name, p in _pools.items() if hasattr(p, "checkedout")
+               for k, v in (((name, "checked_out"), p.checkedout()), ((name, "idle"), p.checkedin()))})
+
+# ---- HTTP ----
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            return await self.app(scope, receive, send)
+        status = [500]
+        async def send_status(message):
+            if message["type"] == "http.response.start": status[0] = message["status"]
+            await send(message)
+        req = [0, 0.0]; token = _request.set(req); t0 = perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            dt = perf_counter() - t0
+            _request.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")  # template, not the raw path
+            HTTP_SECONDS.observe(dt, scope["method"], route, status[0])
+            HTTP_DB_STATEMENTS.observe(req[0], route)
+            HTTP_DB_SECONDS.observe(req[1], route)
+
+# ---- SQL ----
+SQL_OPS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+def op(statement: str) -> str:
+    w = statement[:16].lstrip().split(None, 1)
+    w = w[0].upper() if w else ""
+    return w if w in SQL_OPS else "OTHER"
+
+def instrument_engine(engine, name: str):
+    # engine: a sync Engine (for the async one, pass .sync_engine)
+    if not METRICS: return
+    _pools[name] = engine.pool
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_t0 = perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        dt = perf_counter() - context._metrics_t0
+        DB_SECONDS.observe(dt, name, op(statement))
+        req = _request.get()
+        if req is not None:
+            req[0] += 1; req[1] += dt
+
+    @event.listens_for(engine, "handle_error")
+    def error(ctx):
+        DB_ERRORS.inc(name)
+
+def timed_pool(pool_cls, name: str):
+    # pool class whose checkouts are timed; pass as create_engine(poolclass=...)
+    if not METRICS: return pool_cls
+    class TimedPool(pool_cls):
+        def _do_get(self):
+            t0 = perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                POOL_WAIT.observe(perf_counter() - t0, name)
+    TimedPool.__name__ = f"Timed{pool_cls.__name__}"
+    return TimedPool
@@ -9,6 +9,7 @@ class Customer(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str] = mapped_column(String(200))
     phone: Mapped[str | None] = mapped_column(String(50), index=True)
+    phone_canonical: Mapped[str | None] = mapped_column(String(50), unique=True, index=True)  # utils.norm_phone(phone), see customers.py
     address: Mapped[str | None] = mapped_column(Text)
 
 class Order(Base):
@@ -37,6 +38,15 @@ class Payment(Base):
     amount: Mapped[float] = mapped_column(Numeric(12,2))
     method: Mapped[str] = mapped_column(String(50))
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    reference: Mapped[str | None] = mapped_column(String(64), unique=True, index=True)  # bank line fingerprint (bank_import)
+
+class OrderBalance(Base):
+    __tablename__ = "order_balances2"
+    order_id: Mapped[int] = mapped_column(ForeignKey("orders2.id"), primary_key=True)
+    total: Mapped[float] = mapped_column(Numeric(14,2), default=0)
+    paid: Mapped[float] = mapped_column(Numeric(14,2), default=0)
+    balance: Mapped[float] = mapped_column(Numeric(14,2), default=0, index=True)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")  # +1 per item/payment write (PDF cache key)
 
 class Event(Base):
     __tablename__ = "events2"
@@ -50,6 +60,9 @@ class Message(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     sha256: Mapped[str] = mapped_column(String(64))
     raw: Mapped[str] = mapped_column(Text)
+    model: Mapped[str | None] = mapped_column(String(100))
+    schema_version: Mapped[int | None] = mapped_column(Integer)
+    parsed: Mapped[str | None] = mapped_column(Text)  # JSON {"order": ..., "event": ...}
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     __table_args__ = (UniqueConstraint("sha256", name="uq_messages2_sha"),)
 
@@ -80,3 +93,20 @@ class CompanyProfile(Base):
     footer_note: Mapped[str | None] = mapped_column(Text)
     tax_label: Mapped[str | None] = mapped_column(String(50))
     tax_percent: Mapped[float | None] = mapped_column(Numeric(5,2))
+    revision: Mapped[int] = mapped_column(Integer, default=1, server_default="1")  # bumped by every update (profile.py)
+
+# create_all() only creates missing tables; columns added to existing tables go here (idempotent DDL).
+SCHEMA_UPGRADES = [
+    "ALTER TABLE messages2 ADD COLUMN IF NOT EXISTS model VARCHAR(100)",
+    "ALTER TABLE messages2 ADD COLUMN IF NOT EXISTS schema_version INTEGER",
+    "ALTER TABLE messages2 ADD COLUMN IF NOT EXISTS parsed TEXT",
+    "ALTER TABLE order_balances2 ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1",
+    "ALTER TABLE company_profile ADD COLUMN IF NOT EXISTS revision INTEGER NOT NULL DEFAULT 1",
+    # new column is all NULL, so the unique index builds even before `python -m app.customers backfill`
+    "ALTER TABLE customers2 ADD COLUMN IF NOT EXISTS phone_canonical VARCHAR(50)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_customers2_phone_canonical ON customers2 (phone_canonical)",
+    # placeholder phones used to canonicalize to '+60' and share one row; free the key (utils.MIN_PHONE_DIGITS)
+    r"UPDATE customers2 SET phone_canonical = NULL WHERE phone_canonical IS NOT NULL AND length(regexp_replace(coalesce(phone, ''), '\D', '', 'g')) < 8",
+    "ALTER TABLE payments2 ADD COLUMN IF NOT EXISTS reference VARCHAR(64)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_payments2_reference ON payments2 (reference)",
+]
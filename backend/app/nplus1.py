@@ -0,0 +1,137 @@
+import logging, os, re, sys
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+# N+1 detector for development and CI. Statements run while a Tracker is
+# active are reduced to a shape (literals, bind values and IN lists dropped);
+# a shape seen NPLUS1_THRESHOLD times in one request/block is reported with
+# the app call site that ran it at the threshold. insertmanyvalues batches
+# are one statement split up, so they don't count.
+#   NPLUS1_DETECT=warn   log a warning per offending request (route + stack)
+#   NPLUS1_DETECT=raise  raise NPlusOneError after the request (fails tests
+#                        using TestClient, which re-raises server errors)
+#   with nplus1.detect(): ...   the same check around any block
+# Off by default: nothing is installed unless one of the above is used.
+NPLUS1_DETECT = os.getenv("NPLUS1_DETECT", "").lower()
+NPLUS1_THRESHOLD = int(os.getenv("NPLUS1_THRESHOLD", "5"))
+# streaming endpoints repeat the same statements once per chunk by design
+NPLUS1_IGNORE = {"/orders/bulk", "/payments/import", *filter(None, os.getenv("NPLUS1_IGNORE", "").split(","))}
+
+log = logging.getLogger(__name__)
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LIB_DIR = os.path.dirname(os.__file__)
+_tracker: ContextVar["Tracker | None"] = ContextVar("nplus1_tracker", default=None)
+_installed = False
+
+class NPlusOneError(AssertionError):
+    pass
+
+_SHAPE = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),                                  # string literals
+    (re.compile(r"\$\d+(?:::[A-Za-z_]+(?:\[\])?)?|%\(\w+\)s|\?"), "?"),      # bind parameters (asyncpg, psycopg2, qmark)
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),                               # numbers
+    (re.compile(r"\bIN\s*\((?:\s*\?\s*,?)*\)", re.I), "IN (...)"),         # expanded IN lists
+    (re.compile(r"\bVALUES\s*\(.*\)", re.I | re.S), "VALUES (...)"),        # multi-row VALUES
+    (re.compile(r"\s+"), " "),
+]
+
+def shape(statement: str) -> str:
+    for rx, rep in _SHAPE:
+        statement = rx.sub(rep, statement)
+    return statement.strip()
+
+def _frames():
+    # innermost first; follows greenlet parents so async sessions reach the
+    # coroutine that awaited the query, not just SQLAlchemy internals
+    f = sys._getframe(2)
+    try:
+        import greenlet
+        g = greenlet.getcurrent()
+    except ImportError:
+        g = None
+    while f is not None:
+        yield f
+        f = f.f_back
+        if f is None and g is not None:
+            g = g.parent; f = g.gr_frame if g is not None else None
+
+def call_site(limit: int = 8) -> list[str]:
+    # app frames; failing that (queries from a test or script), any frame outside libraries
+    fmt = lambda f: f"{os.path.relpath(f.f_code.co_filename)}:{f.f_lineno} in {f.f_code.co_name}"
+    frames = [f for f in _frames() if not f.f_code.co_filename.endswith(("nplus1.py", "metrics.py"))]
+    out = [fmt(f) for f in frames if f.f_code.co_filename.startswith(APP_DIR)]
+    if not out:
+        out = [fmt(f) for f in frames if not f.f_code.co_filename.startswith((LIB_DIR, "<")) and "site-packages" not in f.f_code.co_filename]
+    return out[:limit]
+
+class Tracker:
+    def __init__(self, threshold: int = NPLUS1_THRESHOLD):
+        self.threshold = threshold
+        self.counts: Counter = Counter()
+        self.sites: dict[str, list[str]] = {}
+
+    def record(self, statement: str):
+        k = shape(statement)
+        self.counts[k] += 1
+        if self.counts[k] == self.threshold:
+            self.sites[k] = call_site()
+
+    def findings(self) -> list[dict]:
+        return [{"statement": k, "count": self.counts[k], "stack": s} for k, s in self.sites.items()]
+
+    def report(self, where: str) -> str:
+        lines = [f"N+1 queries in {where}:"]
+        for f in sorted(self.findings(), key=lambda f: -f["count"]):
+            lines.append(f"  {f['count']}x {f['statement'][:300]}")
+            lines += [f"      at {s}" for s in f["stack"]]
+        return "\n".join(lines)
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    t = _tracker.get()
+    if t is not None and not (context is not None and context.execute_style is ExecuteStyle.INSERTMANYVALUES):
+        t.record(statement)
+
+def install():
+    # listeners on the app's engines; idempotent
+    global _installed
+    if _installed: return
+    from . import db
+    engines = [db.engine] + ([db.async_engine.sync_engine] if db.async_engine is not None else [])
+    for e in engines:
+        event.listen(e, "after_cursor_execute", _after)
+    _installed = True
+
+@contextmanager
+def detect(threshold: int = NPLUS1_THRESHOLD, mode: str = "raise", where: str = "block"):
+    install()
+    t = Tracker(threshold); token = _tracker.set(t)
+    try:
+        yield t
+    finally:
+        _tracker.reset(token)
+    if t.sites:
+        msg = t.report(where)
+        if mode == "raise": raise NPlusOneError(msg)
+        log.warning(msg)
+
+class NPlusOneMiddleware:
+    def __init__(self, app, mode: str = NPLUS1_DETECT, threshold: int = NPLUS1_THRESHOLD):
+        self.app, self.mode, self.threshold = app, mode, threshold
+        install()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        t = Tracker(self.threshold); token = _tracker.set(t)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _tracker.reset(token)
+        route = getattr(scope.get("route"), "path", scope["path"])
+        if t.sites and route not in NPLUS1_IGNORE:
+            msg = t.report(f"{scope['method']} {route}")
+            if self.mode == "raise": raise NPlusOneError(msg)
+            log.warning(msg)
@@ -0,0 +1,29 @@
+import base64, binascii, json
+from fastapi import HTTPException
+from .queries import order_summaries
+
+# Keyset pagination over "id desc": the cursor carries the last id served, so
+# every page is an index range scan no matter how deep it is.
+
+MAX_LIMIT = 500
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(token: str) -> int:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return int(data["id"])
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise HTTPException(400, "invalid cursor")
+
+async def paginate(db, stmt, id_col, cursor: str | None, limit: int):
+    if cursor:
+        stmt = stmt.where(id_col < decode_cursor(cursor))
+    rows = await order_summaries(db, stmt.order_by(id_col.desc()).limit(limit + 1))
+    next_cursor = encode_cursor(rows[limit - 1]["id"]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def paged(items, next_cursor):
+    return {"items": items, "next_cursor": next_cursor}
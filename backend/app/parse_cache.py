@@ -0,0 +1,105 @@
+import asyncio, json, os
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from . import models
+from .parser import parse_text, MODEL
+from .fastparse import extract, FASTPATH, FASTPATH_MIN_CONFIDENCE
+from . import catalog
+from .schemas import ParsedOrder, ParsedEvent
+from .utils import sha256_text, LRU
+
+# Parse results keyed by sha256(model, schema version, text): in-process LRU
+# first, then messages2, then the rule-based fast path, then the model. Bump
+# SCHEMA_VERSION whenever the intake schema, prompt or rules change so old
+# entries stop matching. Every result carries its source: cache | rules | llm.
+SCHEMA_VERSION = 1
+LRU_SIZE = int(os.getenv("PARSE_CACHE_SIZE", "2048"))
+
+_lru = LRU(LRU_SIZE)
+
+def cache_key(text: str) -> str:
+    return sha256_text(f"{MODEL}\n{SCHEMA_VERSION}\n{text}")
+
+def to_result(data: dict):
+    return ParsedOrder(**data["order"]), ParsedEvent(**data["event"])
+
+async def lookup(db, keys) -> dict:
+    found, missing = {}, []
+    for k in keys:
+        v = _lru.get(k)
+        if v is not None: found[k] = v
+        else: missing.append(k)
+    if missing:
+        rows = await db.execute(select(models.Message.sha256, models.Message.parsed).where(models.Message.sha256.in_(missing), models.Message.parsed.is_not(None)))
+        for k, parsed in rows:
+            found[k] = json.loads(parsed); _lru.put(k, found[k])
+    return found
+
+async def store(db, entries):
+    # entries: [(key, text, data, source)]; committed here so the cache survives a failed order create.
+    if not entries:
+        return
+    for k, _, data, _ in entries:
+        _lru.put(k, data)
+    stmt = insert(models.Message).values([
+        {"sha256": k, "raw": text, "model": MODEL if source == "llm" else source, "schema_version": SCHEMA_VERSION, "parsed": json.dumps(data)}
+        for k, text, data, source in entries
+    ]).on_conflict_do_nothing(index_elements=["sha256"])
+    await db.execute(stmt)
+    await db.commit()
+
+def fast_path(text: str, names):
+    if not FASTPATH:
+        return None
+    po, pe, confidence = extract(text, names)
+    return (po, pe) if confidence >= FASTPATH_MIN_CONFIDENCE else None
+
+def as_data(po, pe) -> dict:
+    return {"order": po.model_dump(), "event": pe.model_dump()}
+
+async def cached_parse(db, text: str):
+    # -> (ParsedOrder, ParsedEvent, source)
+    key = cache_key(text)
+    hit = (await lookup(db, [key])).get(key)
+    if hit is not None:
+        return *to_result(hit), "cache"
+    await catalog.index.ensure(db)
+    r = fast_path(text, catalog.index.names); source = "rules"
+    if r is None:
+        r = await parse_text(text); source = "llm"
+    await store(db, [(key, text, as_data(*r), source)])
+    return *r, source
+
+async def cached_parse_many(db, texts, concurrency: int):
+    # -> [(ParsedOrder, ParsedEvent, source) | Exception] in input order.
+    # Cache lookups and writes are batched; model calls for the rest run concurrently.
+    keys = [cache_key(t) for t in texts]
+    found = await lookup(db, set(keys))
+    todo = {k: t for k, t in zip(keys, texts) if k not in found}
+    await catalog.index.ensure(db)
+    names = catalog.index.names
+    parsed, sources = {}, {}
+    for k, t in todo.items():
+        r = fast_path(t, names)
+        if r is not None:
+            parsed[k] = r; sources[k] = "rules"
+    gate = asyncio.Semaphore(concurrency)
+    async def one(text):
+        async with gate:
+            return await parse_text(text)
+    llm = [k for k in todo if k not in parsed]
+    for k, r in zip(llm, await asyncio.gather(*(one(todo[k]) for k in llm), return_exceptions=True)):
+        parsed[k] = r; sources[k] = "llm"
+    fresh = [(k, todo[k], as_data(*r), sources[k]) for k, r in parsed.items() if not isinstance(r, Exception)]
+    await store(db, fresh)
+    data = {k: d for k, _, d, _ in fresh}
+    out, seen = [], set()
+    for k in keys:
+        if k in found or (k in data and k in seen):  # repeats inside one batch count as cache hits
+            out.append((*to_result(found.get(k) or data[k]), "cache"))
+        elif k in data:
+            out.append((*to_result(data[k]), sources[k]))
+        else:
+            out.append(parsed[k])
+        seen.add(k)
+    return out
@@ -1,9 +1,36 @@
-import os, json, re
+import os, json, re, asyncio, random
 from typing import Tuple
-from openai import OpenAI
+from time import perf_counter
+from pydantic import ValidationError
 from .schemas import ParsedOrder, ParsedEvent
+from . import metrics
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+MODEL = os.getenv("OPENAI_MODEL","gpt-4o-mini")
+TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))           # seconds per attempt
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "8"))
+CONCURRENCY = int(os.getenv("OPENAI_CONCURRENCY", "8"))      # max in-flight model calls per process
+
+# The SDK is imported with the first client (it dominates import time); until
+# then nothing can raise its errors, so empty tuples are fine.
+RETRYABLE: tuple = ()
+TIMEOUTS: tuple = ()
+API_ERRORS: tuple = ()
+
+_client = None
+_slots = asyncio.Semaphore(CONCURRENCY)
+
+def get_client():
+    global _client, RETRYABLE, TIMEOUTS, API_ERRORS
+    if _client is None:
+        from openai import AsyncOpenAI, APIError, APIConnectionError, APITimeoutError, RateLimitError, InternalServerError
+        RETRYABLE = (APIConnectionError, RateLimitError, InternalServerError)  # APITimeoutError is an APIConnectionError
+        TIMEOUTS = (APITimeoutError,)
+        API_ERRORS = (APIError,)  # everything else the API can answer (400/401/403/404...): retrying won't help
+        # Retries are ours (jittered, outside the semaphore), so the SDK's own are off.
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL") or None, timeout=TIMEOUT, max_retries=0)
+    return _client
 
 schema = {
   "name": "oms_intake",
@@ -55,14 +82,46 @@ schema = {
 
 SYSTEM = "You read Malaysian WhatsApp/SMS and output strict JSON matching the provided schema. Normalize phone to +60 if possible. If unknown, omit. Use RM values for unit_price when explicit. No commentary, JSON only."
 
+class ModelError(RuntimeError):
+    # the model failed us (retries used up, unusable output); main answers with .status instead of a bare 500
+    def __init__(self, msg: str, status: int = 502):
+        super().__init__(msg); self.status = status
+
+def backoff(attempt: int) -> float:
+    # "full jitter": uniform over [0, capped exponential]
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+async def call_model(text: str):
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with _slots:
+                t0 = perf_counter()
+                try:
+                    # Call Responses API with json_schema format
+                    resp = await get_client().responses.create(
+                        model=MODEL,
+                        instructions=SYSTEM,
+                        input=f"Chat transcript:\n---\n{text}\n---\nReturn JSON only.",
+                        text={"format": {"type": "json_schema", "name": schema["name"], "schema": schema["schema"], "strict": schema["strict"]}},
+                    )
+                except Exception as e:
+                    metrics.LLM_SECONDS.observe(perf_counter() - t0, MODEL, type(e).__name__); raise
+            metrics.LLM_SECONDS.observe(perf_counter() - t0, MODEL, "ok")
+            usage = getattr(resp, "usage", None)
+            if usage is not None:
+                metrics.LLM_TOKENS.inc(MODEL, "input", v=getattr(usage, "input_tokens", 0) or 0)
+                metrics.LLM_TOKENS.inc(MODEL, "output", v=getattr(usage, "output_tokens", 0) or 0)
+            return resp
+        except RETRYABLE as e:
+            if attempt == MAX_RETRIES:
+                raise ModelError(f"Model unavailable after {MAX_RETRIES + 1} attempts ({type(e).__name__})",
+                                 504 if isinstance(e, TIMEOUTS) else 503) from e
+        except API_ERRORS as e:
+            raise ModelError(f"Model request failed ({getattr(e, 'status_code', None) or type(e).__name__})") from e
+        await asyncio.sleep(backoff(attempt))
+
 async def parse_text(text: str) -> Tuple[ParsedOrder, ParsedEvent]:
-    # Call Responses API with json_schema format
-    resp = client.responses.create(
-        model=os.getenv("OPENAI_MODEL","gpt-4o-mini"),
-        instructions=SYSTEM,
-        input=f"Chat transcript:\n---\n{text}\n---\nReturn JSON only.",
-        text={"format":"json_schema","json_schema": schema}
-    )
+    resp = await call_model(text)
     parsed = None
     try:
         if resp.output_text:
@@ -72,14 +131,19 @@ async def parse_text(text: str) -> Tuple[ParsedOrder, ParsedEvent]:
             if getattr(maybe,'type',None) == 'output_text':
                 parsed = json.loads(maybe.text)
     except Exception as e:
-        raise RuntimeError("Model returned invalid JSON") from e
+        raise ModelError("Model returned invalid JSON") from e
+    if not isinstance(parsed, dict):
+        raise ModelError("Model returned invalid JSON")
 
-    order = parsed.get("order", {})
-    ev = parsed.get("event", {"type":"NONE"})
-    # Minimal coercions
-    order.setdefault("items", [])
-    if not order.get("type"):
-        order["type"] = "OUTRIGHT"
-    po = ParsedOrder(**order)
-    pe = ParsedEvent(**ev)
+    try:
+        order = parsed.get("order", {})
+        ev = parsed.get("event", {"type":"NONE"})
+        # Minimal coercions
+        order.setdefault("items", [])
+        if not order.get("type"):
+            order["type"] = "OUTRIGHT"
+        po = ParsedOrder(**order)
+        pe = ParsedEvent(**ev)
+    except (AttributeError, TypeError, ValidationError) as e:
+        raise ModelError("Model output does not match the schema") from e
     return po, pe
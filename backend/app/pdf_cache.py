@@ -0,0 +1,121 @@
+import asyncio, os, shutil, tempfile, threading
+from .utils import sha256_text, LRU
+
+# Rendered invoice/receipt PDFs keyed by everything that ends up on the page:
+# order + ledger version (bumped by every item/payment write), customer,
+# company profile, title and the printed date. The key doubles as the ETag.
+# Tiers: in-process LRU, then PDF_CACHE_DIR (shared by the workers on a box,
+# pruned to PDF_CACHE_DISK_MB oldest-first). PDF_CACHE_DIR="" turns disk off.
+# The whole-directory work (prune's walk, clear_disk's rmtree) stays off the
+# event loop: put() hands prune to the default executor, profile awaits clear_disk
+# in a thread.
+PDF_CACHE_SIZE = int(os.getenv("PDF_CACHE_SIZE", "256"))
+PDF_CACHE_DIR = os.getenv("PDF_CACHE_DIR", os.path.join(tempfile.gettempdir(), "oms-pdf-cache"))
+PDF_CACHE_DISK_MB = float(os.getenv("PDF_CACHE_DISK_MB", "200"))
+PRUNE_EVERY = 50
+
+_lru = LRU(PDF_CACHE_SIZE)
+_lock = threading.Lock()
+_writes = 0
+_pruning = threading.Lock()
+
+PROFILE_FIELDS = ("company_name", "registration_no", "address", "phone", "email", "logo_url",
+                  "bank_name", "bank_account_name", "bank_account_no", "footer_note", "tax_label", "tax_percent")
+
+def pdf_key(order, version, customer, profile, title: str, day) -> str:
+    parts = [order.id, order.order_code, version, customer.name, customer.phone, customer.address, title, day]
+    parts += [getattr(profile, f, None) for f in PROFILE_FIELDS] if profile else [None]
+    return sha256_text("\x1f".join("" if p is None else str(p) for p in parts))[:32]
+
+def _path(order_id: int, key: str) -> str:
+    return os.path.join(PDF_CACHE_DIR, str(order_id), key + ".pdf")
+
+def get(order_id: int, key: str) -> bytes | None:
+    pdf = _lru.get((order_id, key))
+    if pdf is None and PDF_CACHE_DIR:
+        try:
+            with open(_path(order_id, key), "rb") as f:
+                pdf = f.read()
+        except OSError:
+            return None
+        _lru.put((order_id, key), pdf)
+    return pdf
+
+def put(order_id: int, key: str, pdf: bytes):
+    global _writes
+    _lru.put((order_id, key), pdf)
+    if not PDF_CACHE_DIR:
+        return
+    path = _path(order_id, key)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, path)  # readers in other workers never see a partial file
+    except OSError:
+        return
+    with _lock:
+        _writes += 1
+        if _writes % PRUNE_EVERY: return
+    try:
+        asyncio.get_running_loop().run_in_executor(None, prune)
+    except RuntimeError:  # no loop here (worker thread, CLI): already off it
+        prune()
+
+def invalidate(order_id: int):
+    # stale versions can't be hit anyway (the key changes); this just frees the space
+    for k in [k for k in _lru.data if k[0] == order_id]:
+        _lru.data.pop(k, None)
+    if PDF_CACHE_DIR:
+        d = os.path.join(PDF_CACHE_DIR, str(order_id))
+        try:
+            for name in os.listdir(d):
+                os.unlink(os.path.join(d, name))
+        except OSError:
+            pass
+
+def invalidate_many(order_ids):
+    ids = set(order_ids)
+    for k in [k for k in _lru.data if k[0] in ids]:
+        _lru.data.pop(k, None)
+    if PDF_CACHE_DIR:
+        try:
+            cached = {int(d) for d in os.listdir(PDF_CACHE_DIR) if d.isdigit()}
+        except OSError:
+            return
+        for oid in cached & ids:
+            invalidate(oid)
+
+def clear():
+    _lru.data.clear()
+
+def clear_disk():
+    if PDF_CACHE_DIR:
+        shutil.rmtree(PDF_CACHE_DIR, ignore_errors=True)
+
+def prune():
+    if not _pruning.acquire(blocking=False): return  # one walk at a time
+    try:
+        _prune()
+    finally:
+        _pruning.release()
+
+def _prune():
+    files = []
+    for root, _, names in os.walk(PDF_CACHE_DIR):
+        for n in names:
+            p = os.path.join(root, n)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+    total, budget = sum(f[1] for f in files), PDF_CACHE_DISK_MB * 1024 * 1024
+    for _, size, p in sorted(files):
+        if total <= budget:
+            break
+        try:
+            os.unlink(p); total -= size
+        except OSError:
+            pass
@@ -0,0 +1,105 @@
+import asyncio, logging, os, sys, time
+from types import SimpleNamespace
+from sqlalchemy import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import make_url
+from . import models, pdf_cache, logo_cache
+from .db import DB_ASYNC
+from .pdf_cache import PROFILE_FIELDS
+
+# Company profile (company_profile row id=1) cached per process. Every update
+# bumps company_profile.revision and NOTIFYs PROFILE_CHANNEL. Workers hold a
+# LISTEN connection and drop their copy when a notification arrives; they
+# also re-check the revision (one tiny query) every PROFILE_CHECK_INTERVAL
+# seconds, or PROFILE_MAX_AGE while listening, in case a notification is
+# missed. Direct SQL edits to the row must bump revision to be picked up.
+# The listener is an asyncpg connection, so DB_ASYNC=0 (no asyncpg in the
+# stack) polls only, as does PROFILE_NOTIFY=0.
+PROFILE_CHECK_INTERVAL = float(os.getenv("PROFILE_CHECK_INTERVAL", "5"))
+PROFILE_MAX_AGE = float(os.getenv("PROFILE_MAX_AGE", "300"))
+PROFILE_NOTIFY = os.getenv("PROFILE_NOTIFY", "1").lower() not in ("0", "false", "no")
+PROFILE_CHANNEL = "company_profile"
+
+log = logging.getLogger(__name__)
+
+def snapshot(row) -> SimpleNamespace | None:
+    # plain, picklable copy (PDF rendering may happen in another process)
+    if row is None: return None
+    return SimpleNamespace(revision=row.revision, **{f: getattr(row, f) for f in PROFILE_FIELDS})
+
+class ProfileService:
+    def __init__(self):
+        self.profile: SimpleNamespace | None = None
+        self.revision = None
+        self.checked_at = float("-inf")
+        self.listener = None
+
+    async def get(self, db) -> SimpleNamespace | None:
+        max_age = PROFILE_MAX_AGE if self.listener else PROFILE_CHECK_INTERVAL
+        if time.monotonic() - self.checked_at < max_age:
+            return self.profile
+        rev = (await db.execute(select(models.CompanyProfile.revision).where(models.CompanyProfile.id==1))).scalar_one_or_none()
+        if rev != self.revision or (rev is not None and self.profile is None):
+            row = (await db.execute(select(models.CompanyProfile).where(models.CompanyProfile.id==1))).scalar_one_or_none()
+            self._set(snapshot(row))
+        self.checked_at = time.monotonic()
+        return self.profile
+
+    async def update(self, db, fields: dict) -> SimpleNamespace:
+        t = models.CompanyProfile.__table__.c
+        vals = {k: fields[k] for k in PROFILE_FIELDS if k in fields}
+        stmt = insert(models.CompanyProfile).values(id=1, revision=1, **{"company_name": "", **vals})
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.id], set_={**{k: stmt.excluded[k] for k in vals}, "revision": t.revision + 1},
+        ).returning(*(t[f] for f in PROFILE_FIELDS), t.revision)
+        row = (await db.execute(stmt)).one()
+        await db.execute(text("SELECT pg_notify(:c, :r)"), {"c": PROFILE_CHANNEL, "r": str(row.revision)})  # sent on commit
+        await db.commit()
+        old, self.profile = self.profile, snapshot(row)
+        self.revision, self.checked_at = row.revision, time.monotonic()
+        invalidate(old, self.profile)
+        await asyncio.to_thread(pdf_cache.clear_disk)  # shared disk tier; rmtree of a big cache would stall the loop
+        return self.profile
+
+    def _set(self, new):
+        old = self.profile
+        self.profile, self.revision = new, new.revision if new else None
+        if old is not None and old != new:
+            invalidate(old, new)
+
+    def stale(self, *_):
+        self.checked_at = float("-inf")
+
+    async def listen(self, database_url: str):
+        # best effort: without a listener the revision check interval is just shorter
+        if not PROFILE_NOTIFY or not DB_ASYNC or make_url(database_url).get_backend_name() != "postgresql":
+            return
+        try:
+            import asyncpg
+            dsn = make_url(database_url).set(drivername="postgresql").render_as_string(hide_password=False)
+            conn = await asyncpg.connect(dsn)
+            await conn.add_listener(PROFILE_CHANNEL, self.stale)
+            conn.add_termination_listener(lambda _: setattr(self, "listener", None))
+            self.listener = conn
+        except Exception as e:
+            log.warning("profile LISTEN unavailable, polling every %ss: %s", PROFILE_CHECK_INTERVAL, e)
+
+    async def close(self):
+        conn, self.listener = self.listener, None
+        if conn is not None:
+            try:
+                await asyncio.wait_for(conn.close(), 5)
+            except Exception:
+                conn.terminate()
+
+def invalidate(old, new):
+    # profile-derived caches: keys already include the profile fields, so this frees memory
+    # and makes a logo re-uploaded under the same URL get fetched again
+    invoice_pdf = sys.modules.get("app.invoice_pdf")  # not imported yet: nothing cached
+    if invoice_pdf is not None: invoice_pdf._layouts.data.clear()
+    pdf_cache.clear()
+    for p in (old, new):
+        if p is not None and p.logo_url:
+            logo_cache.clear(p.logo_url)
+
+service = ProfileService()
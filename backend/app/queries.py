@@ -0,0 +1,40 @@
+from datetime import datetime, time, timedelta
+from sqlalchemy import select, func
+from . import models
+
+def order_summary_stmt():
+    # Order + customer + totals in one statement; totals come from the
+    # order_balances2 ledger (see ledger.py) instead of re-aggregating items/payments.
+    b = models.OrderBalance
+    return (
+        select(models.Order.id, models.Order.order_code, models.Order.type, models.Order.status, models.Order.created_at,
+               models.Customer.name.label("customer"), models.Customer.phone.label("phone"),
+               func.coalesce(b.total, 0).label("total"), func.coalesce(b.paid, 0).label("paid"), func.coalesce(b.balance, 0).label("balance"))
+        .join(models.Customer, models.Customer.id==models.Order.customer_id)
+        .outerjoin(b, b.order_id==models.Order.id)
+    )
+
+def filter_orders(stmt, status=None, type=None, date_from=None, date_to=None):
+    if status: stmt = stmt.where(models.Order.status==status)
+    if type: stmt = stmt.where(models.Order.type==type.upper())
+    if date_from: stmt = stmt.where(models.Order.created_at >= datetime.combine(date_from, time.min))
+    if date_to: stmt = stmt.where(models.Order.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    return stmt
+
+def outstanding_only(stmt):
+    # Range predicate on the indexed ledger column, not on the coalesced label.
+    return stmt.where(models.OrderBalance.balance > 0)
+
+def summary_row(row) -> dict:
+    r = dict(row._mapping)
+    for k in ("total", "paid", "balance"):
+        r[k] = float(r[k] or 0)
+    return r
+
+async def order_summaries(db, stmt) -> list[dict]:
+    return [summary_row(r) for r in await db.execute(stmt)]
+
+def iter_order_summaries(db, stmt, batch: int = 1000):
+    # Server-side cursor: rows are fetched `batch` at a time instead of all at once.
+    for r in db.execute(stmt.execution_options(yield_per=batch)):
+        yield summary_row(r)
@@ -0,0 +1,57 @@
+import logging, os
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+from . import models, codes, ledger
+from .utils import sha256_text
+
+# Schema DDL (create_all + models.SCHEMA_UPGRADES + codes.SCHEMA) used to run
+# at import of app.main, on every boot. ensure() runs from the lifespan instead:
+# one query compares the fingerprint of that DDL with the one recorded in
+# oms_schema by the last apply, and only a mismatch (fresh database, deploy
+# that changes the schema) runs it, under an advisory lock so workers booting
+# together apply it once. codes.CATCH_UP (order code sequence past the highest
+# existing ORD code) runs on every boot either way. SCHEMA_CHECK=0 skips all of
+# it (schema managed elsewhere), SCHEMA_CHECK=force applies on every boot like before.
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "1").lower()
+LOCK_KEY = 7340021  # pg_advisory_xact_lock key
+
+log = logging.getLogger(__name__)
+
+def statements() -> list[str]:
+    return models.SCHEMA_UPGRADES + codes.SCHEMA
+
+def fingerprint(dialect) -> str:
+    tables = [str(CreateTable(t).compile(dialect=dialect)) for t in models.Base.metadata.sorted_tables]
+    return sha256_text("\x1f".join(tables + statements()))[:32]
+
+def current(conn) -> str | None:
+    if not conn.execute(text("SELECT to_regclass('oms_schema') IS NOT NULL")).scalar():
+        return None
+    return conn.execute(text("SELECT fingerprint FROM oms_schema WHERE id = 1")).scalar()
+
+def apply(conn, fp: str):
+    new_ledger = not conn.execute(text("SELECT to_regclass('order_balances2') IS NOT NULL")).scalar()
+    models.Base.metadata.create_all(bind=conn)
+    for ddl in statements():
+        conn.execute(text(ddl))
+    if new_ledger:  # existing orders get their balances in the same transaction, not zeros until a manual rebuild
+        conn.execute(ledger.fill_stmt())
+    conn.execute(text("CREATE TABLE IF NOT EXISTS oms_schema (id INTEGER PRIMARY KEY, fingerprint VARCHAR(64) NOT NULL, applied_at TIMESTAMP NOT NULL DEFAULT now())"))
+    conn.execute(text("INSERT INTO oms_schema (id, fingerprint) VALUES (1, :fp) "
+                      "ON CONFLICT (id) DO UPDATE SET fingerprint = excluded.fingerprint, applied_at = now()"), {"fp": fp})
+
+def ensure(engine, mode: str = SCHEMA_CHECK) -> bool:
+    # -> True when DDL was applied
+    if mode in ("0", "false", "no", "off"):
+        return False
+    fp = fingerprint(engine.dialect)
+    with engine.begin() as conn:
+        applied = mode == "force" or current(conn) != fp
+        if applied:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": LOCK_KEY})
+            applied = mode == "force" or current(conn) != fp  # another worker may just have applied it
+        if applied:
+            log.info("applying schema %s", fp)
+            apply(conn, fp)
+        conn.execute(text(codes.CATCH_UP))
+    return applied
@@ -28,6 +28,7 @@ class ParseResponse(BaseModel):
     event: ParsedEvent
     matched_order_code: Optional[str] = None
     duplicate: bool = False
+    source: Literal["cache","rules","llm"] = "llm"
 
 class OrderUpdate(BaseModel):
     status: Optional[str] = None
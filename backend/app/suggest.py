@@ -0,0 +1,123 @@
+import bisect, re
+from collections import Counter
+
+# Typeahead over product names and aliases. Three tiers, each only consulted
+# if the previous ones did not fill top-k:
+#   0. the label starts with the query
+#   1. every query token is a prefix of some label token
+#   2. fuzzy: vocabulary tokens close to the query (trigram candidates, then
+#      bounded edit distance), expanded to their entries, nearest first
+# Prefix lookups are bisects over sorted key lists (a flattened trie).
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+FUZZY_CANDIDATES = 200
+
+def norm(s: str) -> str:
+    return " ".join(TOKEN_RE.findall(s.casefold()))
+
+def trigrams(s: str) -> set[str]:
+    s = f"  {s} "
+    return {s[i:i+3] for i in range(len(s) - 2)}
+
+def bounded_lev(a: str, b: str, limit: int) -> int:
+    # Levenshtein distance, giving up (returning limit + 1) once it must exceed limit
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+def prefix_range(keys: list, prefix: str):
+    lo = bisect.bisect_left(keys, (prefix,))
+    for i in range(lo, len(keys)):
+        if not keys[i][0].startswith(prefix):
+            break
+        yield keys[i][1]
+
+def exact_range(keys: list, key: str):
+    lo = bisect.bisect_left(keys, (key,))
+    for i in range(lo, len(keys)):
+        if keys[i][0] != key:
+            break
+        yield keys[i][1]
+
+class SuggestIndex:
+    def __init__(self):
+        self.load([])
+
+    def load(self, entries):
+        # entries: [(label, sku)]
+        self.labels: list[tuple[str, str, str]] = []   # (label, sku, normalized label)
+        self.full: list[tuple[str, int]] = []          # (normalized label, entry id), sorted
+        self.tokens: list[tuple[str, int]] = []        # (token, entry id), sorted
+        self.vocab: set[str] = set()
+        self.grams: dict[str, list[str]] = {}           # trigram -> vocabulary tokens
+        for label, sku in entries:
+            self._add(label, sku)
+        self.full.sort(); self.tokens.sort()
+
+    def add(self, label: str, sku: str):
+        self._add(label, sku, sort_in=True)
+
+    def _add(self, label: str, sku: str, sort_in: bool = False):
+        n = norm(label)
+        i = len(self.labels)
+        self.labels.append((label, sku, n))
+        put = bisect.insort if sort_in else list.append
+        put(self.full, (n, i))
+        for t in set(n.split()):
+            if t not in self.vocab:
+                self.vocab.add(t)
+                for g in trigrams(t):
+                    self.grams.setdefault(g, []).append(t)
+            put(self.tokens, (t, i))
+        return i
+
+    def search(self, q: str, k: int = 20) -> list[tuple[str, str]]:
+        # -> [(label, sku)], best first, one entry per SKU
+        qn = norm(q)
+        if not qn:
+            return []
+        out, skus = [], set()
+
+        def take(ids):
+            # ids arrive in key order, so the first k distinct SKUs are the answer
+            for i in ids:
+                label, sku, _ = self.labels[i]
+                if sku not in skus:
+                    skus.add(sku); out.append((label, sku))
+                    if len(out) >= k:
+                        return True
+            return False
+
+        if take(prefix_range(self.full, qn)):
+            return out
+        qtoks = qn.split()
+        lead = max(qtoks, key=len)
+        cands = (i for i in prefix_range(self.tokens, lead)
+                 if len(qtoks) == 1 or all(any(t.startswith(qt) for t in self.labels[i][2].split()) for qt in qtoks))
+        if take(cands):
+            return out
+
+        if len(lead) < 3:
+            return out
+        limit = 1 if len(lead) <= 4 else 2
+        overlap = Counter()
+        for g in trigrams(lead):
+            overlap.update(self.grams.get(g, ()))
+        near = []
+        for t, _ in overlap.most_common(FUZZY_CANDIDATES):
+            # whole token, or its first len(lead) chars (the user is mid-word)
+            d = min(bounded_lev(lead, t, limit), bounded_lev(lead, t[:len(lead)], limit))
+            if d <= limit:
+                near.append((d, t))
+        for _, t in sorted(near):
+            if take(exact_range(self.tokens, t)):
+                break
+        return out
@@ -1,13 +1,34 @@
 import hashlib, re
+from collections import OrderedDict
 
 def sha256_text(s: str) -> str:
     return hashlib.sha256(s.encode('utf-8')).hexdigest()
 
+MIN_PHONE_DIGITS = 8  # fewer is a placeholder ("-", "N/A", "tiada") or a typo, not a number to key a customer on
+
 def norm_phone(p: str | None) -> str | None:
-    if not p: return p
+    if not p: return None
     digits = re.sub(r'\D+', '', p)
+    if len(digits) < MIN_PHONE_DIGITS: return None
     if digits.startswith('0'):
         digits = '6' + digits  # assume Malaysia if starting with 0
     if not digits.startswith('6'):
         digits = '60' + digits  # best-effort
     return '+' + digits
+
+class LRU:
+    def __init__(self, size: int):
+        self.size = size
+        self.data = OrderedDict()
+
+    def get(self, key):
+        v = self.data.get(key)
+        if v is not None:
+            self.data.move_to_end(key)
+        return v
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        while len(self.data) > self.size:
+            self.data.popitem(last=False)
@@ -0,0 +1,59 @@
+"""Throughput under concurrent load, and health-check latency while it runs.
+
+Start the API in the mode under test, then drive it:
+
+    DB_ASYNC=1 uvicorn app.main:app --port 8000      # async engine (asyncpg)
+    DB_ASYNC=0 uvicorn app.main:app --port 8000      # sync engine via threadpool
+    python -m bench.async_db --base http://localhost:8000 --concurrency 32 --seconds 20
+
+For the pre-async baseline, run the same command against a checkout of the
+previous commit.
+"""
+import argparse, asyncio, time
+import httpx
+from .report import summarize, dump
+
+async def worker(client, path, deadline, lat, errs):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            r = await client.get(path)
+            r.raise_for_status()
+            lat.append(time.perf_counter() - t0)
+        except httpx.HTTPError:
+            errs.append(1)
+
+async def prober(client, deadline, lat, errs, interval):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            (await client.get("/api/health")).raise_for_status()
+            lat.append(time.perf_counter() - t0)
+        except httpx.HTTPError:
+            errs.append(1)
+        await asyncio.sleep(interval)
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base, limits=limits, timeout=60) as client:
+        lat, errs, hlat, herrs = [], [], [], []
+        t0 = time.perf_counter(); deadline = t0 + args.seconds
+        await asyncio.gather(
+            *(worker(client, args.path, deadline, lat, errs) for _ in range(args.concurrency)),
+            prober(client, deadline, hlat, herrs, args.probe_interval),
+        )
+        elapsed = time.perf_counter() - t0
+    dump({"path": args.path, "concurrency": args.concurrency,
+          "load": summarize(lat, elapsed, len(errs)), "health": summarize(hlat, elapsed, len(herrs))})
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--path", default="/api/outstanding?overdue_only=true")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--seconds", type=float, default=20)
+    ap.add_argument("--probe-interval", type=float, default=0.05)
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
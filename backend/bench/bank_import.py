@@ -0,0 +1,78 @@
+"""Bank statement import throughput.
+
+    uvicorn app.main:app --port 8000
+    python -m bench.bank_import --base http://localhost:8000 --orders 20000 --lines 100000
+
+Creates --orders orders through POST /orders/bulk, then streams a --lines
+statement CSV to POST /payments/import: most credits quote an order code
+(in a few spellings), some only the customer's phone, some nothing usable,
+plus debit lines. Reports lines/second and the reconciliation counts, then
+imports the same file again (every line should come back as a duplicate).
+--compare N posts N of the payments one by one to POST /payments.
+"""
+import argparse, asyncio, csv, io, random, time
+from datetime import date, timedelta
+import httpx
+from .report import dump
+from .bulk_import import orders, as_jsonl
+
+def statement(created, n, seed=7):
+    # created: [(order_code, phone)]
+    rnd = random.Random(seed); day = date.today() - timedelta(days=30)
+    buf = io.StringIO(); w = csv.writer(buf)
+    w.writerow(["Account No", "5140 1234 5678"]); w.writerow([])  # preamble, as real exports have
+    w.writerow(["Date", "Description", "Reference", "Debit", "Credit", "Balance"])
+    for i in range(n):
+        d = (day + timedelta(days=i * 30 // n)).strftime("%d/%m/%Y")
+        code, phone = rnd.choice(created); amt = f"{rnd.choice([50, 80, 100, 120, 150.5, 300]):,.2f}"
+        r = rnd.random()
+        if r < 0.55: row = [d, f"IBG CREDIT {rnd.choice(['ALI BIN ABU', 'SITI AMINAH', 'TAN AH KOW'])}", code, "", amt]
+        elif r < 0.65: row = [d, f"DUITNOW TRF pmt {code.replace('ORD', 'ord ')}", "", "", amt]
+        elif r < 0.80: row = [d, f"DUITNOW TRF {phone[:3]}-{phone[3:]}", "", "", amt]
+        elif r < 0.90: row = [d, "CASH DEPOSIT CDM", f"{rnd.randrange(10**6)}", "", amt]
+        else: row = [d, "FPX PAYMENT SUPPLIER", "", amt, ""]
+        w.writerow(row + [""])
+        if buf.tell() > 1 << 16:
+            yield buf.getvalue().encode(); buf.seek(0); buf.truncate()
+    yield buf.getvalue().encode()
+
+async def post_statement(client, body):
+    async def stream():
+        for b in body: yield b
+    t0 = time.perf_counter()
+    r = await client.post("/payments/import", content=stream(), headers={"content-type": "text/csv"})
+    r.raise_for_status()
+    return r.json(), time.perf_counter() - t0
+
+async def run(args):
+    gen = list(orders(args.orders))
+    for o in gen:
+        if o["type"] == "LEASE": o["type"] = "RENTAL"
+    async with httpx.AsyncClient(base_url=args.base, timeout=None) as client:
+        async def stream():
+            for b in as_jsonl(gen): yield b
+        r = await client.post("/orders/bulk", params={"format": "jsonl"}, content=stream()); r.raise_for_status()
+        created = [(x["order_code"], o["phone"]) for x, o in zip(r.json()["results"], gen) if x["ok"] and o["phone"]]
+        rep, wall = await post_statement(client, statement(created, args.lines))
+        again, wall2 = await post_statement(client, statement(created, args.lines))
+        result = {"orders": len(created), "lines": rep["lines"], "seconds": round(wall, 2), "lines_per_second": round(rep["lines"] / wall),
+                  **{k: rep[k] for k in ("matched", "ambiguous", "unmatched", "skipped", "errors", "amount_posted", "orders")},
+                  "reimport": {"seconds": round(wall2, 2), "matched": again["matched"], "duplicates": again["duplicates"]},
+                  "sample_ambiguous": rep["ambiguous_lines"][:1], "sample_unmatched": rep["unmatched_lines"][:1]}
+        if args.compare:
+            t0 = time.perf_counter()
+            for code, _ in created[:args.compare]:
+                (await client.post("/payments", json={"order_code": code, "amount": 1, "method": "BANK"})).raise_for_status()
+            result["single_payments_per_second"] = round(min(args.compare, len(created)) / (time.perf_counter() - t0))
+    dump(result)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--orders", type=int, default=20000)
+    ap.add_argument("--lines", type=int, default=100000)
+    ap.add_argument("--compare", type=int, default=0)
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
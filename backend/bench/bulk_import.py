@@ -0,0 +1,79 @@
+"""Bulk order import throughput.
+
+    uvicorn app.main:app --port 8000
+    python -m bench.bulk_import --base http://localhost:8000 --orders 10000 --format jsonl
+
+Streams --orders generated orders (1-3 items each, a quarter of them reusing
+an earlier customer's phone, a few deliberately invalid) to POST /orders/bulk
+and reports orders/minute. --compare N also posts N of them one by one to
+POST /orders for the per-order baseline.
+"""
+import argparse, asyncio, csv, io, json, random, time
+import httpx
+from .report import dump
+
+ITEMS = [("Katil Hospital 3 Function", 350), ("Kerusi Roda Lightweight", 280), ("Tilam Anti Bedsore", 120), ("Oxygen Concentrator 5L", 2200)]
+
+def orders(n, seed=1):
+    rnd = random.Random(seed); tag = time.time_ns() % 10**6
+    for i in range(n):
+        phone = f"01{rnd.randrange(10**8):08d}" if i < 4 or rnd.random() > 0.25 else None
+        o = {"name": f"Pelanggan {tag}-{i}", "phone": phone, "address": f"No {i}, Jalan Mawar {i % 50}",
+             "type": rnd.choice(["RENTAL", "INSTALMENT", "OUTRIGHT"]),
+             "items": [{"name": nm, "qty": rnd.randint(1, 3), "unit_price": p} for nm, p in rnd.sample(ITEMS, rnd.randint(1, 3))]}
+        if i % 500 == 499: o["type"] = "LEASE"  # invalid on purpose
+        yield o
+
+def reuse_phones(gen, rnd=random.Random(2)):
+    seen = []
+    for o in gen:
+        if o["phone"] is None and seen: o["phone"] = rnd.choice(seen)
+        elif o["phone"]: seen.append(o["phone"])
+        if o["phone"] is None: o["phone"] = f"01{rnd.randrange(10**8):08d}"
+        yield o
+
+def as_jsonl(gen):
+    for o in gen:
+        yield (json.dumps(o) + "\n").encode()
+
+def as_csv(gen):
+    buf = io.StringIO(); w = csv.writer(buf)
+    w.writerow(["ref", "name", "phone", "address", "type", "item", "qty", "unit_price"])
+    for i, o in enumerate(gen):
+        for it in o["items"]:
+            w.writerow([i, o["name"], o["phone"], o["address"], o["type"], it["name"], it["qty"], it["unit_price"]])
+        if buf.tell() > 1 << 16:
+            yield buf.getvalue().encode(); buf.seek(0); buf.truncate()
+    yield buf.getvalue().encode()
+
+async def run(args):
+    body = (as_csv if args.format == "csv" else as_jsonl)(reuse_phones(orders(args.orders)))
+    async def stream():
+        for b in body: yield b
+    async with httpx.AsyncClient(base_url=args.base, timeout=None) as client:
+        t0 = time.perf_counter()
+        r = await client.post("/orders/bulk", params={"format": args.format}, content=stream())
+        r.raise_for_status()
+        wall = time.perf_counter() - t0
+        rep = r.json()
+        result = {"format": args.format, "orders": args.orders, "created": rep["created"], "failed": rep["failed"],
+                  "seconds": round(wall, 2), "orders_per_minute": round(rep["created"] / wall * 60),
+                  "sample_errors": [x for x in rep["results"] if not x["ok"]][:2]}
+        if args.compare:
+            t0 = time.perf_counter()
+            for o in reuse_phones(orders(args.compare, seed=3)):
+                if o["type"] == "LEASE": continue
+                (await client.post("/orders", json=o)).raise_for_status()
+            result["single_orders_per_minute"] = round(args.compare / (time.perf_counter() - t0) * 60)
+    dump(result)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--orders", type=int, default=10000)
+    ap.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    ap.add_argument("--compare", type=int, default=0)
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
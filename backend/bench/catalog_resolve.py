@@ -0,0 +1,51 @@
+"""Item-default resolution through the in-memory catalog index.
+
+    python -m bench.catalog_resolve --products 5000 --items 10000
+"""
+import argparse, random, time
+from app.catalog import CatalogIndex
+from .report import dump
+
+WORDS = "hospital bed wheelchair oxygen concentrator walker commode mattress ripple air cushion nebulizer suction machine tilam katil kerusi roda".split()
+
+def synth_catalog(n, rng):
+    products = [(f"SKU{i:05d}", " ".join(rng.sample(WORDS, 3)) + f" {i}", rng.randrange(50, 5000)) for i in range(n)]
+    aliases = [(f"alias {i} {rng.choice(WORDS)}", products[i][0]) for i in rng.sample(range(n), n // 2)]
+    return products, aliases
+
+def synth_items(products, aliases, n, rng):
+    items = []
+    for _ in range(n):
+        kind = rng.random()
+        if kind < 0.2:
+            items.append(("whatever", rng.choice(products)[0], None))
+        elif kind < 0.45:
+            items.append((rng.choice(aliases)[0].upper(), None, None))
+        elif kind < 0.7:
+            items.append((rng.choice(products)[1].title(), None, None))
+        elif kind < 0.9:
+            items.append((" ".join(reversed(rng.choice(products)[1].split())), None, None))  # token match
+        else:
+            items.append(("unknown thing", None, 10.0))
+    return items
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--products", type=int, default=5000)
+    ap.add_argument("--items", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    rng = random.Random(args.seed)
+    products, aliases = synth_catalog(args.products, rng)
+    idx = CatalogIndex()
+    t0 = time.perf_counter(); idx.load(products, aliases); load_s = time.perf_counter() - t0
+    items = synth_items(products, aliases, args.items, rng)
+    t0 = time.perf_counter()
+    out = [idx.resolve(*it) for it in items]
+    resolve_s = time.perf_counter() - t0
+    dump({"products": args.products, "aliases": len(aliases), "items": args.items,
+          "index_load_ms": round(load_s * 1000, 2), "resolve_ms": round(resolve_s * 1000, 2),
+          "per_item_us": round(resolve_s / args.items * 1e6, 2), "resolved": sum(1 for s, _, _ in out if s)})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Malaysian WhatsApp intake transcripts for the intake benchmarks and the model stub.
+
+    python -m bench.corpus --n 5 --seed 1
+
+Kinds (KINDS weights): free-form chats in Malay, English and Manglish that
+need the model (rental, purchase, instalment, urgent discharge, forwarded
+details), templated order forms that the rules path usually takes, and
+return/collect requests quoting an order code. Messages are in WhatsApp
+export form ("[17/10/2026, 9:41:05 AM] Name: text") with the usual noise:
+media placeholders, deleted messages, emoji, one-word replies. Names,
+addresses and products come from bench.datagen.
+"""
+import argparse, itertools, random
+from datetime import datetime, timedelta
+from .datagen import catalog, FIRST, LAST, STREETS, AREAS
+
+ADMIN = ("Admin Kedai", "Kak Ros (Sales)", "MedCare Supply", "+60 3-8912 4455")
+KINDS = (("rental_chat", 30), ("purchase_chat", 20), ("instalment_chat", 10), ("discharge_chat", 10),
+         ("forwarded", 10), ("form", 12), ("event", 8))
+NOISE = ("<Media omitted>", "This message was deleted", "ok", "Ok noted 👍", "tq", "👍", "Baik", "sure", "🙏🙏")
+
+def phone(rng) -> str:
+    d = f"1{rng.choice('0123456789')}{rng.randrange(10**7):07d}"
+    return rng.choice((f"0{d[:2]}-{d[2:5]} {d[5:]}", f"+60{d}", f"0{d}", f"60 {d[:2]}-{d[2:5]} {d[5:]}", f"0{d[:2]} {d[2:]}"))
+
+def address(rng) -> str:
+    area, postcode, city = rng.choice(AREAS)
+    return rng.choice((f"No. {rng.randint(1, 250)}, {rng.choice(STREETS)}, {area}, {postcode} {city}",
+                       f"{rng.randint(1, 99)}-{rng.randint(1, 20)}-{rng.randint(1, 12)}, Pangsapuri {area.split()[-1]}, {postcode} {city}",
+                       f"Lot {rng.randint(100, 9999)}, Kg. {rng.choice(('Baru', 'Sg. Buloh', 'Melayu Subang', 'Pandan'))}, {postcode} {city}"))
+
+class Chat:
+    def __init__(self, rng, when: datetime, customer: str):
+        self.rng, self.when, self.customer, self.admin = rng, when, customer, rng.choice(ADMIN)
+        self.lines = []
+
+    def say(self, who: str, text: str):
+        self.when += timedelta(seconds=self.rng.randint(20, 900))
+        h = self.when.hour % 12 or 12
+        stamp = f"{self.when:%d/%m/%Y}, {h}:{self.when:%M:%S} {'AM' if self.when.hour < 12 else 'PM'}"
+        self.lines.append(f"[{stamp}] {self.customer if who == 'c' else self.admin}: {text}")
+        if self.rng.random() < 0.15: self.lines.append(f"[{stamp}] {self.customer if who == 'c' else self.admin}: {self.rng.choice(NOISE)}")
+
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+def transcript(rng, when: datetime, products, codes=()) -> tuple[str, str]:
+    # -> (kind, text)
+    kind = rng.choices([k for k, _ in KINDS], [w for _, w in KINDS])[0]
+    name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"; tel = phone(rng); addr = address(rng)
+    sku, product, price = rng.choice(products)
+    qty = rng.choice((1, 1, 1, 2)); rm = f"RM{price:,.0f}" if rng.random() < 0.7 else f"rm {price:.2f}"
+    c = Chat(rng, when, rng.choice((name.split()[0], tel, f"~{name}")))
+    if kind == "rental_chat":
+        c.say("c", rng.choice(("Salam, nak tanya {p} ada untuk sewa?", "Assalamualaikum kak, {p} boleh sewa bulanan tak?",
+                               "Hi, still have {p} for rent?")).format(p=product.lower()))
+        c.say("a", f"{rng.choice(('Wsalam, ada.', 'Hi, ada stok.', 'Ada.'))} {product} {rm} sebulan, deposit RM{rng.choice((100, 200, 300))}. Min 1 bulan.")
+        c.say("c", rng.choice(("Ok nak sewa {q}. Untuk ayah saya", "ok boleh, ambil {q} unit", "Nak {q}, bila boleh hantar?")).format(q=qty))
+        c.say("a", "Boleh bagi nama penuh, no tel dan alamat penghantaran?")
+        c.say("c", f"{name}\n{tel}\n{addr}")
+        if rng.random() < 0.5: c.say("c", rng.choice(("Hantar esok pagi boleh?", "Rumah tingkat 3 takde lift ya", "Nanti call anak saya dulu")))
+    elif kind == "purchase_chat":
+        c.say("c", rng.choice(("Hi boss, {p} how much ah?", "Hello, I want to buy {q} {p}. Price?", "Nak beli {p}, harga berapa?")).format(p=product.lower(), q=qty))
+        c.say("a", f"{product} {rm} each. Free delivery Klang Valley.")
+        c.say("c", rng.choice(("ok can. I take {q}", "Ok confirm beli {q} unit", "Can discount a bit? ok nvm, take {q}")).format(q=qty))
+        c.say("c", f"Deliver to {addr}. My no {tel}, name {name}")
+        if rng.random() < 0.4: c.say("c", "Payment I transfer now, will send receipt")
+    elif kind == "instalment_chat":
+        months = rng.choice((6, 12, 18, 24))
+        c.say("c", f"Salam, {product.lower()} boleh ambil ansuran {months} bulan?")
+        c.say("a", f"Boleh. {product} total {rm}, ansuran {months} bulan. Perlu IC dan slip gaji.")
+        c.say("c", f"ok nak ambil instalment. Nama {name}, tel {tel}")
+        c.say("c", f"Alamat: {addr}")
+    elif kind == "discharge_chat":
+        _, extra, _ = rng.choice(products)
+        c.say("c", rng.choice(("Urgent!! Mak discaj dari hospital petang ni, perlu {p} dan {e}",
+                               "Hi, my father discharge tomorrow from PPUM, need {p} + {e} asap")).format(p=product.lower(), e=extra.lower()))
+        c.say("a", "Ada stok dua-dua. Nak sewa atau beli?")
+        c.say("c", rng.choice(("sewa dulu 1 bulan", "rent first", "beli terus la")))
+        c.say("c", f"{name} {tel}\n{addr}\n(gate code {rng.randint(1000, 9999)}#)")
+    elif kind == "forwarded":
+        c.say("c", rng.choice(("Forwarded:", "Fwd dari adik saya", "⬇️ details")))
+        c.say("c", f"Pesanan untuk {name}\nHP {tel}\n{addr}\n{qty}x {product.lower()} @ {rm}\n{rng.choice(('sewa', 'beli', 'ansuran'))}")
+    elif kind == "form":
+        return kind, "\n".join((f"Nama: {name}", f"Tel: {tel}", f"Alamat: {addr}", f"Item: {product} x{qty} {rm}",
+                                f"Jenis: {rng.choice(('Sewa', 'Beli', 'Ansuran'))}", f"Tarikh: {when:%d/%m/%Y %H:%M}", f"Nota: {rng.choice(('Hantar pagi', 'Call dulu', '-'))}"))
+    else:
+        code = rng.choice(codes) if codes else f"ORD{rng.randint(1, 99999):06d}"
+        c.say("c", rng.choice(("Salam, mak dah sihat. Nak pulangkan {p}, order {o}. Boleh ambil Sabtu?",
+                               "Hi, please collect the {p} for {o}, no longer needed. Thanks",
+                               "Boleh pick up {p} ({o}) minggu ni?")).format(p=product.lower(), o=code))
+        c.say("a", "Baik, nanti driver call sehari sebelum.")
+    return kind, c.text()
+
+def stream(seed: int = 1, start: datetime | None = None, codes=()):
+    # endless (kind, text); start: first message time (default now), ~5 minutes between
+    # transcripts, so runs started at different times send texts the parse cache hasn't seen
+    rng = random.Random(seed)
+    products, _ = catalog()
+    start = start or datetime.now().replace(microsecond=0)
+    for i in itertools.count():
+        yield transcript(rng, start + timedelta(seconds=i * 307), products, codes)
+
+def corpus(n: int, seed: int = 1, start: datetime | None = None, codes=()) -> list[tuple[str, str]]:
+    return list(itertools.islice(stream(seed, start, codes), n))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    for kind, text in corpus(args.n, args.seed):
+        print(f"---- {kind} ----\n{text}\n")
+
+if __name__ == "__main__":
+    main()
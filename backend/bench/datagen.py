@@ -0,0 +1,217 @@
+"""Seeded synthetic data for load tests.
+
+    python -m bench.datagen --scale 100k --seed 1 --reset
+
+Fills products2 and product_aliases2 (a fixed ~200-product medical equipment
+catalogue), then customers2, orders2, order_items2, payments2 and
+order_balances2 for --scale orders (10k, 100k, 1m; or a plain number):
+about 2.5 orders per customer, 1-4 items per order, 0-3 payments, balances
+consistent with both, created_at spread over the last two years in id order.
+Rows go in with COPY, BATCH orders per transaction. Everything drawn comes
+from random.Random(--seed), so the same seed on a --reset database gives the
+same rows, ids and order codes. Without --reset rows are appended after the
+current ids/codes and products already present are left as they are.
+Afterwards the id sequences and orders2_code_seq are moved past the new rows
+and the tables analyzed. Restart the API afterwards (catalog index, PDF cache).
+Needs DATABASE_URL; writes to that database.
+"""
+import argparse, csv, io, random, sys, time
+from datetime import datetime, timedelta
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+BATCH = 20_000
+ORDERS_PER_CUSTOMER = 2.5
+DAYS = 730
+TABLES = ("customers2", "orders2", "order_items2", "payments2", "order_balances2", "events2", "products2", "product_aliases2")
+
+# ---- catalogue ----
+PRODUCTS = [  # (sku prefix, name, aliases, price range)
+    ("BED", "Katil Hospital", ("katil", "hospital bed", "bed"), (800, 6500)),
+    ("WCH", "Kerusi Roda", ("wheelchair", "kerusi roda", "w/chair"), (250, 3800)),
+    ("OXY", "Oxygen Concentrator", ("oksigen", "oxygen machine", "o2"), (1800, 5200)),
+    ("MAT", "Tilam Beralun", ("ripple mattress", "air mattress", "tilam angin"), (180, 900)),
+    ("WLK", "Walker", ("walking frame", "tongkat walker"), (60, 400)),
+    ("CMD", "Commode Chair", ("kerusi tandas", "commode"), (90, 650)),
+    ("NEB", "Nebulizer", ("nebuliser", "neb machine"), (80, 450)),
+    ("SUC", "Suction Machine", ("mesin sedut", "suction"), (350, 1600)),
+    ("CUS", "Air Cushion", ("kusyen angin", "cushion"), (70, 380)),
+    ("HOI", "Patient Hoist", ("lifter", "hoist"), (2200, 7800)),
+    ("TBL", "Overbed Table", ("meja katil", "bed table"), (120, 480)),
+    ("TNK", "Oxygen Tank", ("tangki oksigen", "o2 tank", "silinder"), (300, 1100)),
+]
+VARIANTS = ("Standard", "Deluxe", "Lightweight", "Heavy Duty", "Foldable", "Electric", "Manual", "2 Function",
+            "3 Function", "5 Function", "Pediatric", "Bariatric", "Premium", "Basic", "Compact", "Reclining", "Travel")
+
+def catalog(seed: int = 1):
+    # -> [(sku, name, price)], [(alias, sku)]; deterministic for the seed
+    rng = random.Random(f"catalog-{seed}")
+    products, aliases = [], []
+    for prefix, base, syn, (lo, hi) in PRODUCTS:
+        for i, v in enumerate(VARIANTS):
+            sku = f"{prefix}-{i + 1:03d}"; name = f"{base} {v}"
+            products.append((sku, name, rng.randrange(lo, hi) + rng.choice((0, 0.5, 0.9))))
+            for a in rng.sample(syn, rng.randint(1, len(syn))):
+                aliases.append((f"{a} {v.lower()}", sku))
+    return products, aliases
+
+# ---- people ----
+FIRST = ("Ahmad", "Siti", "Nurul", "Muhammad", "Aisyah", "Hafiz", "Farah", "Tan", "Lim", "Wong", "Lee", "Chong",
+         "Kumar", "Priya", "Rajesh", "Devi", "Mei Ling", "Wei Jie", "Amirul", "Zainab", "Faizal", "Kavitha", "Suresh")
+LAST = ("bin Abdullah", "binti Hassan", "bin Ismail", "binti Omar", "Ah Kow", "Mei Hua", "Chee Keong", "a/l Muthu",
+        "a/p Raman", "Kok Wai", "bin Yusof", "binti Rahman", "Siew Lan", "a/l Krishnan", "bin Osman")
+STREETS = ("Jalan Ampang", "Jalan Tun Razak", "Jalan Klang Lama", "Jalan Bukit Bintang", "Jalan SS2/24", "Jalan Kenari 5",
+           "Jalan Melati 3", "Jalan Cempaka", "Lorong Maarof", "Jalan Damai 2")
+AREAS = (("Taman Desa", "58100", "Kuala Lumpur"), ("Bandar Utama", "47800", "Petaling Jaya"), ("Taman Melawati", "53100", "Kuala Lumpur"),
+         ("Bukit Jelutong", "40150", "Shah Alam"), ("Taman Sri Muda", "40400", "Shah Alam"), ("Setapak Jaya", "53300", "Kuala Lumpur"),
+         ("Bandar Baru Bangi", "43650", "Bangi"), ("Taman Molek", "81100", "Johor Bahru"), ("Bayan Lepas", "11900", "Pulau Pinang"))
+
+def phone(cid: int, seed: int) -> str:
+    # 7919 is coprime with 10**8, so distinct ids give distinct numbers
+    return f"01{(cid * 7919 + seed * 104729) % 10**8:08d}"
+
+# ---- orders ----
+TYPES = (("RENTAL", 0.4), ("INSTALMENT", 0.3), ("OUTRIGHT", 0.3))
+STATUSES = (("CONFIRMED", 0.85), ("DRAFT", 0.05), ("RETURNED", 0.05), ("CANCELLED", 0.05))
+METHODS = ("CASH", "BANK", "DUITNOW", "CARD", "TNG")
+NOTES = ("", "", "", "", "Hantar pagi", "Call before delivery", "Lift tiada, tingkat 3", "Pasang sekali", "Deposit paid by son")
+
+def pick(rng, weighted):
+    r = rng.random()
+    for v, w in weighted:
+        r -= w
+        if r < 0: return v
+    return weighted[-1][0]
+
+class Writer:
+    # one CSV buffer per table, sent with COPY on flush; all quoted so "" stays an empty string, not NULL
+    COLUMNS = {
+        "customers2": ("id", "name", "phone", "phone_canonical", "address"),
+        "orders2": ("id", "order_code", "customer_id", "type", "status", "created_at", "notes"),
+        "order_items2": ("id", "order_id", "sku", "name", "qty", "unit_price"),
+        "payments2": ("id", "order_id", "amount", "method", "created_at"),
+        "order_balances2": ("order_id", "total", "paid", "balance", "version"),
+    }
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.bufs = {t: io.StringIO() for t in self.COLUMNS}
+        self.out = {t: csv.writer(b, quoting=csv.QUOTE_ALL) for t, b in self.bufs.items()}
+        self.rows = dict.fromkeys(self.COLUMNS, 0)
+
+    def row(self, table, *values):
+        self.out[table].writerow(values); self.rows[table] += 1
+
+    def flush(self):
+        cur = self.conn.cursor()
+        for t, cols in self.COLUMNS.items():
+            b = self.bufs[t]
+            if b.tell():
+                b.seek(0)
+                cur.copy_expert(f"COPY {t} ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", b)
+                b.seek(0); b.truncate()
+        self.conn.commit()
+
+def start_ids(cur):
+    q = lambda sql: cur.execute(sql) or cur.fetchone()[0]
+    ids = {t: q(f"SELECT coalesce(max(id), 0) FROM {t}") for t in ("customers2", "orders2", "order_items2", "payments2")}
+    code = max(q("SELECT coalesce(max(substring(order_code from '^ORD([0-9]+)$')::bigint), 0) FROM orders2"),
+               q("SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM orders2_code_seq"))
+    return ids, code
+
+def generate(conn, n_orders: int, seed: int) -> dict:
+    from app.utils import norm_phone
+    rng = random.Random(seed)
+    cur = conn.cursor()
+    products, aliases = catalog(seed)
+    cur.execute("SELECT count(*) FROM products2"); had_products = cur.fetchone()[0]
+    if not had_products:
+        cur.executemany("INSERT INTO products2 (sku, name, default_price) VALUES (%s, %s, %s)", products)
+        cur.executemany("INSERT INTO product_aliases2 (alias, sku) VALUES (%s, %s)", aliases)
+        conn.commit()
+    ids, code = start_ids(cur)
+    w = Writer(conn)
+
+    n_cust = max(1, int(n_orders / ORDERS_PER_CUSTOMER))
+    c0 = ids["customers2"]
+    for i in range(1, n_cust + 1):
+        cid = c0 + i; p = phone(cid, seed); street, (area, postcode, city) = rng.choice(STREETS), rng.choice(AREAS)
+        w.row("customers2", cid, f"{rng.choice(FIRST)} {rng.choice(LAST)}", p, norm_phone(p),
+              f"No. {rng.randint(1, 250)}, {street}, {area}, {postcode} {city}")
+        if i % BATCH == 0: w.flush()
+    w.flush()
+
+    oid, iid, pid = ids["orders2"], ids["order_items2"], ids["payments2"]
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(days=DAYS)
+    step = DAYS * 86400 / n_orders
+    for i in range(n_orders):
+        oid += 1; code += 1
+        created = start + timedelta(seconds=int(i * step + rng.random() * step))
+        status = pick(rng, STATUSES)
+        w.row("orders2", oid, f"ORD{code:06d}", c0 + 1 + int(n_cust * rng.random() ** 1.5), pick(rng, TYPES), status, created, rng.choice(NOTES))
+        total = 0.0
+        for _ in range(rng.choice((1, 1, 1, 2, 2, 3, 4))):
+            iid += 1
+            if rng.random() < 0.1:  # free-text line, no SKU
+                sku, name, price = "", rng.choice(("Delivery charge", "Pemasangan", "Deposit", "Service")), float(rng.randrange(20, 200))
+            else:
+                sku, name, price = rng.choice(products)
+            qty = rng.choice((1, 1, 1, 1, 2, 3))
+            w.row("order_items2", iid, oid, sku, name, qty, f"{price:.2f}")
+            total += round(price, 2) * qty
+        paid, version = 0.0, 1
+        r = rng.random()
+        if status != "CANCELLED" and r < 0.8:
+            target = total if r < 0.45 else round(total * rng.uniform(0.1, 0.9), 2)
+            k = rng.randint(1, 3)
+            for j in range(k):
+                amount = round(target - paid, 2) if j == k - 1 else round(target / k, 2)
+                if amount <= 0: break
+                pid += 1; paid = round(paid + amount, 2); version += 1
+                w.row("payments2", pid, oid, f"{amount:.2f}", rng.choice(METHODS), created + timedelta(days=rng.randint(0, 60), seconds=rng.randint(0, 86399)))
+        w.row("order_balances2", oid, f"{total:.2f}", f"{paid:.2f}", f"{total - paid:.2f}", version)
+        if (i + 1) % BATCH == 0: w.flush()
+    w.flush()
+    return {"products": 0 if had_products else len(products), "aliases": 0 if had_products else len(aliases),
+            "customers": w.rows["customers2"], "orders": w.rows["orders2"], "items": w.rows["order_items2"], "payments": w.rows["payments2"]}
+
+def finish(conn):
+    from app import codes
+    cur = conn.cursor()
+    for t in ("customers2", "orders2", "order_items2", "payments2", "product_aliases2"):
+        cur.execute(f"SELECT setval(pg_get_serial_sequence('{t}', 'id'), greatest((SELECT max(id) FROM {t}), 1))")
+    for s in codes.SCHEMA + [codes.CATCH_UP]: cur.execute(s)
+    conn.commit()
+    conn.autocommit = True
+    cur.execute("ANALYZE " + ", ".join(TABLES))
+    conn.autocommit = False
+
+def scale(v: str) -> int:
+    return SCALES.get(v.lower()) or int(v)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scale", type=scale, default="10k", help="orders: 10k, 100k, 1m or a number")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--reset", action="store_true", help=f"truncate {', '.join(TABLES)} first")
+    args = ap.parse_args()
+    from app.db import engine
+    from app.schema import ensure
+    from .report import dump
+    ensure(engine)
+    conn = engine.raw_connection()
+    try:
+        if args.reset:
+            cur = conn.cursor()
+            cur.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE"); cur.execute("ALTER SEQUENCE orders2_code_seq RESTART"); conn.commit()
+        t0 = time.perf_counter()
+        out = generate(conn, args.scale, args.seed)
+        t1 = time.perf_counter()
+        finish(conn)
+        rows = sum(out.values()) + out["orders"]  # + balances
+        dump({"scale": args.scale, "seed": args.seed, **out, "load_seconds": round(t1 - t0, 1),
+              "analyze_seconds": round(time.perf_counter() - t1, 1), "rows_per_s": round(rows / (t1 - t0))})
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""Peak RSS of the streaming Excel writer at increasing row counts.
+
+    cd backend && python -m bench.export_excel --rows 10000 100000 1000000
+
+Each size runs in a fresh interpreter so ru_maxrss is per size.
+"""
+import argparse, json, resource, subprocess, sys, time
+
+def rows(n):
+    for i in range(n):
+        yield {"order_code": f"ORD{i:06d}", "type": "RENTAL", "status": "CONFIRMED", "customer": f"Customer {i}",
+               "phone": f"+6012{i:07d}", "total": 350.0, "paid": 100.0, "balance": 250.0}
+
+def run_one(n):
+    from app.export_excel import orders_to_excel_file
+    t0 = time.perf_counter()
+    f = orders_to_excel_file(rows(n))
+    f.seek(0, 2); size = f.tell(); f.close()
+    return {"rows": n, "seconds": round(time.perf_counter() - t0, 2), "xlsx_bytes": size,
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--one", type=int, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.one is not None:
+        print(json.dumps(run_one(args.one))); return
+    for n in args.rows:
+        out = subprocess.run([sys.executable, "-m", "bench.export_excel", "--one", str(n)], capture_output=True, text=True, check=True)
+        print(out.stdout.strip())
+
+if __name__ == "__main__":
+    main()
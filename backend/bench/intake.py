@@ -0,0 +1,171 @@
+"""Intake calls in flight must not stall the rest of the API.
+
+    python -m bench.model_stub --port 8900 --latency 3
+    OPENAI_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=stub uvicorn app.main:app --port 8000
+    python -m bench.intake --base http://localhost:8000 --concurrency 20 --seconds 15
+
+Reports intake latency/throughput and /api/health latency measured while the
+intake calls are outstanding.
+
+    python -m bench.intake --base http://localhost:8000 --batch 50
+
+Times one /api/intake/parse-batch call of N unique texts against a few
+sequential single-text calls.
+
+    python -m bench.model_stub --port 8900
+    OPENAI_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=stub OPENAI_TIMEOUT=10 uvicorn app.main:app --port 8000
+    python -m bench.intake --base http://localhost:8000 --stub http://localhost:8900 --profiles fast,slow,timeouts,flaky --out intake.json
+
+For each profile in PROFILES, sets the stub's latency/errors/malformed output
+(POST /_stub/config) and drives /api/intake/parse (create=false and, at
+--create-share of those, create=true) and /parse for --seconds at --concurrency
+with WhatsApp transcripts from bench.corpus, each sent once except --repeat
+of them (those should come back from the parse cache). Per profile: latency
+and throughput of successful requests overall and per endpoint, how long
+failed ones took, responses by status and by source (llm, rules, cache),
+the stub's call counts (model calls per model-parsed request shows the
+retries), and /api/health latency meanwhile.
+"""
+import argparse, asyncio, random, time
+from collections import Counter
+import httpx
+from .corpus import stream
+from .report import summarize, meta, dump
+
+PROFILES = {  # stub settings; anything not given is reset to STUB_DEFAULTS
+    "fast": {"latency": 0.3, "jitter": 0.3},
+    "slow": {"latency": 3.0, "jitter": 0.5},
+    "timeouts": {"latency": 0.8, "jitter": 0.3, "slow_rate": 0.1, "slow_latency": 60},  # beyond OPENAI_TIMEOUT
+    "flaky": {"latency": 0.8, "jitter": 0.3, "error_rate": 0.2, "malformed_rate": 0.05},
+    "down": {"error_rate": 1.0, "error_status": [503]},  # every call fails: how fast do requests give up
+}
+STUB_DEFAULTS = {"latency": 0.0, "jitter": 0.0, "slow_rate": 0.0, "slow_latency": 30.0,
+                 "error_rate": 0.0, "error_status": [500, 503, 429], "malformed_rate": 0.0}
+
+TEXT = "Nama: Siti Aminah\nTel: 012-345 6789\nAlamat: No 12, Jalan Mawar, Taman Melati\nSewa katil hospital 3 function RM350/bulan"
+
+async def intake_worker(client, deadline, lat, errs):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            r = await client.post("/api/intake/parse", params={"create": "false"}, json={"text": TEXT})
+            r.raise_for_status()
+            lat.append(time.perf_counter() - t0)
+        except httpx.HTTPError:
+            errs.append(1)
+
+async def health_prober(client, deadline, lat, errs, interval):
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        try:
+            (await client.get("/api/health")).raise_for_status()
+            lat.append(time.perf_counter() - t0)
+        except httpx.HTTPError:
+            errs.append(1)
+        await asyncio.sleep(interval)
+
+def unique_texts(n):
+    tag = time.time_ns()
+    return [f"{TEXT}\nRef {tag}-{i}" for i in range(n)]
+
+async def run_batch(args):
+    async with httpx.AsyncClient(base_url=args.base, timeout=600) as client:
+        singles = []
+        for text in unique_texts(3):
+            t0 = time.perf_counter()
+            (await client.post("/api/intake/parse", params={"create": "false"}, json={"text": text})).raise_for_status()
+            singles.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        r = await client.post("/api/intake/parse-batch", params={"create": "false"}, json={"texts": unique_texts(args.batch)})
+        r.raise_for_status()
+        wall = time.perf_counter() - t0
+    single = sum(singles) / len(singles)
+    dump({"batch_size": args.batch, "batch_wall_s": round(wall, 2), "single_call_s": round(single, 2),
+          "batch_in_single_calls": round(wall / single, 1), "failed": sum(1 for x in r.json()["results"] if not x["ok"])})
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base, timeout=120, limits=httpx.Limits(max_connections=args.concurrency + 4)) as client:
+        lat, errs, hlat, herrs = [], [], [], []
+        t0 = time.perf_counter(); deadline = t0 + args.seconds
+        await asyncio.gather(*(intake_worker(client, deadline, lat, errs) for _ in range(args.concurrency)),
+                             health_prober(client, deadline, hlat, herrs, args.probe_interval))
+        elapsed = time.perf_counter() - t0
+    dump({"concurrency": args.concurrency, "intake": summarize(lat, elapsed, len(errs)), "health": summarize(hlat, elapsed, len(herrs))})
+
+# ---- profiles against the model stub ----
+class Phase:
+    def __init__(self):
+        self.lat = {"intake": [], "parse": []}; self.failed = []
+        self.status, self.source, self.errors = Counter(), Counter(), Counter()
+
+async def corpus_worker(client, texts, sent, rng, args, deadline, phase):
+    while time.perf_counter() < deadline:
+        text = rng.choice(sent) if sent and rng.random() < args.repeat else next(texts)[1]
+        sent.append(text)
+        if rng.random() < 0.5:
+            name, req = "parse", client.post("/parse", json={"text": text})
+        else:
+            create = "true" if rng.random() < args.create_share else "false"
+            name, req = "intake", client.post("/api/intake/parse", params={"create": create}, json={"text": text})
+        t0 = time.perf_counter()
+        try:
+            r = await req
+            status = r.status_code
+        except httpx.TimeoutException:
+            status = "client_timeout"
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        dt = time.perf_counter() - t0
+        phase.status[str(status)] += 1
+        if status == 200:
+            phase.lat[name].append(dt); phase.source[r.json().get("source", "?")] += 1
+        else:
+            phase.failed.append(dt); phase.errors[name] += 1
+
+async def run_profiles(args):
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base, timeout=args.timeout, limits=limits) as client, \
+               httpx.AsyncClient(base_url=args.stub, timeout=10) as stub:
+        r = await client.get("/api/orders", params={"limit": 200})
+        codes = [o["order_code"] for o in r.json()["items"]] if r.status_code == 200 else []
+        texts = stream(args.seed, codes=codes); sent = []
+        out = {}
+        for name in args.profiles.split(","):
+            if name not in PROFILES: raise SystemExit(f"unknown profile {name!r}; one of {', '.join(PROFILES)}")
+            cfg = (await stub.post("/_stub/config", json={**STUB_DEFAULTS, **PROFILES[name]})).json()
+            phase = Phase(); hlat, herrs = [], []
+            t0 = time.perf_counter(); deadline = t0 + args.seconds
+            await asyncio.gather(*(corpus_worker(client, texts, sent, random.Random(args.seed * 1000 + i), args, deadline, phase)
+                                   for i in range(args.concurrency)),
+                                 health_prober(client, deadline, hlat, herrs, args.probe_interval))
+            elapsed = time.perf_counter() - t0  # includes requests still running at the deadline
+            model = (await stub.get("/_stub/stats")).json()
+            if phase.source["llm"]: model["calls_per_llm_result"] = round(model.get("calls", 0) / phase.source["llm"], 2)
+            ok = phase.lat["intake"] + phase.lat["parse"]
+            out[name] = {"stub": cfg, "overall": summarize(ok, elapsed, len(phase.failed)),
+                         "endpoints": {k: summarize(v, elapsed, phase.errors[k]) for k, v in phase.lat.items()},
+                         "failed": summarize(phase.failed, elapsed), "status": phase.status, "source": phase.source,
+                         "model": model, "health": summarize(hlat, elapsed, len(herrs))}
+    dump({"meta": meta(bench="intake", base=args.base, concurrency=args.concurrency, seconds=args.seconds, seed=args.seed,
+                       repeat=args.repeat, create_share=args.create_share),
+          "profiles": out}, args.out)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--seconds", type=float, default=15)
+    ap.add_argument("--probe-interval", type=float, default=0.05)
+    ap.add_argument("--batch", type=int, help="time one parse-batch call of this many texts instead")
+    ap.add_argument("--profiles", help=f"comma-separated stub profiles to run instead: {', '.join(PROFILES)}")
+    ap.add_argument("--stub", default="http://localhost:8900", help="bench.model_stub the server under test is pointed at")
+    ap.add_argument("--repeat", type=float, default=0.05, help="share of requests resending an earlier transcript")
+    ap.add_argument("--create-share", type=float, default=0.3, help="share of /api/intake/parse calls with create=true")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--out", help="also write the JSON result here (--profiles)")
+    args = ap.parse_args()
+    asyncio.run(run_profiles(args) if args.profiles else run_batch(args) if args.batch else run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""PDFs per second for a batch invoice run at different pool sizes.
+
+    python -m bench.invoice_batch --invoices 200 --workers 1 2 4
+
+Renders synthetic invoices (--lines items each) through the same
+render_all() path /invoices/batch uses, once inline in this process and once
+per pool size. Pools are warmed up first so spawn time is not counted.
+Throughput can only scale up to the number of cores reported.
+"""
+import argparse, asyncio, os, time, uuid
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from types import SimpleNamespace
+from app import invoice_batch, pdf_cache
+
+def jobs(n, lines):
+    tag = uuid.uuid4().hex
+    profile = SimpleNamespace(**{f: None for f in pdf_cache.PROFILE_FIELDS})
+    profile.company_name = "Bench Sdn Bhd"; profile.bank_name = "Maybank"; profile.bank_account_no = "5123 4567 8901"
+    return [{
+        "order_id": i, "order_code": f"ORD{i:06d}", "title": "INVOICE", "key": f"{tag}-{i}",
+        "order": SimpleNamespace(order_code=f"ORD{i:06d}"),
+        "customer": SimpleNamespace(name=f"Customer {i}", phone="0123456789", address="No 12, Jalan Mawar, Taman Melati"),
+        "items": [SimpleNamespace(name=f"Item {k}", qty=1 + k % 3, unit_price=50 + k) for k in range(lines)],
+        "payments": [SimpleNamespace(amount=100)], "profile": profile,
+    } for i in range(n)]
+
+async def drain(js, pool):
+    n = 0
+    async for _ in invoice_batch.render_all(js, pool):
+        n += 1
+    return n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--invoices", type=int, default=200)
+    ap.add_argument("--lines", type=int, default=10)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = ap.parse_args()
+    pdf_cache.PDF_CACHE_DIR = ""; pdf_cache._lru.size = 0
+
+    t0 = time.perf_counter()
+    for j in jobs(args.invoices, args.lines):
+        invoice_batch.render(j)
+    inline = args.invoices / (time.perf_counter() - t0)
+    print(f"cores={len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()} invoices={args.invoices} lines={args.lines}")
+    print(f"inline      {inline:7.1f} pdf/s")
+    for w in args.workers:
+        with ProcessPoolExecutor(w, mp_context=get_context("spawn")) as pool:
+            asyncio.run(drain(jobs(w * 2, 1), pool))  # start every worker
+            js = jobs(args.invoices, args.lines)
+            t0 = time.perf_counter()
+            asyncio.run(drain(js, pool))
+            rate = args.invoices / (time.perf_counter() - t0)
+        print(f"workers={w:<3} {rate:7.1f} pdf/s  x{rate / inline:.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Invoice render time by order size.
+
+    python -m bench.invoice_render --lines 10 100 1000 --repeat 20
+
+Renders a synthetic order with N item lines (profile with bank footer and a
+local logo) and reports p50/p99 render time, page count and PDF size. The
+first render of a profile builds its layout; the numbers are for warm renders
+unless --cold is given.
+"""
+import argparse, io, statistics, time
+from types import SimpleNamespace as N
+from PIL import Image
+from app import invoice_pdf, logo_cache
+from .report import percentile
+
+def profile():
+    img = Image.new("RGB", (360, 120), (0, 90, 160)); buf = io.BytesIO(); img.save(buf, "PNG")
+    url = "bench://logo"
+    logo_cache._mem[url] = (time.monotonic(), buf.getvalue(), float("-inf"))  # no network in the bench
+    return N(company_name="Evin Medical Sdn Bhd", registration_no="202301234567", address="No 1, Jalan Industri 3, 47100 Puchong",
+             phone="03-8000 1234", email="billing@example.my", logo_url=url, bank_name="Maybank", bank_account_name="Evin Medical",
+             bank_account_no="5123 4567 8901", footer_note="Goods sold are not returnable.", tax_label=None, tax_percent=None)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--lines", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--cold", action="store_true", help="drop the layout cache before every render")
+    args = ap.parse_args()
+    prof = profile()
+    order, cust = N(order_code="ORD000123"), N(name="Siti Aminah", phone="012-345 6789", address="No 12, Jalan Mawar, Taman Melati")
+    pays = [N(amount=100), N(amount=250)]
+    for n in args.lines:
+        items = [N(name=f"Sewa katil hospital 3 function bulan {k + 1}", qty=1 + k % 3, unit_price=350) for k in range(n)]
+        invoice_pdf.generate_invoice_pdf(order, items, cust, payments=pays, profile=prof)
+        times = []
+        for _ in range(args.repeat):
+            if args.cold: invoice_pdf._layouts.data.clear()
+            t0 = time.perf_counter()
+            pdf = invoice_pdf.generate_invoice_pdf(order, items, cust, payments=pays, profile=prof)
+            times.append(time.perf_counter() - t0)
+        s = sorted(times)
+        pages = pdf.count(b"/Type /Page\n") or pdf.count(b"/Type /Page ")
+        print(f"lines={n:<5} p50={statistics.median(s)*1000:8.2f} ms  p99={percentile(s, 99)*1000:8.2f} ms  pages={pages:<3} bytes={len(pdf)}")
+
+if __name__ == "__main__":
+    main()
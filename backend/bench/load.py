@@ -0,0 +1,142 @@
+"""Mixed read/write load against a running API.
+
+    python -m bench.datagen --scale 100k --reset
+    uvicorn app.main:app --port 8000 --workers 2
+    python -m bench.load --base http://localhost:8000 --concurrency 32 --seconds 60 --out run.json
+    python -m bench.report base.json run.json
+
+--concurrency closed-loop clients each pick a scenario by weight (--mix
+name=weight,... overrides DEFAULT_MIX; weight 0 drops one), run it and go
+again, for --warmup seconds (not recorded) and then --seconds. Order codes
+for payments and PDFs are a sample of existing orders taken at startup, so
+the data has to be there first (bench.datagen, or any real copy). Choices
+come from random.Random(--seed + client number): the same seed gives the same
+request sequence per client. Any HTTP error or status >= 400 counts as an
+error. The result (meta, overall and per-scenario summarize() blocks) is
+printed and written to --out for bench.report to compare.
+"""
+import argparse, asyncio, random, time
+from datetime import date, timedelta
+import httpx
+from .datagen import catalog, DAYS, FIRST
+from .report import summarize, meta, dump
+
+DEFAULT_MIX = {"orders_page": 15, "orders_search": 10, "outstanding": 15, "create_order": 8, "payment": 15,
+               "invoice_pdf": 10, "receipt_pdf": 5, "suggest": 20, "export_excel": 2}
+
+class Context:
+    def __init__(self, codes, products, aliases):
+        self.codes = codes
+        self.products = products
+        names = [p[1] for p in products]
+        # typed prefixes, aliases, tokens out of order
+        self.queries = [n[:k] for n in names for k in (3, 6)] + [a for a, _ in aliases] + [" ".join(n.split()[::-1]) for n in names]
+
+# ---- scenarios: (client, rng, ctx) -> response ----
+async def orders_page(c, rng, ctx):
+    return await c.get("/orders", params={"limit": 50})
+
+async def orders_search(c, rng, ctx):
+    return await c.get("/orders", params={"q": rng.choice(FIRST), "limit": 20})
+
+async def outstanding(c, rng, ctx):
+    params = {"limit": 50}
+    if rng.random() < 0.5: params["overdue_only"] = "true"
+    if rng.random() < 0.3: params["type"] = rng.choice(("RENTAL", "INSTALMENT", "OUTRIGHT"))
+    return await c.get("/api/outstanding", params=params)
+
+async def create_order(c, rng, ctx):
+    items = [{"name": p[1], "sku": p[0], "qty": rng.randint(1, 2)} for p in rng.sample(ctx.products, rng.randint(1, 3))]
+    return await c.post("/orders", json={"name": f"Load {rng.choice(FIRST)}", "phone": f"019{rng.randrange(10**7):07d}",
+                                         "type": rng.choice(("RENTAL", "INSTALMENT", "OUTRIGHT")), "items": items})
+
+async def payment(c, rng, ctx):
+    return await c.post("/payments", json={"order_code": rng.choice(ctx.codes), "amount": 1, "method": "CASH"})
+
+async def invoice_pdf(c, rng, ctx):
+    return await c.get(f"/orders/{rng.choice(ctx.codes)}/invoice.pdf")
+
+async def receipt_pdf(c, rng, ctx):
+    return await c.get(f"/orders/{rng.choice(ctx.codes)}/receipt.pdf")
+
+async def suggest(c, rng, ctx):
+    return await c.get("/suggest/items", params={"q": rng.choice(ctx.queries)})
+
+async def export_excel(c, rng, ctx):
+    day = date.today() - timedelta(days=rng.randrange(DAYS))
+    return await c.get("/export/excel", params={"date_from": day.isoformat(), "date_to": day.isoformat()})
+
+SCENARIOS = {f.__name__: f for f in (orders_page, orders_search, outstanding, create_order, payment,
+                                     invoice_pdf, receipt_pdf, suggest, export_excel)}
+
+def parse_mix(s: str | None) -> dict:
+    mix = dict(DEFAULT_MIX)
+    for part in filter(None, (s or "").split(",")):
+        k, _, v = part.partition("=")
+        if k not in SCENARIOS: raise SystemExit(f"unknown scenario {k!r}; one of {', '.join(SCENARIOS)}")
+        mix[k] = float(v)
+    return {k: w for k, w in mix.items() if w > 0}
+
+async def sample_codes(c, n):
+    # newest orders first, then outstanding ones (older, open balances)
+    codes = []
+    for path, upto in (("/api/orders", n // 2), ("/api/outstanding", n)):
+        cursor = None
+        while len(codes) < upto:
+            r = await c.get(path, params={"limit": 500, **({"cursor": cursor} if cursor else {})})
+            r.raise_for_status(); page = r.json()
+            codes += [x["order_code"] for x in page["items"]]; cursor = page["next_cursor"]
+            if not cursor: break
+    return sorted(set(codes))
+
+async def client_loop(c, rng, ctx, names, weights, warm_until, deadline, lat, errs):
+    while (now := time.perf_counter()) < deadline:
+        name = rng.choices(names, weights)[0]
+        t0 = time.perf_counter(); ok = True
+        try:
+            r = await SCENARIOS[name](c, rng, ctx)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        if now < warm_until: continue
+        if ok: lat[name].append(time.perf_counter() - t0)
+        else: errs[name] += 1
+
+async def run(args):
+    mix = parse_mix(args.mix)
+    products, aliases = catalog(args.data_seed)
+    limits = httpx.Limits(max_connections=args.concurrency + 4)
+    async with httpx.AsyncClient(base_url=args.base, limits=limits, timeout=args.timeout) as c:
+        codes = await sample_codes(c, args.sample)
+        if not codes: raise SystemExit("no orders in the database: run bench.datagen first")
+        ctx = Context(codes, products, aliases)
+        names, weights = list(mix), list(mix.values())
+        lat = {k: [] for k in names}; errs = dict.fromkeys(names, 0)
+        t0 = time.perf_counter(); warm_until = t0 + args.warmup; deadline = warm_until + args.seconds
+        await asyncio.gather(*(client_loop(c, random.Random(args.seed * 1000 + i), ctx, names, weights, warm_until, deadline, lat, errs)
+                               for i in range(args.concurrency)))
+    elapsed = args.seconds
+    result = {
+        "meta": meta(bench="load", base=args.base, concurrency=args.concurrency, seconds=args.seconds, warmup=args.warmup,
+                     seed=args.seed, mix=mix, sampled_codes=len(codes)),
+        "overall": summarize([v for l in lat.values() for v in l], elapsed, sum(errs.values())),
+        "scenarios": {k: summarize(lat[k], elapsed, errs[k]) for k in names},
+    }
+    dump(result, args.out)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=30)
+    ap.add_argument("--warmup", type=float, default=5)
+    ap.add_argument("--mix", help=f"name=weight,... over the defaults {DEFAULT_MIX}")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--data-seed", type=int, default=1, help="bench.datagen --seed (suggest queries come from its catalogue)")
+    ap.add_argument("--sample", type=int, default=2000, help="order codes sampled for payments and PDFs")
+    ap.add_argument("--timeout", type=float, default=60)
+    ap.add_argument("--out", help="also write the JSON result here")
+    asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Invoice render time with a logo served by a local HTTP stand-in.
+
+    python -m bench.logo_cache --delay 2 --renders 20 [--concurrency 8]
+
+Serves a large PNG from a local http.server (optionally --delay seconds per
+request) and renders invoices whose profile points at it, at a host that
+never answers, and at a 404. Reports the first (cold) render and the p50 of
+the rest, plus how many requests reached the stand-in.
+
+Before that it checks the cache itself (logo_cache.get, fetches counted) and
+exits 1 if any check fails:
+  slow_host_single_fetch  --concurrency cold requests for the slow host: one origin request
+  warm_hit                the next request for it: no fetch, under 50 ms
+  dead_host_bounded       a cold miss on the host that never answers: done within LOGO_TIMEOUT + 1 s
+  dead_host_fail_ttl      the next request for it: no fetch (LOGO_FAIL_TTL), under 50 ms
+"""
+import argparse, socket, statistics, sys, tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from types import SimpleNamespace
+from PIL import Image
+
+def make_png(w=2400, h=800):
+    img = Image.new("RGBA", (w, h), (0, 90, 160, 255))
+    out = BytesIO(); img.save(out, "PNG")
+    return out.getvalue()
+
+def serve(png, delay):
+    hits = []
+    class H(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits.append(self.path)
+            time.sleep(delay)
+            if self.path.startswith("/logo"):
+                self.send_response(200); self.send_header("Content-Type", "image/png"); self.end_headers(); self.wfile.write(png)
+            else:
+                self.send_response(404); self.end_headers()
+        def log_message(self, *a): pass
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), H)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv, hits
+
+def blackhole():
+    # accepts connections, never answers: the worst case for a fetch without a timeout
+    s = socket.socket(); s.bind(("127.0.0.1", 0)); s.listen(64)
+    return s
+
+def checks(logo_cache, hits, base, dead, concurrency):
+    # -> {name: (ok, detail)}; URLs of their own, so the render report below still starts cold
+    fetches = []
+    real = logo_cache.fetch
+    logo_cache.fetch = lambda url: (fetches.append(url), real(url))[1]
+    def timed(url):
+        t0 = time.perf_counter(); png = logo_cache.get(url); return png, time.perf_counter() - t0
+    out = {}
+    try:
+        slow, hole = f"{base}/logo.png?check", f"{dead}/logo.png?check"
+        hits.clear()
+        with ThreadPoolExecutor(concurrency) as ex:
+            got = list(ex.map(lambda _: logo_cache.get(slow), range(concurrency)))
+        out["slow_host_single_fetch"] = (len(hits) == 1 and all(got), {"origin_requests": len(hits), "logos": sum(1 for g in got if g)})
+        n = len(fetches); png, t = timed(slow)
+        out["warm_hit"] = (png is not None and len(fetches) == n and t < 0.05, {"fetches": len(fetches) - n, "ms": round(t * 1000, 2)})
+        png, t = timed(hole)
+        out["dead_host_bounded"] = (png is None and t < logo_cache.LOGO_TIMEOUT + 1, {"ms": round(t * 1000, 1), "timeout_s": logo_cache.LOGO_TIMEOUT})
+        n = len(fetches); png, t = timed(hole)
+        out["dead_host_fail_ttl"] = (png is None and len(fetches) == n and t < 0.05, {"fetches": len(fetches) - n, "ms": round(t * 1000, 2)})
+    finally:
+        logo_cache.fetch = real
+    return out
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--delay", type=float, default=1.0)
+    ap.add_argument("--renders", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=8, help="simultaneous cold requests for the slow host")
+    args = ap.parse_args()
+
+    from app import logo_cache
+    logo_cache.LOGO_CACHE_DIR = tempfile.mkdtemp(prefix="logo-bench-")
+    logo_cache.LOGO_TIMEOUT = min(logo_cache.LOGO_TIMEOUT, 2.0)
+    from app.invoice_pdf import generate_invoice_pdf
+
+    png = make_png()
+    srv, hits = serve(png, args.delay)
+    hole = blackhole()
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    order = SimpleNamespace(order_code="ORD000001")
+    cust = SimpleNamespace(name="Siti", phone="0123456789", address="Jalan Mawar")
+    items = [SimpleNamespace(name="Katil hospital", qty=1, unit_price=350)]
+
+    results = checks(logo_cache, hits, base, f"http://127.0.0.1:{hole.getsockname()[1]}", args.concurrency)
+    for name, (ok, detail) in results.items():
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+
+    report = {}
+    for case, url in [("slow_host", f"{base}/logo.png"), ("not_found", f"{base}/missing.png"),
+                      ("dead_host", f"http://127.0.0.1:{hole.getsockname()[1]}/logo.png")]:
+        hits.clear()
+        profile = SimpleNamespace(company_name="Bench Sdn Bhd", logo_url=url)
+        times = []
+        for _ in range(args.renders):
+            t0 = time.perf_counter()
+            pdf = generate_invoice_pdf(order, items, cust, profile=profile)
+            times.append(time.perf_counter() - t0)
+        report[case] = {"cold_ms": round(times[0] * 1000, 1), "warm_p50_ms": round(statistics.median(times[1:]) * 1000, 2),
+                        "origin_requests": len(hits), "pdf_bytes": len(pdf)}
+    report["source_logo_bytes"] = len(png)
+    report["cached_logo_bytes"] = len(logo_cache.get(f"{base}/logo.png") or b"")
+    for k, v in report.items():
+        print(f"{k}: {v}")
+    srv.shutdown(); hole.close()
+    return 0 if all(ok for ok, _ in results.values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""Local stand-in for the OpenAI Responses API subset used by app.parser.
+
+    python -m bench.model_stub --port 8900 --latency 2.0 [--jitter 0.5] [--slow-rate 0.05 --slow-latency 40]
+                               [--error-rate 0.1 --error-status 500,503,429] [--malformed-rate 0.05] [--seed 1]
+    OPENAI_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=stub uvicorn app.main:app
+    python -m bench.model_stub --check     # answers for a corpus sample are valid against app.parser.schema
+
+POST /v1/responses answers with oms_intake JSON read off the transcript in the
+request (app.fastparse.extract with the bench catalogue; the first WhatsApp
+sender when no name is found), so answers vary per text and always match the
+schema. Per call:
+  latency         latency * lognormal(0, jitter) seconds; slow_latency instead with probability slow_rate
+  error_rate      share answered with an HTTP status from error_status, 429 at once, 5xx after the
+                  latency (the SDK raises RateLimitError / InternalServerError, which the parser retries)
+  malformed_rate  share answered 200 with unusable output: truncated JSON, prose around the JSON,
+                  a value outside the schema, or no text
+GET /_stub/stats: calls by outcome and calls in flight (now and peak) since the last config change.
+POST /_stub/config {"latency": 3, ...}: change any setting above and reset the stats (bench.intake
+steps through its slowness profiles this way).
+"""
+import argparse, asyncio, json, random, re, sys, time, uuid
+from collections import Counter
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+CONFIG = {"latency": 0.0, "jitter": 0.0, "slow_rate": 0.0, "slow_latency": 30.0,
+          "error_rate": 0.0, "error_status": [500, 503, 429], "malformed_rate": 0.0}
+MALFORMED = ("truncated", "prose", "schema", "empty")
+TRANSCRIPT_RE = re.compile(r"---\n(.*)\n---", re.S)
+SENDER_RE = re.compile(r"^\[[^\]]+\] ~?([^:]+):", re.M)
+
+app = FastAPI()
+rng = random.Random(1)
+stats = Counter()
+in_flight = [0]
+_names = None
+
+def names() -> list[str]:
+    # catalogue names and aliases, longest first (what fastparse.extract expects)
+    global _names
+    if _names is None:
+        from .datagen import catalog, PRODUCTS
+        products, aliases = catalog()
+        _names = sorted({p[1] for p in products} | {a for a, _ in aliases} | {p[1] for p in PRODUCTS}, key=len, reverse=True)
+    return _names
+
+def answer(text: str) -> dict:
+    from app.fastparse import extract
+    order, event, _ = extract(text, names())
+    o = {k: v for k, v in order.model_dump().items() if v not in (None, "") and k != "items"}  # schema strings are not nullable
+    if not order.name:
+        m = SENDER_RE.search(text); o["name"] = m.group(1).strip() if m else "Pelanggan"
+    items = {}  # a product mentioned on several lines is one item; keep any price given
+    for it in order.items:
+        items.setdefault(it.name, {}).update({k: v for k, v in it.model_dump().items() if v not in (None, "")})
+    o["items"] = list(items.values()) or [{"name": "Barang", "qty": 1}]
+    e = {"type": event.type}
+    if event.reference_order_id: e["reference_order_id"] = event.reference_order_id
+    return {"order": o, "event": e}
+
+def valid(s: dict, v) -> bool:
+    # the JSON Schema subset app.parser.schema uses
+    if "enum" in s: return v in s["enum"]
+    t = s.get("type")
+    if t == "object":
+        props = s.get("properties", {})
+        return (isinstance(v, dict) and all(k in v for k in s.get("required", ()))
+                and (s.get("additionalProperties", True) or set(v) <= set(props))
+                and all(valid(props[k], x) for k, x in v.items() if k in props))
+    if t == "array": return isinstance(v, list) and all(valid(s["items"], x) for x in v)
+    if t == "string": return isinstance(v, str)
+    if t == "integer": return isinstance(v, int) and not isinstance(v, bool)
+    if t == "number": return isinstance(v, (int, float)) and not isinstance(v, bool)
+    return True
+
+def malformed(good: str) -> tuple[str, str]:
+    kind = rng.choice(MALFORMED)
+    if kind == "truncated": return kind, good[: len(good) // 2]
+    if kind == "prose": return kind, f"Sure! Here is the order:\n```json\n{good}\n```"
+    if kind == "schema":
+        d = json.loads(good); d["order"]["type"] = "SEWA"; return kind, json.dumps(d)
+    return kind, ""
+
+def response_body(model: str, text: str, input_chars: int = 800) -> dict:
+    out_tokens = max(1, len(text) // 4)
+    return {
+        "id": f"resp_{uuid.uuid4().hex}", "object": "response", "created_at": int(time.time()), "model": model,
+        "status": "completed", "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+        "output": [{"type": "message", "id": f"msg_{uuid.uuid4().hex}", "status": "completed", "role": "assistant",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+        "usage": {"input_tokens": input_chars // 4, "output_tokens": out_tokens, "total_tokens": input_chars // 4 + out_tokens,
+                  "input_tokens_details": {"cached_tokens": 0}, "output_tokens_details": {"reasoning_tokens": 0}},
+    }
+
+def delay() -> float:
+    if CONFIG["slow_rate"] and rng.random() < CONFIG["slow_rate"]:
+        return CONFIG["slow_latency"]
+    return CONFIG["latency"] * (rng.lognormvariate(0, CONFIG["jitter"]) if CONFIG["jitter"] else 1)
+
+@app.post("/v1/responses")
+async def responses(request: Request):
+    body = await request.json()
+    stats["calls"] += 1; in_flight[0] += 1; stats["peak_in_flight"] = max(stats["peak_in_flight"], in_flight[0])
+    try:
+        status = rng.choice(CONFIG["error_status"]) if CONFIG["error_rate"] and rng.random() < CONFIG["error_rate"] else None
+        if status != 429:
+            await asyncio.sleep(delay())
+        if status:
+            stats[f"error_{status}"] += 1
+            return JSONResponse({"error": {"message": "stub error", "type": "server_error", "param": None, "code": None}}, status_code=status)
+        m = TRANSCRIPT_RE.search(body.get("input") or "")
+        text = json.dumps(answer(m.group(1) if m else body.get("input") or ""))
+        if CONFIG["malformed_rate"] and rng.random() < CONFIG["malformed_rate"]:
+            kind, text = malformed(text); stats[f"malformed_{kind}"] += 1
+        else:
+            stats["ok"] += 1
+        return response_body(body.get("model", "stub"), text, len(body.get("input") or "") + len(body.get("instructions") or ""))
+    finally:
+        in_flight[0] -= 1
+
+@app.get("/_stub/stats")
+async def get_stats():
+    return {**stats, "in_flight": in_flight[0]}
+
+@app.post("/_stub/config")
+async def set_config(payload: dict):
+    CONFIG.update({k: v for k, v in payload.items() if k in CONFIG})
+    stats.clear()
+    return CONFIG
+
+def check(n: int) -> int:
+    # every corpus kind through answer(): schema-valid, and accepted by the app's models
+    from app.parser import schema
+    from app.schemas import ParsedOrder, ParsedEvent
+    from .corpus import corpus
+    from .report import dump
+    kinds, bad = Counter(), []
+    for kind, text in corpus(n):
+        a = answer(text); kinds[kind] += 1
+        try:
+            assert valid(schema["schema"], a); ParsedOrder(**a["order"]); ParsedEvent(**a["event"])
+        except Exception as e:
+            bad.append({"kind": kind, "answer": a, "error": repr(e)})
+    dump({"transcripts": n, "kinds": kinds, "invalid": bad[:5], "invalid_count": len(bad)})
+    return 1 if bad else 0
+
+def main():
+    import uvicorn
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8900)
+    ap.add_argument("--latency", type=float, default=0.0, help="seconds per call (median with --jitter)")
+    ap.add_argument("--jitter", type=float, default=0.0, help="lognormal sigma around --latency")
+    ap.add_argument("--slow-rate", type=float, default=0.0, help="share of calls taking --slow-latency")
+    ap.add_argument("--slow-latency", type=float, default=30.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--error-status", default="500,503,429")
+    ap.add_argument("--malformed-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--check", type=int, nargs="?", const=500, help="validate answers for this many corpus transcripts and exit")
+    args = ap.parse_args()
+    if args.check: return check(args.check)
+    rng.seed(args.seed)
+    CONFIG.update(latency=args.latency, jitter=args.jitter, slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                  error_rate=args.error_rate, error_status=[int(s) for s in args.error_status.split(",")], malformed_rate=args.malformed_rate)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    sys.exit(main())
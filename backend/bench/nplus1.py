@@ -0,0 +1,101 @@
+"""N+1 check over the main read/render endpoints, for CI.
+
+    python -m bench.nplus1 --orders 30 --threshold 5
+
+Seeds --orders orders (several items and payments each, a few sharing a
+customer) through the API, then calls each route in ROUTES in-process with
+NPLUS1_DETECT=raise. Prints every route whose requests repeat a statement
+shape --threshold times or more, with the call sites, and exits 1 if any do.
+Needs DATABASE_URL; writes to that database.
+
+    python -m bench.nplus1 --scaling 10,500
+
+Query-count regression check for the listing/export endpoints: brings the
+orders in the database up to each size in turn (bench.datagen rows, added to
+what is there), calls every route in SCALING_ROUTES once to warm caches and
+then counts the SQL statements of one more call. Exits 1 if any route's
+count differs between sizes, i.e. grows with the number of orders.
+"""
+import argparse, os, sys, time
+
+def routes(codes):
+    c = codes[0]
+    return [
+        ("GET", "/orders", None), ("GET", "/orders?limit=20", None), ("GET", "/api/orders", None), ("GET", "/api/orders?limit=20", None),
+        ("GET", "/api/outstanding", None), ("GET", "/api/outstanding?overdue_only=true&limit=20", None),
+        ("GET", f"/orders/{c}/invoice.pdf", None), ("GET", f"/orders/{c}/receipt.pdf", None),
+        ("POST", "/invoices/batch", {"order_codes": codes, "title": "INVOICE", "format": "zip"}),
+        ("GET", "/suggest/items?q=katil", None), ("GET", "/export/excel", None), ("GET", "/settings/profile", None),
+        ("POST", "/payments", {"order_code": c, "amount": 1}),
+        ("POST", "/api/transactions", {"order_code": c, "amount": 1}),
+    ]
+
+SCALING_ROUTES = ["/orders", "/orders?limit=50", "/api/orders", "/api/orders?limit=50", "/api/outstanding",
+                  "/api/outstanding?overdue_only=true&limit=50", "/export/excel"]
+
+def scaling(sizes):
+    from sqlalchemy import event
+    from fastapi.testclient import TestClient
+    from app import db
+    from app.main import app
+    from .datagen import generate, finish
+    count = [0]
+    def after(*a): count[0] += 1
+    for e in [db.engine] + ([db.async_engine.sync_engine] if db.async_engine is not None else []):
+        event.listen(e, "after_cursor_execute", after)
+    def statements(client, path):
+        count[0] = 0; client.get(path).raise_for_status(); return count[0]
+    counts, added = {}, 0
+    with TestClient(app) as client:
+        for n in sizes:
+            conn = db.engine.raw_connection()
+            try:
+                generate(conn, n - added, seed=n); finish(conn)
+            finally:
+                conn.close()
+            added = n
+            for path in SCALING_ROUTES: client.get(path).raise_for_status()
+            counts[n] = {path: statements(client, path) for path in SCALING_ROUTES}
+    failed = 0
+    for path in SCALING_ROUTES:
+        per = [counts[n][path] for n in sizes]
+        ok = len(set(per)) == 1
+        failed += not ok
+        print(f"{'ok  ' if ok else 'FAIL'}  {path}: statements " + ", ".join(f"{c} at {n} orders" for n, c in zip(sizes, per)))
+    print(f"{failed} route(s) whose statement count grows with the orders")
+    return 1 if failed else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--orders", type=int, default=30)
+    ap.add_argument("--threshold", type=int, default=5)
+    ap.add_argument("--scaling", help="comma-separated order counts, e.g. 10,500: run the query-count check instead")
+    args = ap.parse_args()
+    if args.scaling:
+        return scaling(sorted(int(n) for n in args.scaling.split(",")))
+    os.environ["NPLUS1_DETECT"] = "raise"; os.environ["NPLUS1_THRESHOLD"] = str(args.threshold)
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.nplus1 import NPlusOneError
+    tag = time.time_ns() % 10**8
+    with TestClient(app) as client:
+        codes = []
+        for i in range(args.orders):
+            r = client.post("/orders", json={"name": f"N1 {tag}-{i}", "phone": f"01{(tag + i % 7) % 10**8:08d}", "type": "RENTAL",
+                                             "items": [{"name": f"Katil {k}", "qty": 1 + k, "unit_price": 100 + k} for k in range(4)]})
+            r.raise_for_status(); codes.append(r.json()["order_code"])
+            for k in range(3):
+                client.post("/payments", json={"order_code": codes[-1], "amount": 10}).raise_for_status()
+        failed = 0
+        for method, path, body in routes(codes):
+            try:
+                r = client.request(method, path, json=body)
+                print(f"ok    {method} {path} ({r.status_code})")
+            except NPlusOneError as e:
+                failed += 1
+                print(f"FAIL  {method} {path}\n{e}")
+    print(f"{failed} route(s) with N+1 queries")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
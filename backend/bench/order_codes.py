@@ -0,0 +1,94 @@
+"""Parallel order creates: no duplicate codes, no unique violations, flat latency.
+
+    uvicorn app.main:app --port 8000 --workers 4
+    python -m bench.order_codes --base http://localhost:8000 --orders 1000 --concurrency 100 [--explicit 0.1]
+
+Creates --orders orders through POST /orders and /api/orders from
+--concurrency concurrent clients. A share --explicit of the /orders creates
+pass an explicit order_id a little above the highest code seen so far (within
+--span), i.e. usually inside a block another worker has reserved but not yet
+used up, like a legacy import would. Reports failures, duplicate codes, and
+latency for the first and last quarter of the run (a count(*)-based code
+gets slower as the table grows; a sequence-backed one should not). An explicit
+code someone already has is answered 409 and counted under explicit_taken, not
+as a failure. Exits 1 if any code was handed out twice or any other create
+failed.
+"""
+import argparse, asyncio, random, sys, time
+import httpx
+from .report import summarize, dump
+
+def body(i, tag, code=None):
+    if i % 2 or code:
+        return "/orders", {"name": f"Bench {tag}", "phone": f"01{tag % 10**8:08d}", "type": "RENTAL", "order_id": code,
+                           "items": [{"name": "Katil", "qty": 1, "unit_price": 300}]}
+    return "/api/orders", {"customer_name": f"Bench {tag}", "customer_phone_primary": f"01{tag % 10**8:08d}",
+                           "order_type": "OUTRIGHT", "line_items": [{"description": "Katil", "qty": 1, "unit_price_myr": 300}]}
+
+class Explicit:
+    # order_ids for the explicit share: above the highest code seen, never reused
+    def __init__(self, share, span, seed):
+        self.share, self.span, self.rng = share, span, random.Random(seed)
+        self.high, self.used = 0, set()
+
+    def seen(self, code):
+        if code and code.startswith("ORD") and code[3:].isdigit(): self.high = max(self.high, int(code[3:])); self.used.add(code)
+
+    def pick(self):
+        if not self.high or self.rng.random() >= self.share: return None
+        for _ in range(20):
+            code = f"ORD{self.high + self.rng.randint(1, self.span):06d}"
+            if code not in self.used: self.used.add(code); return code
+
+async def worker(client, todo, results, explicit):
+    while todo:
+        i = todo.pop()
+        code = explicit.pick()
+        path, payload = body(i, time.time_ns(), code)
+        t0 = time.perf_counter()
+        try:
+            r = await client.post(path, json=payload)
+            got = r.json().get("order_code") if r.status_code == 200 else r.text[:200]
+            if r.status_code == 200: explicit.seen(got)
+            results.append((i, time.perf_counter() - t0, r.status_code, got, code))
+        except httpx.HTTPError as e:
+            results.append((i, time.perf_counter() - t0, 0, str(e), code))
+
+async def run(args):
+    todo = list(range(args.orders))[::-1]; results = []
+    explicit = Explicit(args.explicit, args.span, args.seed)
+    async with httpx.AsyncClient(base_url=args.base, timeout=120, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client, todo, results, explicit) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+    results.sort()
+    ok = [r for r in results if r[2] == 200]
+    taken = [r for r in results if r[2] == 409 and r[4]]
+    failed = [r for r in results if r[2] != 200 and r not in taken]
+    wrong = [r for r in ok if r[4] and r[3] != r[4]]  # explicit order_id not the code given back
+    codes = [r[3] for r in ok]
+    q = max(1, len(results) // 4)
+    result = {
+        "orders": args.orders, "concurrency": args.concurrency,
+        "all": summarize([r[1] for r in ok], elapsed, len(failed)),
+        "first_quarter": summarize([r[1] for r in results[:q] if r[2] == 200], elapsed),
+        "last_quarter": summarize([r[1] for r in results[-q:] if r[2] == 200], elapsed),
+        "explicit": sum(1 for r in results if r[4]), "explicit_taken": len(taken), "explicit_wrong_code": len(wrong),
+        "duplicate_codes": len(codes) - len(set(codes)),
+        "sample_errors": [r[3] for r in failed][:5],
+    }
+    dump(result)
+    return 1 if result["duplicate_codes"] or failed or wrong else 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--base", default="http://localhost:8000")
+    ap.add_argument("--orders", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=100)
+    ap.add_argument("--explicit", type=float, default=0.1, help="share of creates with an explicit order_id")
+    ap.add_argument("--span", type=int, default=200, help="explicit codes are up to this far above the highest seen (workers * ORDER_CODE_BLOCK)")
+    ap.add_argument("--seed", type=int, default=1)
+    return asyncio.run(run(ap.parse_args()))
+
+if __name__ == "__main__":
+    sys.exit(main())
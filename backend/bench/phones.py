@@ -0,0 +1,67 @@
+"""Customer matching check: placeholder phones never share a customer.
+
+    python -m bench.phones
+
+utils.norm_phone over PLACEHOLDERS (must give None) and SAME (must all give
+one number); then, in-process against DATABASE_URL, one POST /api/orders and
+one POST /orders per placeholder must land on distinct customers, the SAME
+spellings on one customer, and `app.customers backfill` over placeholder rows
+must merge none of them. Prints each check and exits 1 if any fails. Writes
+to the database.
+"""
+import sys, time
+
+PLACEHOLDERS = ("-", "N/A", "tiada", "TIADA", "0", "+60", "60", "12345", "--", "n/a (call office)")
+SAME = ("012-345 6789", "+60123456789", "60 12-345 6789", "0123456789", "+60 12 345 6789")
+
+def main():
+    from sqlalchemy import select, insert
+    from fastapi.testclient import TestClient
+    from app import models
+    from app.db import SessionLocal
+    from app.main import app
+    from app.customers import backfill
+    from app.utils import norm_phone
+    fails = []
+    def check(name, ok, got=None):
+        print(f"{'ok  ' if ok else 'FAIL'} {name}" + ("" if ok else f": {got}"))
+        if not ok: fails.append(name)
+
+    for p in PLACEHOLDERS:
+        check(f"norm_phone({p!r}) is None", norm_phone(p) is None, norm_phone(p))
+    check("spellings of one number normalize alike", len({norm_phone(p) for p in SAME}) == 1, {p: norm_phone(p) for p in SAME})
+
+    tag = time.time_ns() % 10**6
+    same = [p.replace("345", f"{tag % 1000:03d}") for p in SAME]
+    codes = []
+    with TestClient(app) as client:
+        for i, p in enumerate(PLACEHOLDERS):
+            r = client.post("/api/orders", json={"customer_name": f"Placeholder {tag}-{i}", "customer_phone_primary": p,
+                                                 "order_type": "OUTRIGHT", "line_items": [{"description": "Katil", "qty": 1, "unit_price_myr": 1}]})
+            r.raise_for_status(); codes.append(r.json()["order_code"])
+            r = client.post("/orders", json={"name": f"Placeholder {tag}-{i}b", "phone": p, "type": "OUTRIGHT", "items": [{"name": "Katil", "qty": 1}]})
+            r.raise_for_status(); codes.append(r.json()["order_code"])
+        same_codes = []
+        for i, p in enumerate(same):
+            r = client.post("/orders", json={"name": f"Same {tag}", "phone": p, "type": "OUTRIGHT", "items": [{"name": "Katil", "qty": 1}]})
+            r.raise_for_status(); same_codes.append(r.json()["order_code"])
+    with SessionLocal() as db:
+        owner = lambda cs: [db.scalar(select(models.Order.customer_id).where(models.Order.order_code == c)) for c in cs]
+        ids = owner(codes)
+        check("placeholder phones get a customer each", len(set(ids)) == len(ids), ids)
+        check("placeholder customers have no canonical phone",
+              not db.scalars(select(models.Customer.phone_canonical).where(models.Customer.id.in_(ids), models.Customer.phone_canonical.is_not(None))).all())
+        ids = owner(same_codes)
+        check("spellings of one number share a customer", len(set(ids)) == 1, ids)
+
+        # rows from before phone_canonical: backfill must leave placeholders apart
+        old = db.execute(insert(models.Customer).returning(models.Customer.id),
+                         [{"name": f"Old {tag}-{i}", "phone": p} for i, p in enumerate(PLACEHOLDERS)]).scalars().all()
+        db.commit()
+        stats = backfill(db, log=lambda *a: None)
+        left = db.scalars(select(models.Customer.id).where(models.Customer.id.in_(old))).all()
+        check("backfill merges no placeholder rows", len(left) == len(old), stats)
+    return 1 if fails else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Shared result helpers for the bench scripts, and a comparison of two runs.
+
+    python -m bench.report base.json new.json [--threshold 10]
+
+Compares every summarize() block (a dict with p50_ms/throughput_rps) found at
+the same path in both files, e.g. bench.load's "overall" and "scenarios.*":
+the two values and the change in percent for p50/p95/p99/max and throughput.
+Blocks where a percentile got more than --threshold percent slower, or
+throughput that much lower, are listed under "regressions"; the exit status
+is 1 if there are any.
+"""
+import argparse, json, math, os, platform, subprocess, sys
+from datetime import datetime, timezone
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "max_ms", "throughput_rps")
+
+def percentile(sorted_samples, p):
+    if not sorted_samples:
+        return None
+    k = max(0, math.ceil(p / 100 * len(sorted_samples)) - 1)
+    return sorted_samples[k]
+
+def summarize(latencies, seconds, errors=0):
+    s = sorted(latencies)
+    ms = lambda v: None if v is None else round(v * 1000, 2)
+    return {
+        "requests": len(s), "errors": errors, "seconds": round(seconds, 2),
+        "throughput_rps": round(len(s) / seconds, 1) if seconds else None,
+        "p50_ms": ms(percentile(s, 50)), "p95_ms": ms(percentile(s, 95)), "p99_ms": ms(percentile(s, 99)), "max_ms": ms(s[-1] if s else None),
+    }
+
+def meta(**extra):
+    # what a run needs to be compared with another: code version, machine, settings
+    def git(*a):
+        try:
+            return subprocess.run(["git", *a], capture_output=True, text=True, timeout=5).stdout.strip() or None
+        except OSError:
+            return None
+    return {"time": datetime.now(timezone.utc).isoformat(timespec="seconds"), "git": git("rev-parse", "--short", "HEAD"),
+            "git_dirty": bool(git("status", "--porcelain", "--untracked-files=no")), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count(), **extra}
+
+def dump(result, path=None):
+    out = json.dumps(result, indent=2)
+    print(out)
+    if path:
+        with open(path, "w") as f: f.write(out + "\n")
+
+# ---- compare ----
+def blocks(d, prefix=""):
+    # (path, summary) for every summarize() result nested in d
+    if isinstance(d, dict):
+        if "p50_ms" in d and "throughput_rps" in d:
+            yield prefix, d
+        else:
+            for k, v in d.items():
+                yield from blocks(v, f"{prefix}.{k}" if prefix else k)
+
+def change(a, b):
+    return None if a in (None, 0) or b is None else round((b / a - 1) * 100, 1)
+
+def compare(base: dict, new: dict, threshold: float = 10) -> dict:
+    old = dict(blocks(base))
+    out, regressions = {}, []
+    for path, b in blocks(new):
+        a = old.get(path)
+        if a is None: continue
+        row = {m: {"base": a.get(m), "new": b.get(m), "change_pct": change(a.get(m), b.get(m))} for m in METRICS}
+        row["errors"] = {"base": a.get("errors"), "new": b.get("errors")}
+        out[path] = row
+        worse = [m for m in METRICS if row[m]["change_pct"] is not None and m != "max_ms"
+                 and (row[m]["change_pct"] < -threshold if m == "throughput_rps" else row[m]["change_pct"] > threshold)]
+        if worse: regressions.append({"block": path, "metrics": worse})
+    return {"base": base.get("meta"), "new": new.get("meta"), "threshold_pct": threshold, "blocks": out, "regressions": regressions}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("base"); ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=10, help="percent change counted as a regression")
+    args = ap.parse_args()
+    load = lambda p: json.load(open(p))
+    result = compare(load(args.base), load(args.new), args.threshold)
+    dump(result)
+    return 1 if result["regressions"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
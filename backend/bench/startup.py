@@ -0,0 +1,66 @@
+"""Cold start: import time and time to first /api/health response.
+
+    python -m bench.startup --runs 5
+
+For each mode, --runs times: a fresh interpreter importing app.main (import
+seconds), then a fresh `uvicorn app.main:app` polled on /api/health until the
+first 200 (seconds from spawn). Modes:
+  lazy     defaults: heavy libraries on first use, schema check in the lifespan
+  eager    PRELOAD_MODULES=1 SCHEMA_CHECK=force: everything imported and all
+           DDL run at boot, which is what every start used to cost
+Needs DATABASE_URL; the schema is applied once before timing.
+"""
+import argparse, os, socket, subprocess, sys, time
+import httpx
+from .report import dump
+
+MODES = {"lazy": {}, "eager": {"PRELOAD_MODULES": "1", "SCHEMA_CHECK": "force"}}
+IMPORT = ("import importlib, time; t = time.perf_counter(); import app.main as m\n"
+          "if m.PRELOAD_MODULES: [importlib.import_module(x) for x in m.HEAVY_MODULES]\n"
+          "print(time.perf_counter() - t)")
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0)); return s.getsockname()[1]
+
+def import_seconds(env):
+    out = subprocess.run([sys.executable, "-c", IMPORT], env=env, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+def first_health(env, timeout=60):
+    port = free_port()
+    t0 = time.perf_counter()
+    p = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                         env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/api/health", timeout=1).status_code == 200:
+                    return time.perf_counter() - t0
+            except httpx.HTTPError:
+                pass
+            if p.poll() is not None:
+                raise RuntimeError(f"server exited with {p.returncode}")
+            time.sleep(0.01)
+        raise TimeoutError("no /api/health response")
+    finally:
+        p.terminate(); p.wait()
+
+def run(args):
+    subprocess.run([sys.executable, "-c", "from app.db import engine; from app.schema import ensure; ensure(engine)"], check=True)
+    result = {}
+    for name, extra in MODES.items():
+        env = {**os.environ, **extra}
+        imports = sorted(import_seconds(env) for _ in range(args.runs))
+        health = sorted(first_health(env) for _ in range(args.runs))
+        result[name] = {"import_s_median": round(imports[len(imports) // 2], 3), "import_s_min": round(imports[0], 3),
+                        "first_health_s_median": round(health[len(health) // 2], 3), "first_health_s_min": round(health[0], 3)}
+    dump(result)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    run(ap.parse_args())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Latency of /suggest/items ranking on a synthetic catalog.
+
+    python -m bench.suggest --entries 50000 --queries 5000
+"""
+import argparse, random, time
+from app.suggest import SuggestIndex
+from .report import percentile, dump
+
+WORDS = ("hospital bed wheelchair oxygen concentrator walker commode mattress ripple air cushion nebulizer suction "
+         "machine tilam katil kerusi roda electric manual foldable heavy duty portable adjustable rental premium").split()
+
+def typo(w, rng):
+    if len(w) < 4: return w
+    i = rng.randrange(1, len(w) - 1)
+    return w[:i] + w[i+1:] if rng.random() < 0.5 else w[:i] + rng.choice("aeiou") + w[i+1:]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--entries", type=int, default=50000)
+    ap.add_argument("--queries", type=int, default=5000)
+    ap.add_argument("--k", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    rng = random.Random(args.seed)
+    entries = [(" ".join(rng.sample(WORDS, rng.randint(2, 4))) + f" {rng.choice('ABCDEFGH')}{i}", f"SKU{i // 2:05d}") for i in range(args.entries)]
+    idx = SuggestIndex()
+    t0 = time.perf_counter(); idx.load(entries); build_s = time.perf_counter() - t0
+
+    kinds = {"prefix": [], "token_prefix": [], "fuzzy": [], "miss": []}
+    for _ in range(args.queries):
+        label = rng.choice(entries)[0].split()
+        kind = rng.choice(list(kinds))
+        q = {"prefix": " ".join(label)[:rng.randint(2, 12)],
+             "token_prefix": label[-2][:rng.randint(2, len(label[-2]))],
+             "fuzzy": typo(rng.choice(label[:-1]), rng),
+             "miss": "qzx" + str(rng.randrange(1000))}[kind]
+        t0 = time.perf_counter(); idx.search(q, args.k); kinds[kind].append(time.perf_counter() - t0)
+    out = {"entries": args.entries, "build_ms": round(build_s * 1000, 1)}
+    every = sorted(x for v in kinds.values() for x in v)
+    for name, lat in list(kinds.items()) + [("all", every)]:
+        lat.sort()
+        out[name] = {"n": len(lat), "p50_us": round(percentile(lat, 50) * 1e6, 1), "p99_us": round(percentile(lat, 99) * 1e6, 1)}
+    dump(out)
+
+if __name__ == "__main__":
+    main()